@@ -0,0 +1,111 @@
+""" Benchmark of the fused equation residuals against the example problems """
+
+import argparse
+import timeit
+from math import pi
+
+import torch
+
+from pina import LabelTensor
+from pina.model import FeedForward
+from pina.operators import grad, laplacian
+from pina.equation import (
+    Burgers, Heat, Wave, AdvectionDiffusion, Stokes, NavierStokes)
+from problems.burgers import Burgers1D
+from problems.wave import Wave as WaveProblem
+from problems.stokes import Stokes as StokesProblem
+
+
+def heat(input_, output_):
+    # hand-written residual of the heat equation
+    du = grad(output_, input_, components=['u'], d=['t'])
+    delta = laplacian(output_, input_, components=['u'], d=['x', 'y'])
+    return du - 0.1 * delta
+
+
+def advection_diffusion(input_, output_):
+    # hand-written residual of the advection-diffusion equation
+    du = grad(output_, input_, components=['u'])
+    delta = laplacian(output_, input_, components=['u'], d=['x', 'y'])
+    return (du.extract(['dudt']) + 1.0 * du.extract(['dudx'])
+            + 0.5 * du.extract(['dudy']) - 0.1 * delta)
+
+
+def navier_stokes(input_, output_):
+    # hand-written residual of the unsteady Navier-Stokes equations
+    du = grad(output_, input_)
+    delta = laplacian(output_, input_, components=['ux', 'uy'], d=['x', 'y'])
+    ux, uy = output_.extract(['ux']), output_.extract(['uy'])
+    momentum_x = (du.extract(['duxdt']) + ux * du.extract(['duxdx'])
+                  + uy * du.extract(['duxdy']) - 0.01 * delta.extract(['ddux'])
+                  + du.extract(['dpdx']))
+    momentum_y = (du.extract(['duydt']) + ux * du.extract(['duydx'])
+                  + uy * du.extract(['duydy']) - 0.01 * delta.extract(['dduy'])
+                  + du.extract(['dpdy']))
+    continuity = du.extract(['duxdx']) + du.extract(['duydy'])
+    return torch.hstack([momentum_x, momentum_y, continuity])
+
+
+def wave(input_, output_):
+    # the example residual is written as laplacian(u) - u_tt
+    return -WaveProblem.wave_equation(input_, output_)
+
+
+def stokes(input_, output_):
+    return torch.hstack([StokesProblem.momentum(input_, output_),
+                         StokesProblem.continuity(input_, output_)])
+
+
+def benchmark(name, reference, fused, input_labels, output_labels, n_points,
+              repeat):
+    model = FeedForward(len(input_labels), len(output_labels))
+    pts = LabelTensor(torch.rand(n_points, len(input_labels)), input_labels)
+    pts.requires_grad = True
+
+    def run(equation):
+        output = model(pts).as_subclass(LabelTensor)
+        output.labels = output_labels
+        residual = equation(pts, output)
+        residual.pow(2).mean().backward()
+        return residual
+
+    torch.testing.assert_close(run(reference).tensor, run(fused).tensor,
+                               rtol=1e-4, atol=1e-5)
+    times = []
+    for equation in (reference, fused):
+        run(equation)  # warm up
+        times.append(min(timeit.repeat(lambda: run(equation), number=1,
+                                       repeat=repeat)))
+    print(f"{name:<15}{times[0] * 1e3:>12.2f}{times[1] * 1e3:>12.2f}"
+          f"{times[0] / times[1]:>10.2f}x")
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Benchmark PINA equations")
+    parser.add_argument("--points", help="number of points", type=int,
+                        default=10000)
+    parser.add_argument("--repeat", help="number of repetitions", type=int,
+                        default=10)
+    args = parser.parse_args()
+
+    print(f"{'equation':<15}{'example ms':>12}{'fused ms':>12}{'speedup':>11}")
+    benchmark("burgers", Burgers1D.burger_equation,
+              Burgers(0.01 / pi, d=['x']).residual,
+              ['x', 't'], ['u'], args.points, args.repeat)
+    benchmark("heat", heat,
+              Heat(0.1, d=['x', 'y']).residual,
+              ['x', 'y', 't'], ['u'], args.points, args.repeat)
+    benchmark("advection", advection_diffusion,
+              AdvectionDiffusion([1.0, 0.5], 0.1, d=['x', 'y']).residual,
+              ['x', 'y', 't'], ['u'], args.points, args.repeat)
+    benchmark("wave", wave,
+              Wave(1.0, d=['x', 'y']).residual,
+              ['x', 'y', 't'], ['u'], args.points, args.repeat)
+    benchmark("stokes", stokes,
+              Stokes(velocity=['ux', 'uy']).residual,
+              ['x', 'y'], ['ux', 'uy', 'p'], args.points, args.repeat)
+    benchmark("navier-stokes", navier_stokes,
+              NavierStokes(0.01, velocity=['ux', 'uy'], d=['x', 'y'],
+                           time='t').residual,
+              ['x', 'y', 't'], ['ux', 'uy', 'p'], args.points, args.repeat)
@@ -25,10 +25,11 @@ class Poisson(SpatialProblem):
     spatial_domain = CartesianDomain({'x': [0, 1], 'y': [0, 1]})
 
     def laplace_equation(input_, output_):
-        force_term = (torch.sin(input_.extract(['x'])*torch.pi) *
-                        torch.sin(input_.extract(['y'])*torch.pi))
-        nabla_u = laplacian(output_.extract(['u']), input_)
-        return nabla_u - force_term
+        return laplacian(output_.extract(['u']), input_)
+
+    def force_term(input_):
+        return (torch.sin(input_.extract(['x'])*torch.pi) *
+                torch.sin(input_.extract(['y'])*torch.pi))
 
     conditions = {
         'gamma1': Condition(
@@ -45,7 +46,7 @@ class Poisson(SpatialProblem):
             equation=FixedValue(0.0)),
         'D': Condition(
             location=CartesianDomain({'x': [0, 1], 'y': [0, 1]}),
-            equation=Equation(laplace_equation)),
+            equation=Equation(laplace_equation, forcing=force_term)),
     }
 
     def poisson_sol(self, pts):
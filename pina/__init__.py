@@ -6,6 +6,7 @@ __all__ = [
     "Condition",
     "SamplePointDataset",
     "SamplePointLoader",
+    "MemoryMappedPoints",
 ]
 
 from .meta import *
@@ -16,3 +17,4 @@ from .plotter import Plotter
 from .condition import Condition
 from .dataset import SamplePointDataset
 from .dataset import SamplePointLoader
+from .dataset import MemoryMappedPoints
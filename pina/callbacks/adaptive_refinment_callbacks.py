@@ -70,8 +70,9 @@ class R3Refinement(Callback):
         for location in self._sampling_locations:
             condition = solver.problem.conditions[location]
             pts = solver.problem.input_pts[location]
-            # send points to correct device
-            pts = pts.to(device=device, dtype=precision)
+            # send points to correct device, without touching the problem
+            # points (``to`` does not copy them if nothing changes)
+            pts = pts.detach().to(device=device, dtype=precision)
             pts = pts.requires_grad_(True)
             pts.retain_grad()
             # PINN loss: equation evaluated only for sampling locations
@@ -143,7 +144,10 @@ class R3Refinement(Callback):
         locations = []
         for condition_name in problem.conditions:
             condition = problem.conditions[condition_name]
-            if hasattr(condition, "location"):
+            # the streaming conditions are resampled at every step
+            if hasattr(condition, "location") and (
+                condition_name not in problem.streaming_conditions
+            ):
                 locations.append(condition_name)
         self._sampling_locations = locations
 
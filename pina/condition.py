@@ -3,6 +3,7 @@
 from .label_tensor import LabelTensor
 from .geometry import Location
 from .equation.equation import Equation
+from .dataset import MemoryMappedPoints
 
 
 def dummy(a):
@@ -49,6 +50,27 @@ class Condition:
     >>>     input_points=example_input_pts,
     >>>     equation=example_dirichlet)
 
+    A condition defined by a location and an equation can be *streaming*, by
+    passing ``stream_points``: the location is not discretised, and at every
+    training step ``stream_points`` fresh random points are drawn from the
+    location directly on the training device (see
+    :meth:`~pina.geometry.location.Location.sample_tensor`), so the points
+    are never stored in the problem.
+
+    >>> Condition(
+    >>>     location=example_domain,
+    >>>     equation=example_dirichlet,
+    >>>     stream_points=1000)
+
+    The points of a data condition can be
+    :class:`~pina.dataset.MemoryMappedPoints`, to train on snapshot sets
+    larger than the memory: they are read from the file one batch at a
+    time.
+
+    >>> Condition(
+    >>>     input_points=MemoryMappedPoints('params.npy', ['mu']),
+    >>>     output_points=MemoryMappedPoints('snapshots.npy', ['u']))
+
     """
 
     __slots__ = [
@@ -57,6 +79,7 @@ class Condition:
         "location",
         "equation",
         "data_weight",
+        "stream_points",
     ]
 
     def _dictvalue_isinstance(self, dict_, key_, class_):
@@ -71,6 +94,7 @@ class Condition:
         Constructor for the `Condition` class.
         """
         self.data_weight = kwargs.pop("data_weight", 1.0)
+        self.stream_points = kwargs.pop("stream_points", None)
 
         if len(args) != 0:
             raise ValueError(
@@ -84,10 +108,36 @@ class Condition:
         ):
             raise ValueError(f"Invalid keyword arguments {kwargs.keys()}.")
 
-        if not self._dictvalue_isinstance(kwargs, "input_points", LabelTensor):
+        if self.stream_points is not None:
+            if "location" not in kwargs:
+                raise ValueError(
+                    "`stream_points` is valid only for the conditions "
+                    "defined by a location and an equation."
+                )
+            if (
+                isinstance(self.stream_points, bool)
+                or not isinstance(self.stream_points, int)
+                or self.stream_points <= 0
+            ):
+                raise ValueError("`stream_points` must be a positive int.")
+
+        # the points of the data conditions can be memory-mapped
+        points_class = LabelTensor
+        if "output_points" in kwargs:
+            points_class = (LabelTensor, MemoryMappedPoints)
+        if not self._dictvalue_isinstance(kwargs, "input_points", points_class):
             raise TypeError("`input_points` must be a torch.Tensor.")
-        if not self._dictvalue_isinstance(kwargs, "output_points", LabelTensor):
+        if not self._dictvalue_isinstance(
+            kwargs, "output_points", points_class
+        ):
             raise TypeError("`output_points` must be a torch.Tensor.")
+        if "output_points" in kwargs and len(kwargs["input_points"]) != len(
+            kwargs["output_points"]
+        ):
+            raise ValueError(
+                "`input_points` and `output_points` must have the same "
+                "number of points."
+            )
         if not self._dictvalue_isinstance(kwargs, "location", Location):
             raise TypeError("`location` must be a Location.")
         if not self._dictvalue_isinstance(kwargs, "equation", Equation):
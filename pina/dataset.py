@@ -1,11 +1,119 @@
+from math import ceil
+from queue import Queue, Empty, Full
+from threading import Event, Thread
 from torch.utils.data import Dataset
+import numpy as np
 import torch
 from pina import LabelTensor
 
 
+def _shard_rows(count, rank, world_size, device=None):
+    """
+    Compute the rows of the shard of a rank, in a parallel training, of the
+    ``count`` points of a condition: a contiguous block of
+    ``ceil(count / world_size)`` rows, wrapped around at the end so that
+    every rank has the same number of points.
+
+    :param int count: The number of points of the condition.
+    :param int rank: The rank.
+    :param int world_size: The number of ranks.
+    :param torch.device device: The device of the rows. Default is ``None``.
+    :return: The rows of the shard.
+    :rtype: torch.Tensor
+    """
+    size = ceil(count / world_size)
+    rows = torch.arange(size, device=device)
+    if count == 0:
+        return rows
+    return (rows + rank * size) % count
+
+
+class MemoryMappedPoints:
+    """
+    The points of a data condition stored in a ``.npy`` file, which is
+    memory-mapped instead of being loaded, to train on snapshot sets larger
+    than the memory. It can be passed as ``input_points`` or
+    ``output_points`` of a :class:`~pina.condition.Condition`; the points are
+    read only when a batch is requested, see
+    :class:`~pina.dataset.SamplePointLoader`.
+
+    :Example:
+        >>> np.save('snapshots.npy', np.random.rand(1000, 3))
+        >>> points = MemoryMappedPoints('snapshots.npy', ['u', 'v', 'w'])
+        >>> points[:2]
+        tensor([[0.5488, 0.7152, 0.6028],
+                [0.5449, 0.4237, 0.6459]])
+    """
+
+    def __init__(self, path, labels, dtype=None):
+        """
+        :param str path: The path of the ``.npy`` file, with the points along
+            the first dimension and the labelled variables along the last
+            one.
+        :param labels: The labels of the variables.
+        :type labels: str | list(str)
+        :param torch.dtype dtype: The dtype of the points read. Default is
+            ``None``, i.e. the default dtype.
+        """
+        self.path = path
+        self.labels = [labels] if isinstance(labels, str) else list(labels)
+        self.dtype = dtype or torch.get_default_dtype()
+        self.array = np.load(path, mmap_mode="r")
+
+        if self.array.ndim < 2 or self.array.shape[-1] != len(self.labels):
+            raise ValueError(
+                f"The points in {path} have shape {self.array.shape}, "
+                f"incompatible with {len(self.labels)} labels."
+            )
+
+    @property
+    def shape(self):
+        """
+        The shape of the points.
+        """
+        return torch.Size(self.array.shape)
+
+    def __len__(self):
+        return self.array.shape[0]
+
+    def __getitem__(self, index):
+        """
+        Read some points from the file.
+
+        :param index: The rows to read, a ``slice`` or a sequence of indeces
+            (reading contiguous rows is faster).
+        :type index: slice | list(int) | torch.Tensor
+        :return: The points read.
+        :rtype: LabelTensor
+        """
+        if isinstance(index, torch.Tensor):
+            index = index.cpu().numpy()
+        values = torch.from_numpy(np.ascontiguousarray(self.array[index]))
+        return LabelTensor(values.to(self.dtype), self.labels)
+
+    def __getstate__(self):
+        # the file is mapped again when unpickled, not copied
+        state = self.__dict__.copy()
+        del state["array"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.array = np.load(self.path, mmap_mode="r")
+
+    def __deepcopy__(self, memo):
+        return self
+
+
 class SamplePointDataset(Dataset):
     """
     This class is used to create a dataset of sample points.
+
+    :var forcing: The ``forcing`` of the equation of each condition (see
+        :class:`~pina.equation.equation.Equation`) evaluated on its sample
+        points, or ``None`` if the equation has no ``forcing``. The order is
+        consistent with ``condition_names``.
+    :vartype forcing: list[torch.Tensor]
     """
 
     def __init__(self, problem, device) -> None:
@@ -15,11 +123,18 @@ class SamplePointDataset(Dataset):
         super().__init__()
         pts_list = []
         self.condition_names = []
+        self.forcing = []
+        streaming = problem.streaming_conditions
 
         for name, condition in problem.conditions.items():
-            if not hasattr(condition, "output_points"):
+            if not hasattr(condition, "output_points") and (
+                name not in streaming
+            ):
                 pts_list.append(problem.input_pts[name])
                 self.condition_names.append(name)
+                self.forcing.append(
+                    self._evaluate_forcing(condition, pts_list[-1], device)
+                )
 
         self.pts = LabelTensor.vstack(pts_list)
 
@@ -38,11 +153,172 @@ class SamplePointDataset(Dataset):
         self.pts = self.pts.to(device)
         self.condition_indeces = self.condition_indeces.to(device)
 
+        # the problem points of each condition, to detect the changed ones
+        self._sources = pts_list
+        self._counts = [len(pts) for pts in pts_list]
+
+        # the shard of the points, in a parallel training
+        self._rank = 0
+        self._world_size = 1
+
+    def shard(self, rank, world_size, device=None):
+        """
+        Keep only the shard of the points of each condition of a rank, in a
+        parallel training: a contiguous block of ``ceil(count /
+        world_size)`` points. The shards of the ranks are disjoint, but for
+        the first points of the condition, repeated to give every rank the
+        same number of points. The following updates (see :meth:`update`)
+        keep the same shard.
+
+        :param int rank: The rank.
+        :param int world_size: The number of ranks.
+        :param torch.device device: The device of the rank. Default is
+            ``None``, i.e. the current device.
+        """
+        device = device or self.pts.device
+        self._rank = rank
+        self._world_size = world_size
+        if len(self) == 0:
+            return
+
+        rows, start = [], 0
+        for i, count in enumerate(self._counts):
+            local = _shard_rows(count, rank, world_size, self.pts.device)
+            if self.forcing[i] is not None:
+                self.forcing[i] = self.forcing[i].index_select(0, local)
+                self.forcing[i] = self.forcing[i].to(device)
+            rows.append(local + start)
+            start += count
+            self._counts[i] = len(local)
+        rows = torch.cat(rows)
+
+        labels = self.pts.labels
+        self.pts = SamplePointLoader._label(
+            self.pts.tensor.index_select(0, rows).to(device), labels
+        )
+        self.condition_indeces = self.condition_indeces.index_select(
+            0, rows
+        ).to(device)
+
+    def _local_points(self, pts):
+        """
+        Return the shard of some points of a condition.
+
+        :param LabelTensor pts: The points of the condition.
+        :return: The points of the shard.
+        :rtype: LabelTensor
+        """
+        if self._world_size == 1:
+            return pts
+        rows = _shard_rows(len(pts), self._rank, self._world_size, pts.device)
+        return SamplePointLoader._label(
+            pts.tensor.index_select(0, rows), pts.labels
+        )
+
+    def changed_conditions(self, problem):
+        """
+        Return the conditions whose points have changed in the problem, e.g.
+        after an adaptive refinement or
+        :meth:`~pina.problem.abstract_problem.AbstractProblem.add_points`.
+
+        :param AbstractProblem problem: The problem, with the same sample
+            conditions of the one used to create the dataset.
+        :return: The names of the changed conditions.
+        :rtype: list(str)
+        """
+        return [
+            name
+            for name, source in zip(self.condition_names, self._sources)
+            if problem.input_pts.get(name) is not source
+        ]
+
+    def update(self, problem):
+        """
+        Update the points of the conditions whose points have changed in the
+        problem, see :meth:`changed_conditions`. Only the segment of the
+        changed conditions is replaced: in place if the number of points is
+        unchanged, otherwise the segment is resized.
+
+        :param AbstractProblem problem: The problem, with the same sample
+            conditions of the one used to create the dataset.
+        :return: The names of the updated conditions.
+        :rtype: list(str)
+        """
+        updated = self.changed_conditions(problem)
+        for name in updated:
+            i = self.condition_names.index(name)
+            source = problem.input_pts[name]
+            pts = self._local_points(source)
+
+            start = sum(self._counts[:i])
+            end = start + self._counts[i]
+            labels = self.pts.labels
+            new_pts = pts.extract(labels).tensor.to(self.pts.device)
+
+            if len(pts) == self._counts[i]:
+                with torch.no_grad():
+                    self.pts.tensor[start:end].copy_(new_pts)
+            else:
+                self.pts = torch.cat(
+                    [self.pts.tensor[:start], new_pts, self.pts.tensor[end:]]
+                ).as_subclass(LabelTensor)
+                self.pts.labels = labels
+                self.condition_indeces = torch.cat(
+                    [
+                        self.condition_indeces[:start],
+                        torch.full(
+                            (len(pts),),
+                            i,
+                            dtype=self.condition_indeces.dtype,
+                            device=self.condition_indeces.device,
+                        ),
+                        self.condition_indeces[end:],
+                    ]
+                )
+
+            self.forcing[i] = self._evaluate_forcing(
+                problem.conditions[name], pts, self.pts.device
+            )
+            self._sources[i] = source
+            self._counts[i] = len(pts)
+        return updated
+
+    @staticmethod
+    def _evaluate_forcing(condition, pts, device):
+        """
+        Evaluate the input-only ``forcing`` of the condition equation on the
+        condition sample points.
+
+        :param Condition condition: The condition.
+        :param LabelTensor pts: The sample points of the condition.
+        :param torch.device device: The device where to store the forcing.
+        :return: The forcing on the points, or ``None`` if the condition
+            equation has no ``forcing``.
+        :rtype: torch.Tensor
+        """
+        forcing = getattr(condition.equation, "forcing", None)
+        if forcing is None:
+            return None
+        with torch.no_grad():
+            values = forcing(pts.to(device).detach())
+        return torch.as_tensor(values).as_subclass(torch.Tensor)
+
     def __len__(self):
         return self.pts.shape[0]
 
 
 class DataPointDataset(Dataset):
+    """
+    This class is used to create a dataset of data points.
+
+    If the points of some data condition are
+    :class:`~pina.dataset.MemoryMappedPoints`, the dataset is *memory-mapped*:
+    the points are not stacked nor copied to the device, and they are read
+    from the files, and moved to the device, only when a batch is requested
+    (see :meth:`read`).
+
+    :var bool memory_mapped: If ``True``, the points are read lazily.
+    """
 
     def __init__(self, problem, device) -> None:
         super().__init__()
@@ -56,10 +332,29 @@ class DataPointDataset(Dataset):
                 output_list.append(problem.conditions[name].output_points)
                 self.condition_names.append(name)
 
-        self.input_pts = LabelTensor.vstack(input_list)
-        self.output_pts = LabelTensor.vstack(output_list)
+        self.memory_mapped = any(
+            isinstance(pts, MemoryMappedPoints)
+            for pts in input_list + output_list
+        )
+        self.device = torch.device(device)
 
-        if self.input_pts != []:
+        self._counts = [len(pts) for pts in input_list]
+        if self.memory_mapped:
+            # the sources of the points of each condition, read by batch
+            self._input_sources = input_list
+            self._output_sources = output_list
+            self._starts = [
+                sum(self._counts[:i]) for i in range(len(self._counts))
+            ]
+            # the rows of the sources in the shard, in a parallel training
+            self._rows = None
+            self.input_pts = None
+            self.output_pts = None
+        else:
+            self.input_pts = LabelTensor.vstack(input_list)
+            self.output_pts = LabelTensor.vstack(output_list)
+
+        if input_list:
             self.condition_indeces = torch.cat(
                 [
                     torch.tensor([i] * len(input_list[i]))
@@ -72,12 +367,244 @@ class DataPointDataset(Dataset):
             self.input_pts = torch.tensor([])
             self.output_pts = torch.tensor([])
 
-        self.input_pts = self.input_pts.to(device)
-        self.output_pts = self.output_pts.to(device)
+        if not self.memory_mapped:
+            self.input_pts = self.input_pts.to(device)
+            self.output_pts = self.output_pts.to(device)
         self.condition_indeces = self.condition_indeces.to(device)
 
+    def shard(self, rank, world_size, device=None):
+        """
+        Keep only the shard of the points of each condition of a rank, in a
+        parallel training, see :meth:`SamplePointDataset.shard`. The points
+        of a memory-mapped dataset are not read, only the rows of the shard
+        are stored.
+
+        :param int rank: The rank.
+        :param int world_size: The number of ranks.
+        :param torch.device device: The device of the rank. Default is
+            ``None``, i.e. the current device.
+        """
+        device = torch.device(device or self.device)
+        if len(self) == 0:
+            self.device = device
+            return
+
+        local_rows = [
+            _shard_rows(count, rank, world_size) for count in self._counts
+        ]
+        start = 0
+        rows = []
+        for i, local in enumerate(local_rows):
+            rows.append(local + start)
+            start += self._counts[i]
+            self._counts[i] = len(local)
+        rows = torch.cat(rows).to(self.condition_indeces.device)
+
+        if self.memory_mapped:
+            self._rows = local_rows
+            self._starts = [
+                sum(self._counts[:i]) for i in range(len(self._counts))
+            ]
+        else:
+            for name in ["input_pts", "output_pts"]:
+                pts = getattr(self, name)
+                selected = pts.tensor.index_select(0, rows).to(device)
+                selected = SamplePointLoader._label(selected, pts.labels)
+                setattr(self, name, selected)
+        self.condition_indeces = self.condition_indeces.index_select(
+            0, rows
+        ).to(device)
+        self.device = device
+
+    def read(self, rows, pin_memory=False):
+        """
+        Read the input and output points at some rows of the dataset, and
+        move them to the device. The rows of each condition are read in
+        increasing order, so that the reads are sequential in the files.
+
+        :param rows: The rows to read. If a tensor, the rows must be grouped
+            by condition.
+        :type rows: slice | torch.Tensor
+        :param bool pin_memory: If ``True`` and the device is a GPU, the
+            points read from the files are staged in pinned memory and copied
+            to the device asynchronously. Default is ``False``.
+        :return: The input and output points.
+        :rtype: tuple(LabelTensor)
+        """
+        if not self.memory_mapped:
+            return (
+                self._read_source(self.input_pts, rows),
+                self._read_source(self.output_pts, rows),
+            )
+
+        if isinstance(rows, torch.Tensor):
+            rows = rows.cpu()
+        input_chunks, output_chunks = [], []
+        for i, (start, count) in enumerate(zip(self._starts, self._counts)):
+            if isinstance(rows, slice):
+                begin = max(rows.start, start) - start
+                end = min(rows.stop, start + count) - start
+                if begin >= end:
+                    continue
+                index = slice(begin, end)
+            else:
+                index = rows[(rows >= start) & (rows < start + count)]
+                if index.numel() == 0:
+                    continue
+                index = index - start
+            if self._rows is not None:
+                index = self._rows[i][index]
+            if isinstance(index, torch.Tensor):
+                index = index.sort().values
+            input_chunks.append(
+                self._read_source(self._input_sources[i], index)
+            )
+            output_chunks.append(
+                self._read_source(self._output_sources[i], index)
+            )
+
+        input_pts = LabelTensor.vstack(input_chunks)
+        output_pts = LabelTensor.vstack(output_chunks)
+        if pin_memory and self.device.type == "cuda":
+            return (
+                self._to_device_pinned(input_pts),
+                self._to_device_pinned(output_pts),
+            )
+        return input_pts.to(self.device), output_pts.to(self.device)
+
+    def _to_device_pinned(self, pts):
+        """
+        Copy some points to the device through a pinned staging buffer.
+
+        :param LabelTensor pts: The points, on the CPU.
+        :return: The points on the device.
+        :rtype: LabelTensor
+        """
+        staged = pts.tensor.pin_memory()
+        return SamplePointLoader._label(
+            staged.to(self.device, non_blocking=True), pts.labels
+        )
+
+    @staticmethod
+    def _read_source(source, index):
+        """
+        Read some rows of the points of a condition.
+
+        :param source: The points.
+        :type source: LabelTensor | MemoryMappedPoints
+        :param index: The rows to read.
+        :type index: slice | torch.Tensor
+        :return: The points read.
+        :rtype: LabelTensor
+        """
+        if isinstance(source, MemoryMappedPoints):
+            if isinstance(index, torch.Tensor) and (
+                index.numel() > 1 and (index.diff() == 1).all()
+            ):
+                # contiguous rows are read as a slice
+                index = slice(int(index[0]), int(index[-1]) + 1)
+            return source[index]
+        if isinstance(index, slice):
+            values = source.tensor[index]
+        else:
+            values = source.tensor.index_select(0, index.to(source.device))
+        return SamplePointLoader._label(values, source.labels)
+
+    def __len__(self):
+        return self.condition_indeces.shape[0]
+
+
+class StreamingPointDataset(Dataset):
+    """
+    This class is used to draw the points of the streaming conditions (see
+    :class:`~pina.condition.Condition`) at every training step. The points
+    are drawn directly on the device with a dedicated random generator, and
+    they are never stored.
+
+    :var condition_names: The names of the streaming conditions.
+    :vartype condition_names: list[str]
+    :var torch.Generator generator: The random generator, on ``device``.
+    """
+
+    def __init__(self, problem, device, dtype=None, seed=None) -> None:
+        """
+        :param AbstractProblem problem: The problem.
+        :param torch.device device: The device where the points are drawn.
+        :param torch.dtype dtype: The dtype of the points. Default is
+            ``None``, i.e. the default dtype.
+        :param int seed: The seed of the random generator. Default is
+            ``None``, i.e. the initial seed of the global random generator,
+            so that seeding ``torch`` makes the points reproducible.
+        """
+        super().__init__()
+        self.condition_names = problem.streaming_conditions
+        self.conditions = [
+            problem.conditions[name] for name in self.condition_names
+        ]
+        self.labels = sorted(problem.input_variables)
+        self.device = torch.device(device)
+        self.dtype = dtype or torch.get_default_dtype()
+        self.seed = torch.initial_seed() if seed is None else seed
+        self.generator = torch.Generator(device=self.device)
+        self.generator.manual_seed(self.seed)
+        # the number of points drawn for each condition
+        self.stream_points = [
+            condition.stream_points for condition in self.conditions
+        ]
+
+    def shard(self, rank, world_size, device=None):
+        """
+        Draw only the share of the points of each condition of a rank, in a
+        parallel training: every rank draws ``ceil(stream_points /
+        world_size)`` points of each condition, with a generator seeded with
+        ``seed + rank``.
+
+        :param int rank: The rank.
+        :param int world_size: The number of ranks.
+        :param torch.device device: The device of the rank. Default is
+            ``None``, i.e. the current device.
+        """
+        self.device = torch.device(device or self.device)
+        self.stream_points = [
+            ceil(condition.stream_points / world_size)
+            for condition in self.conditions
+        ]
+        self.generator = torch.Generator(device=self.device)
+        self.generator.manual_seed(self.seed + rank)
+
+    def sample(self, labels=None):
+        """
+        Draw fresh points for every streaming condition.
+
+        :param list(str) labels: The order of the input variables in the
+            columns of the points. Default is ``None``, i.e. sorted.
+        :return: The points and the ``forcing`` of the equation (see
+            :class:`~pina.equation.equation.Equation`), or ``None``, of each
+            streaming condition.
+        :rtype: tuple(list(torch.Tensor))
+        """
+        labels = labels or self.labels
+        pts_list, forcing_list = [], []
+        for condition, n in zip(self.conditions, self.stream_points):
+            pts = condition.location.sample_tensor(
+                n,
+                labels,
+                device=self.device,
+                dtype=self.dtype,
+                generator=self.generator,
+            )
+            pts_list.append(pts)
+            forcing_list.append(
+                SamplePointDataset._evaluate_forcing(
+                    condition,
+                    SamplePointLoader._label(pts, labels),
+                    self.device,
+                )
+            )
+        return pts_list, forcing_list
+
     def __len__(self):
-        return self.input_pts.shape[0]
+        return sum(self.stream_points)
 
 
 class SamplePointLoader:
@@ -90,16 +617,54 @@ class SamplePointLoader:
     """
 
     def __init__(
-        self, sample_dataset, data_dataset, batch_size=None, shuffle=True
+        self,
+        sample_dataset,
+        data_dataset,
+        batch_size=None,
+        shuffle=True,
+        stream_dataset=None,
+        prefetch=0,
+        pin_memory=False,
     ) -> None:
         """
         Constructor.
 
         :param SamplePointDataset sample_pts: The sample points dataset.
-        :param int batch_size: The batch size. If ``None``, the batch size is
-            set to the number of sample points. Default is ``None``.
-        :param bool shuffle: If ``True``, the sample points are shuffled.
-            Default is ``True``.
+        :param batch_size: The batch size. If ``None``, the batch size is
+            set to the number of sample points. If a ``dict``, it maps the
+            condition names to the number (``int``) or the fraction
+            (``float``) of points of the condition in each batch, and every
+            batch contains that number of points of every condition; the
+            conditions not in the ``dict`` are included entirely in every
+            batch. The number of batches is the one needed to visit all the
+            points of every condition, the points of the conditions needing
+            less batches are reused cyclically. Default is ``None``.
+        :type batch_size: int | dict
+        :param shuffle: If ``True``, the points are reshuffled at every epoch
+            (i.e. every time the loader is iterated), and the order of the
+            batches is shuffled. If ``"stratified"``, the points are
+            reshuffled at every epoch within each condition, and every batch
+            contains the same fraction of the points of each condition. If
+            ``False``, the batches are fixed. The permutations are generated
+            on the device of the points, and only the points of a batch are
+            gathered, when the batch is requested. For a memory-mapped
+            ``data_dataset`` (see :class:`DataPointDataset`), ``True`` only
+            shuffles the order of the batches of data points, which are
+            read contiguously from the files. Default is ``True``.
+        :type shuffle: bool | str
+        :param StreamingPointDataset stream_dataset: The streaming
+            conditions. Fresh points of every streaming condition are drawn
+            for every batch of sample points, and appended to the batch.
+            Default is ``None``.
+        :param int prefetch: The number of batches prepared ahead by a
+            background thread while the current batch is used, so that
+            reading the batches from the files (see
+            :class:`MemoryMappedPoints`), gathering the shuffled points and
+            drawing the streaming points overlap with the training step. If
+            0, the batches are prepared when requested. Default is 0.
+        :param bool pin_memory: If ``True``, the data points read from the
+            files are staged in pinned memory before being copied to the GPU,
+            see :meth:`DataPointDataset.read`. Default is ``False``.
         """
         if not isinstance(sample_dataset, SamplePointDataset):
             raise TypeError(
@@ -109,44 +674,185 @@ class SamplePointLoader:
             raise TypeError(
                 f"Expected DataPointDataset, got {type(data_dataset)}"
             )
+        if stream_dataset is not None and not isinstance(
+            stream_dataset, StreamingPointDataset
+        ):
+            raise TypeError(
+                f"Expected StreamingPointDataset, got {type(stream_dataset)}"
+            )
+        stream_names = (
+            stream_dataset.condition_names if stream_dataset is not None else []
+        )
+        if isinstance(prefetch, bool) or not isinstance(prefetch, int):
+            raise TypeError(f"prefetch must be an int, got {type(prefetch)}")
+        if prefetch < 0:
+            raise ValueError(f"prefetch must be non-negative, got {prefetch}")
+        if shuffle not in (True, False, "stratified"):
+            raise ValueError(
+                f"shuffle must be True, False or 'stratified', got {shuffle}"
+            )
+
+        if isinstance(batch_size, dict):
+            names = (
+                sample_dataset.condition_names + data_dataset.condition_names
+            )
+            for name, size in batch_size.items():
+                if name in stream_names:
+                    raise ValueError(
+                        f"The batch size of the streaming condition {name} "
+                        "is given by its stream_points"
+                    )
+                if name not in names:
+                    raise ValueError(f"Unknown condition {name} in batch_size")
+                if (
+                    isinstance(size, bool)
+                    or not isinstance(size, (int, float))
+                    or size <= 0
+                    or (isinstance(size, float) and size > 1)
+                ):
+                    raise ValueError(
+                        "batch_size values must be positive int or float "
+                        f"fractions in (0, 1], got {size} for {name}"
+                    )
 
+        self.shuffle = shuffle
+        self.batch_size = batch_size
+        self.prefetch = prefetch
+        self.pin_memory = pin_memory
         self.n_data_conditions = len(data_dataset.condition_names)
-        self.n_phys_conditions = len(sample_dataset.condition_names)
-        data_dataset.condition_indeces += self.n_phys_conditions
+        self.n_phys_conditions = len(sample_dataset.condition_names) + len(
+            stream_names
+        )
 
+        self.stream_dataset = stream_dataset
         self._prepare_sample_dataset(sample_dataset, batch_size, shuffle)
         self._prepare_data_dataset(data_dataset, batch_size, shuffle)
 
         self.condition_names = (
-            sample_dataset.condition_names + data_dataset.condition_names
+            sample_dataset.condition_names
+            + stream_names
+            + data_dataset.condition_names
         )
 
+        self._build_batch_list()
+
+    def _build_batch_list(self):
+        """
+        Build the list of the batches, and reset the rows of the batches of
+        the current epoch.
+        """
         self.batch_list = []
-        for i in range(len(self.batch_sample_pts)):
+        for i in range(self._n_sample_batches):
             self.batch_list.append(("sample", i))
 
-        for i in range(len(self.batch_input_pts)):
+        for i in range(self._n_data_batches):
             self.batch_list.append(("data", i))
 
-        if shuffle:
-            self.random_idx = torch.randperm(len(self.batch_list))
-        else:
-            self.random_idx = torch.arange(len(self.batch_list))
+        # the rows of the batches in the current epoch, None for the fixed
+        # batches (no shuffle, or a single batch)
+        self._sample_rows = None
+        self._data_rows = None
+
+    def update(self, problem):
+        """
+        Update the loader after the sample points of some conditions of the
+        problem have changed, e.g. after an adaptive refinement. Only the
+        points of the changed conditions are replaced in the sample dataset
+        (see :meth:`SamplePointDataset.update`), and the data points are not
+        touched. The loader is updated in place, so it can be used while it
+        is being iterated by the trainer, starting from the next epoch.
+
+        :param AbstractProblem problem: The problem.
+        :return: ``True`` if the loader has been updated, ``False`` if the
+            conditions of the problem have changed and a new loader must be
+            created.
+        :rtype: bool
+        """
+        streaming = problem.streaming_conditions
+        sample_names, data_names = [], []
+        for name, condition in problem.conditions.items():
+            if hasattr(condition, "output_points"):
+                data_names.append(name)
+            elif name not in streaming:
+                sample_names.append(name)
+        stream_names = (
+            self.stream_dataset.condition_names
+            if self.stream_dataset is not None
+            else []
+        )
+        if (
+            sample_names != self.sample_dataset.condition_names
+            or data_names != self.data_dataset.condition_names
+            or streaming != stream_names
+        ):
+            return False
+
+        if self.sample_dataset.update(problem):
+            self._prepare_sample_dataset(
+                self.sample_dataset, self.batch_size, self.shuffle
+            )
+            self._build_batch_list()
+        return True
+
+    def shard(self, rank, world_size, device=None):
+        """
+        Keep only the shard of the points of a rank, in a parallel training,
+        see :meth:`SamplePointDataset.shard`. Every rank has the same number
+        of points of each condition, so the ranks iterate the same number of
+        batches, with the same number of points of each condition.
+
+        :param int rank: The rank.
+        :param int world_size: The number of ranks.
+        :param torch.device device: The device of the rank. Default is
+            ``None``, i.e. the current device.
+        """
+        self.sample_dataset.shard(rank, world_size, device)
+        self.data_dataset.shard(rank, world_size, device)
+        if self.stream_dataset is not None:
+            self.stream_dataset.shard(rank, world_size, device)
+        self._prepare_sample_dataset(
+            self.sample_dataset, self.batch_size, self.shuffle
+        )
+        self._prepare_data_dataset(
+            self.data_dataset, self.batch_size, self.shuffle
+        )
+        self._build_batch_list()
 
     def _prepare_data_dataset(self, dataset, batch_size, shuffle):
         """
         Prepare the dataset for data points.
 
-        :param SamplePointDataset dataset: The dataset.
+        :param DataPointDataset dataset: The dataset.
         :param int batch_size: The batch size.
-        :param bool shuffle: If ``True``, the sample points are shuffled.
+        :param bool shuffle: If ``True``, the data points are shuffled.
         """
-        self.sample_dataset = dataset
+        self.data_dataset = dataset
+        # the data conditions follow the physics ones in the batches, the
+        # dataset is not modified since it may be shared among loaders
+        self._data_conditions = (
+            dataset.condition_indeces + self.n_phys_conditions
+        )
+        self._data_plan = None
+        self._n_data_batches = 0
+        self.batch_data_conditions = []
+        self.batch_data_slices = []
+        self.batch_input_pts = []
+        self.batch_output_pts = []
+        self.batch_data_rows = []
 
         if len(dataset) == 0:
-            self.batch_data_conditions = []
-            self.batch_input_pts = []
-            self.batch_output_pts = []
+            return
+
+        if isinstance(batch_size, dict):
+            plan = self._plan_batches(
+                dataset.condition_names,
+                self._data_conditions,
+                batch_size,
+                offset=self.n_phys_conditions,
+            )
+            if plan[1]:
+                self._data_plan = plan
+                self._n_data_batches = plan[1]
             return
 
         if batch_size is None:
@@ -154,43 +860,121 @@ class SamplePointLoader:
         batch_num = len(dataset) // batch_size
         if len(dataset) % batch_size != 0:
             batch_num += 1
+        self._n_data_batches = batch_num
+        self.tensor_conditions = self._data_conditions
+
+        self.batch_data_conditions = torch.tensor_split(
+            self.tensor_conditions, batch_num
+        )
+        self.batch_data_slices = [
+            self._condition_slices(conditions)
+            for conditions in self.batch_data_conditions
+        ]
+
+        if dataset.memory_mapped:
+            # the batches are read from the files when requested
+            start = 0
+            for conditions in self.batch_data_conditions:
+                end = start + conditions.shape[0]
+                self.batch_data_rows.append(slice(start, end))
+                start = end
+            return
 
         output_labels = dataset.output_pts.labels
         input_labels = dataset.input_pts.labels
-        self.tensor_conditions = dataset.condition_indeces
 
-        if shuffle:
-            idx = torch.randperm(dataset.input_pts.shape[0])
-            self.input_pts = dataset.input_pts[idx]
-            self.output_pts = dataset.output_pts[idx]
-            self.tensor_conditions = dataset.condition_indeces[idx]
+        self.batch_input_pts = [
+            self._label(batch, input_labels)
+            for batch in torch.tensor_split(dataset.input_pts.tensor, batch_num)
+        ]
+        self.batch_output_pts = [
+            self._label(batch, output_labels)
+            for batch in torch.tensor_split(
+                dataset.output_pts.tensor, batch_num
+            )
+        ]
 
-        self.batch_input_pts = torch.tensor_split(dataset.input_pts, batch_num)
-        self.batch_output_pts = torch.tensor_split(
-            dataset.output_pts, batch_num
-        )
+    @staticmethod
+    def _label(tensor, labels):
+        """
+        Label a tensor, without copying it.
 
-        for i in range(len(self.batch_input_pts)):
-            self.batch_input_pts[i].labels = input_labels
-            self.batch_output_pts[i].labels = output_labels
+        :param torch.Tensor tensor: The tensor.
+        :param list(str) labels: The labels.
+        :return: The labelled tensor.
+        :rtype: LabelTensor
+        """
+        tensor = tensor.as_subclass(LabelTensor)
+        tensor.labels = labels
+        return tensor
 
-        self.batch_data_conditions = torch.tensor_split(
-            self.tensor_conditions, batch_num
-        )
+    @staticmethod
+    def _condition_slices(conditions):
+        """
+        Compute the rows of each condition in a batch, whose points are
+        grouped by condition.
+
+        :param torch.Tensor conditions: The condition indeces of the batch.
+        :return: The dictionary mapping the condition index to the
+            ``slice`` of its rows in the batch.
+        :rtype: dict
+        """
+        ids, counts = torch.unique_consecutive(conditions, return_counts=True)
+        slices = {}
+        start = 0
+        for condition_id, count in zip(ids.tolist(), counts.tolist()):
+            slices[condition_id] = slice(start, start + count)
+            start += count
+        return slices
+
+    @staticmethod
+    def _condition_starts(conditions, n_conditions, offset=0):
+        """
+        Compute the first row and the number of rows of each condition in a
+        dataset, whose points are grouped by condition.
+
+        :param torch.Tensor conditions: The condition indeces of the dataset.
+        :param int n_conditions: The number of conditions.
+        :param int offset: The index of the first condition. Default is 0.
+        :return: The first rows and the number of rows of the conditions.
+        :rtype: tuple(list(int))
+        """
+        counts = torch.bincount(
+            conditions.long() - offset, minlength=n_conditions
+        ).tolist()
+        starts = [sum(counts[:i]) for i in range(len(counts))]
+        return starts, counts
 
     def _prepare_sample_dataset(self, dataset, batch_size, shuffle):
         """
         Prepare the dataset for sample points.
 
-        :param DataPointDataset dataset: The dataset.
+        :param SamplePointDataset dataset: The dataset.
         :param int batch_size: The batch size.
         :param bool shuffle: If ``True``, the sample points are shuffled.
         """
 
         self.sample_dataset = dataset
+        self._sample_plan = None
+        self._n_sample_batches = 0
+        self.batch_sample_conditions = []
+        self.batch_sample_slices = []
+        self.batch_sample_pts = []
+        self.batch_sample_forcing = []
+
         if len(dataset) == 0:
-            self.batch_sample_conditions = []
-            self.batch_sample_pts = []
+            # only the streaming points, if any, in a single batch
+            if self.stream_dataset is not None and len(self.stream_dataset):
+                self._n_sample_batches = 1
+            return
+
+        if isinstance(batch_size, dict):
+            plan = self._plan_batches(
+                dataset.condition_names, dataset.condition_indeces, batch_size
+            )
+            if plan[1]:
+                self._sample_plan = plan
+                self._n_sample_batches = plan[1]
             return
 
         if batch_size is None:
@@ -199,15 +983,11 @@ class SamplePointLoader:
         batch_num = len(dataset) // batch_size
         if len(dataset) % batch_size != 0:
             batch_num += 1
+        self._n_sample_batches = batch_num
 
         self.tensor_pts = dataset.pts
         self.tensor_conditions = dataset.condition_indeces
 
-        # if shuffle:
-        #     idx = torch.randperm(self.tensor_pts.shape[0])
-        #     self.tensor_pts = self.tensor_pts[idx]
-        #     self.tensor_conditions = self.tensor_conditions[idx]
-
         self.batch_sample_pts = torch.tensor_split(self.tensor_pts, batch_num)
         for i in range(len(self.batch_sample_pts)):
             self.batch_sample_pts[i].labels = dataset.pts.labels
@@ -215,40 +995,433 @@ class SamplePointLoader:
         self.batch_sample_conditions = torch.tensor_split(
             self.tensor_conditions, batch_num
         )
+        self.batch_sample_slices = [
+            self._condition_slices(conditions)
+            for conditions in self.batch_sample_conditions
+        ]
+        self.batch_sample_forcing = self._split_forcing(
+            dataset, self.batch_sample_pts
+        )
+
+    @staticmethod
+    def _split_forcing(dataset, batches):
+        """
+        Split the precomputed forcing of the conditions into the batches.
+        The sample points of each condition are contiguous, so the forcing of
+        a condition in a batch is a view of its precomputed forcing.
+
+        :param SamplePointDataset dataset: The dataset.
+        :param list(LabelTensor) batches: The batches of sample points.
+        :return: For each batch, the dictionary mapping the index of the
+            conditions having a forcing to its value on the batch points.
+        :rtype: list(dict)
+        """
+        starts, counts = SamplePointLoader._condition_starts(
+            dataset.condition_indeces, len(dataset.condition_names)
+        )
+
+        batch_forcing = []
+        batch_start = 0
+        for batch in batches:
+            batch_end = batch_start + batch.shape[0]
+            forcing = {}
+            for i, values in enumerate(dataset.forcing):
+                if values is None:
+                    continue
+                begin = max(batch_start, starts[i]) - starts[i]
+                end = min(batch_end, starts[i] + counts[i]) - starts[i]
+                if begin < end:
+                    forcing[i] = values[begin:end]
+            batch_forcing.append(forcing)
+            batch_start = batch_end
+        return batch_forcing
+
+    @staticmethod
+    def _plan_batches(names, conditions, batch_size, offset=0):
+        """
+        Compute the number of points of each condition in every batch, and
+        the number of batches, for per-condition batch sizes.
+
+        :param list(str) names: The names of the conditions of the dataset.
+        :param torch.Tensor conditions: The condition indeces of the dataset.
+        :param dict batch_size: The number or fraction of points of the
+            conditions in every batch.
+        :param int offset: The index of the first condition. Default is 0.
+        :return: The number of points of each condition in a batch, and the
+            number of batches, which is 0 if all the conditions are empty.
+        :rtype: tuple(list(int), int)
+        """
+        _, counts = SamplePointLoader._condition_starts(
+            conditions, len(names), offset
+        )
+        sizes = []
+        for name, count in zip(names, counts):
+            size = batch_size.get(name, count)
+            if isinstance(size, float):
+                size = ceil(size * count)
+            sizes.append(min(size, count))
+        # no batches if all the conditions are empty, e.g. in a shard
+        batch_num = max(
+            (ceil(count / size) for count, size in zip(counts, sizes) if size),
+            default=0,
+        )
+        return sizes, batch_num
+
+    def _planned_rows(self, conditions, plan, offset=0):
+        """
+        Draw the rows of the batches for a new epoch, for per-condition
+        batch sizes. The points of each condition are visited in a random
+        order if ``shuffle`` is enabled, and reused cyclically if the
+        condition needs less batches than the others.
+
+        :param torch.Tensor conditions: The condition indeces of the dataset.
+        :param tuple plan: The batch plan, see :meth:`_plan_batches`.
+        :param int offset: The index of the first condition. Default is 0.
+        :return: The rows of each batch, grouped by condition.
+        :rtype: list(torch.Tensor)
+        """
+        sizes, batch_num = plan
+        starts, counts = self._condition_starts(conditions, len(sizes), offset)
+        device = conditions.device
+
+        chunks = []
+        for start, count, size in zip(starts, counts, sizes):
+            if size == 0:
+                continue
+            if self.shuffle:
+                order = torch.randperm(count, device=device)
+            else:
+                order = torch.arange(count, device=device)
+            positions = torch.arange(batch_num * size, device=device) % count
+            chunks.append((order[positions] + start).view(batch_num, size))
+        return list(torch.cat(chunks, dim=1).unbind(0))
+
+    def _epoch_rows(self, conditions, n_conditions, batch_num, offset=0):
+        """
+        Draw the rows of the batches for a new epoch.
+
+        :param torch.Tensor conditions: The condition indeces of the dataset.
+        :param int n_conditions: The number of conditions.
+        :param int batch_num: The number of batches.
+        :param int offset: The index of the first condition. Default is 0.
+        :return: The rows of each batch, grouped by condition, or ``None`` if
+            the fixed batches are used.
+        :rtype: list(torch.Tensor)
+        """
+        if not self.shuffle or batch_num <= 1:
+            return None
+
+        device = conditions.device
+        if self.shuffle == "stratified":
+            starts, counts = self._condition_starts(
+                conditions, n_conditions, offset
+            )
+            chunks = [
+                torch.tensor_split(
+                    torch.randperm(count, device=device) + start, batch_num
+                )
+                for start, count in zip(starts, counts)
+            ]
+            return [
+                torch.cat([chunk[i] for chunk in chunks])
+                for i in range(batch_num)
+            ]
+
+        # the conditions are sorted in the dataset, so sorting the rows of a
+        # batch groups them by condition
+        permutation = torch.randperm(conditions.shape[0], device=device)
+        return [
+            rows.sort().values
+            for rows in torch.tensor_split(permutation, batch_num)
+        ]
+
+    def _sample_batch(self, idx_):
+        """
+        Return the ``idx_``-th batch of sample points of the current epoch,
+        with fresh points of the streaming conditions.
+        """
+        if len(self.sample_dataset) == 0:
+            d = {"pts": None, "condition": None, "slices": {}}
+        else:
+            d = self._stored_sample_batch(idx_)
+        if self.stream_dataset is not None and len(self.stream_dataset):
+            d = self._stream_batch(d)
+        return d
+
+    def _stream_batch(self, d):
+        """
+        Append fresh points of the streaming conditions to a batch of sample
+        points.
+
+        :param dict d: The batch of sample points.
+        :return: The batch with the streaming points.
+        :rtype: dict
+        """
+        if d["pts"] is not None:
+            labels = d["pts"].labels
+        else:
+            labels = self.stream_dataset.labels
+        pts_list, forcing_list = self.stream_dataset.sample(labels)
+        chunks, conditions = [], []
+        if d["pts"] is not None:
+            chunks.append(d["pts"].tensor)
+            conditions.append(d["condition"])
+        # the batch dictionaries may be shared among the epochs
+        slices = dict(d["slices"])
+        forcing = dict(d.get("forcing", {}))
+
+        start = sum(chunk.shape[0] for chunk in chunks)
+        offset = len(self.sample_dataset.condition_names)
+        for j, (pts, values) in enumerate(zip(pts_list, forcing_list)):
+            condition_id = offset + j
+            chunks.append(pts)
+            conditions.append(
+                torch.full(
+                    (pts.shape[0],),
+                    condition_id,
+                    dtype=torch.long,
+                    device=pts.device,
+                )
+            )
+            slices[condition_id] = slice(start, start + pts.shape[0])
+            start += pts.shape[0]
+            if values is not None:
+                forcing[condition_id] = values
+
+        d = {
+            "pts": self._label(torch.cat(chunks), labels),
+            "condition": torch.cat(conditions),
+            "slices": slices,
+        }
+        if forcing:
+            d["forcing"] = forcing
+        return d
+
+    def _stored_sample_batch(self, idx_):
+        """
+        Return the ``idx_``-th batch of the stored sample points of the
+        current epoch.
+        """
+        if self._sample_rows is None:
+            d = {
+                "pts": self.batch_sample_pts[idx_],
+                "condition": self.batch_sample_conditions[idx_],
+                "slices": self.batch_sample_slices[idx_],
+            }
+            if self.batch_sample_forcing[idx_]:
+                d["forcing"] = self.batch_sample_forcing[idx_]
+            return d
+
+        dataset = self.sample_dataset
+        rows = self._sample_rows[idx_]
+        conditions = dataset.condition_indeces[rows]
+        slices = self._condition_slices(conditions)
+        d = {
+            "pts": self._label(
+                dataset.pts.tensor.index_select(0, rows), dataset.pts.labels
+            ),
+            "condition": conditions,
+            "slices": slices,
+        }
+        forcing = {
+            i: dataset.forcing[i].index_select(
+                0, rows[slices[i]] - self._sample_starts[i]
+            )
+            for i in slices
+            if dataset.forcing[i] is not None
+        }
+        if forcing:
+            d["forcing"] = forcing
+        return d
+
+    def _data_batch(self, idx_):
+        """
+        Return the ``idx_``-th batch of data points of the current epoch.
+        """
+        dataset = self.data_dataset
+        if self._data_rows is None:
+            if dataset.memory_mapped:
+                input_pts, output_pts = dataset.read(
+                    self.batch_data_rows[idx_], self.pin_memory
+                )
+                return {
+                    "pts": input_pts,
+                    "output": output_pts,
+                    "condition": self.batch_data_conditions[idx_],
+                    "slices": self.batch_data_slices[idx_],
+                }
+            return {
+                "pts": self.batch_input_pts[idx_],
+                "output": self.batch_output_pts[idx_],
+                "condition": self.batch_data_conditions[idx_],
+                "slices": self.batch_data_slices[idx_],
+            }
+
+        rows = self._data_rows[idx_]
+        conditions = self._data_conditions[rows]
+        if dataset.memory_mapped:
+            input_pts, output_pts = dataset.read(rows, self.pin_memory)
+            return {
+                "pts": input_pts,
+                "output": output_pts,
+                "condition": conditions,
+                "slices": self._condition_slices(conditions),
+            }
+        return {
+            "pts": self._label(
+                dataset.input_pts.tensor.index_select(0, rows),
+                dataset.input_pts.labels,
+            ),
+            "output": self._label(
+                dataset.output_pts.tensor.index_select(0, rows),
+                dataset.output_pts.labels,
+            ),
+            "condition": conditions,
+            "slices": self._condition_slices(conditions),
+        }
+
+    def _new_epoch(self):
+        """
+        Draw the batches of a new epoch, and return the order in which they
+        are iterated.
+
+        :return: The indeces of the batches in ``batch_list``.
+        :rtype: list(int)
+        """
+        if self._sample_plan is not None:
+            self._sample_rows = self._planned_rows(
+                self.sample_dataset.condition_indeces, self._sample_plan
+            )
+        elif len(self.sample_dataset):
+            self._sample_rows = self._epoch_rows(
+                self.sample_dataset.condition_indeces,
+                len(self.sample_dataset.condition_names),
+                self._n_sample_batches,
+            )
+        if len(self.sample_dataset):
+            self._sample_starts, _ = self._condition_starts(
+                self.sample_dataset.condition_indeces,
+                len(self.sample_dataset.condition_names),
+            )
+
+        if self._data_plan is not None:
+            self._data_rows = self._planned_rows(
+                self._data_conditions,
+                self._data_plan,
+                offset=self.n_phys_conditions,
+            )
+        elif self._n_data_batches and not (
+            self.data_dataset.memory_mapped and self.shuffle is True
+        ):
+            # the memory-mapped batches are read contiguously from the
+            # files, only their order is shuffled
+            self._data_rows = self._epoch_rows(
+                self._data_conditions,
+                self.n_data_conditions,
+                self._n_data_batches,
+                offset=self.n_phys_conditions,
+            )
+        if self.shuffle:
+            return torch.randperm(len(self.batch_list)).tolist()
+        return range(len(self.batch_list))
 
     def __iter__(self):
         """
         Return an iterator over the points. Any element of the iterator is a
         dictionary with the following keys:
             - ``pts``: The input sample points. It is a LabelTensor with the
-                shape ``(batch_size, input_dimension)``.
+                shape ``(batch_size, input_dimension)``. The batches of
+                sample points end with the points of the streaming
+                conditions, freshly drawn for every batch.
             - ``output``: The output sample points. This key is present only
                 if data conditions are present. It is a LabelTensor with the
                 shape ``(batch_size, output_dimension)``.
             - ``condition``: The integer condition indeces. It is a tensor
                 with the shape ``(batch_size, )`` of type ``torch.int64`` and
                 indicates for any ``pts`` the corresponding problem condition.
+            - ``slices``: The rows of each condition. The points of a batch
+                are grouped by condition, and this dictionary maps the index
+                of the conditions in the batch to the ``slice`` of their
+                rows, so that ``pts[slices[i]]`` is a view of the points of
+                the ``i``-th condition.
+            - ``forcing``: The precomputed equation forcing, see
+                :class:`~pina.equation.equation.Equation`. This key is present
+                only if some condition in the batch has a forcing. It is a
+                dictionary mapping the condition index to the forcing on the
+                points of the condition, in the same order of ``pts``.
 
         :return: An iterator over the points.
         :rtype: iter
         """
-        # for i in self.random_idx:
-        for i in range(len(self.batch_list)):
-            type_, idx_ = self.batch_list[i]
-
-            if type_ == "sample":
-                d = {
-                    "pts": self.batch_sample_pts[idx_].requires_grad_(True),
-                    "condition": self.batch_sample_conditions[idx_],
-                }
-            else:
-                d = {
-                    "pts": self.batch_input_pts[idx_].requires_grad_(True),
-                    "output": self.batch_output_pts[idx_],
-                    "condition": self.batch_data_conditions[idx_],
-                }
+        order = self._new_epoch()
+        batches = (self._batch(i) for i in order)
+        if self.prefetch:
+            batches = self._prefetched(batches)
+        for d in batches:
+            d["pts"].requires_grad_(True)
             yield d
 
+    def _batch(self, i):
+        """
+        Return the ``i``-th batch of ``batch_list`` in the current epoch.
+        """
+        type_, idx_ = self.batch_list[i]
+        if type_ == "sample":
+            return self._sample_batch(idx_)
+        return self._data_batch(idx_)
+
+    def _prefetched(self, batches):
+        """
+        Prepare the batches in a background thread, at most ``prefetch``
+        batches ahead of the consumer.
+
+        :param iter batches: The iterator preparing the batches.
+        :return: An iterator over the same batches.
+        :rtype: iter
+        """
+        queue = Queue(maxsize=self.prefetch)
+        stop = Event()
+        end = object()
+
+        def put(item):
+            # give up if the consumer has stopped iterating
+            while not stop.is_set():
+                try:
+                    queue.put(item, timeout=0.1)
+                    return True
+                except Full:
+                    continue
+            return False
+
+        def produce():
+            try:
+                for d in batches:
+                    if not put(d):
+                        return
+            except Exception as error:  # re-raised in the consumer
+                put(error)
+                return
+            put(end)
+
+        thread = Thread(target=produce, daemon=True)
+        thread.start()
+        try:
+            while True:
+                item = queue.get()
+                if item is end:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            stop.set()
+            try:
+                while True:
+                    queue.get_nowait()
+            except Empty:
+                pass
+            thread.join()
+
     def __len__(self):
         """
         Return the number of batches.
@@ -5,8 +5,25 @@ __all__ = [
     "FixedGradient",
     "FixedFlux",
     "Laplace",
+    "Burgers",
+    "Heat",
+    "Wave",
+    "AdvectionDiffusion",
+    "Stokes",
+    "NavierStokes",
 ]
 
 from .equation import Equation
-from .equation_factory import FixedFlux, FixedGradient, Laplace, FixedValue
+from .equation_factory import (
+    FixedFlux,
+    FixedGradient,
+    Laplace,
+    FixedValue,
+    Burgers,
+    Heat,
+    Wave,
+    AdvectionDiffusion,
+    Stokes,
+    NavierStokes,
+)
 from .system_equation import SystemEquation
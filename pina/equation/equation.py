@@ -5,7 +5,7 @@ from .equation_interface import EquationInterface
 
 class Equation(EquationInterface):
 
-    def __init__(self, equation):
+    def __init__(self, equation, forcing=None):
         """
         Equation class for specifing any equation in PINA.
         Each ``equation`` passed to a ``Condition`` object
@@ -14,6 +14,21 @@ class Equation(EquationInterface):
         :param equation: A ``torch`` callable equation to
             evaluate the residual.
         :type equation: Callable
+        :param forcing: A ``torch`` callable ``forcing(input_)`` depending
+            only on the input points, e.g. a source term. It is subtracted
+            from the ``equation`` evaluation to obtain the residual. Since it
+            does not depend on the model output, the solvers evaluate it once
+            on the sampled points of the condition, and reuse its value at
+            every training step. Default is ``None``.
+        :type forcing: Callable
+
+        :Example:
+            >>> def laplace(input_, output_):
+            ...     return laplacian(output_, input_)
+            >>> def source(input_):
+            ...     x, y = input_.extract(['x']), input_.extract(['y'])
+            ...     return torch.sin(torch.pi * x) * torch.sin(torch.pi * y)
+            >>> poisson = Equation(laplace, forcing=source)
         """
         if not callable(equation):
             raise ValueError(
@@ -21,9 +36,16 @@ class Equation(EquationInterface):
                 "Expected a callable function, got "
                 f"{equation}"
             )
+        if forcing is not None and not callable(forcing):
+            raise ValueError(
+                "forcing must be a callable function."
+                "Expected a callable function, got "
+                f"{forcing}"
+            )
         self.__equation = equation
+        self.forcing = forcing
 
-    def residual(self, input_, output_, params_=None):
+    def residual(self, input_, output_, params_=None, forcing_=None):
         """
         Residual computation of the equation.
 
@@ -37,6 +59,9 @@ class Equation(EquationInterface):
             computed as ``equation(input_, output_)``.
             Otherwise, the parameters are automatically initialized in the
             ranges specified by the user.
+        :param torch.Tensor forcing_: The value of the ``forcing`` on the
+            input points, if already computed. If ``None`` and a ``forcing``
+            is defined, it is evaluated on ``input_``. Default is ``None``.
 
         :return: The residual evaluation of the specified equation.
         :rtype: LabelTensor
@@ -45,4 +70,8 @@ class Equation(EquationInterface):
             result = self.__equation(input_, output_)
         else:
             result = self.__equation(input_, output_, params_)
+        if self.forcing is not None:
+            if forcing_ is None:
+                forcing_ = self.forcing(input_)
+            result = result - forcing_
         return result
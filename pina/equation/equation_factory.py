@@ -1,7 +1,10 @@
 """ Module """
 
+import torch
+
 from .equation import Equation
-from ..operators import grad, div, laplacian
+from ..label_tensor import LabelTensor
+from ..operators import grad, div, laplacian, hessian
 
 
 class FixedValue(Equation):
@@ -103,3 +106,336 @@ class Laplace(Equation):
             return laplacian(output_, input_, components=components, d=d)
 
         super().__init__(equation)
+
+
+def _spatial_variables(input_, d, time):
+    """
+    Return the spatial variables, by default all the input variables except
+    the time.
+
+    :raises ValueError: if ``time`` is not ``None`` and it is not an input
+        variable.
+    """
+    if time is not None and time not in input_.labels:
+        raise ValueError(
+            f"time variable {time} not in the input labels {input_.labels}"
+        )
+    if d is None:
+        return [var for var in input_.labels if var != time]
+    return list(d)
+
+
+def _check_velocity(velocity, d):
+    """
+    Check that the velocity has one component for each spatial variable.
+
+    :raises ValueError: if ``velocity`` and ``d`` have different length.
+    """
+    if len(velocity) != len(d):
+        raise ValueError(
+            f"the velocity components {velocity} do not match the spatial "
+            f"variables {d}"
+        )
+
+
+def _residual(result, labels):
+    """
+    Label the residual tensor.
+    """
+    result = result.as_subclass(LabelTensor)
+    result.labels = labels
+    return result
+
+
+def _gradient_and_laplacian(output_, input_, components, d, time):
+    """
+    Compute the gradient with respect to ``d`` and ``time``, and the
+    Laplacian with respect to ``d``, of the ``components`` of ``output_``.
+    Each component is differentiated once, and its second derivatives are
+    computed from its gradient. The components are differentiated one at a
+    time: differentiating the Jacobian of all the components, computed by
+    a batched reverse pass, was measured to be slower, since each of its
+    columns is backpropagated through the graph of all the components.
+
+    :return: the gradient of shape ``[N, len(components), len(d) + 1]``
+        (the last column being the time derivative, if ``time`` is not
+        ``None``) and the Laplacian of shape ``[N, len(components)]``.
+    :rtype: tuple(torch.Tensor)
+    """
+    variables = d if time is None else d + [time]
+    gradients, laplacians = [], []
+    for c in components:
+        gradient = grad(output_, input_, components=[c], d=variables)
+        second = grad(
+            gradient, input_, components=gradient.labels[: len(d)], d=d
+        )
+        second = second.tensor.reshape(-1, len(d), len(d))
+        gradients.append(gradient.tensor)
+        laplacians.append(second.diagonal(dim1=1, dim2=2).sum(dim=-1))
+    gradient = torch.stack(gradients, dim=1)
+    return gradient, torch.stack(laplacians, dim=1)
+
+
+class Burgers(Equation):
+
+    def __init__(self, viscosity, components=None, d=None, time="t"):
+        r"""
+        Burgers Equation class. This class can be used to enforce the
+        viscous Burgers equation
+        :math:`\partial_t u + (u \cdot \nabla) u - \nu \Delta u = 0`.
+        Each component is differentiated once, and its gradient is shared
+        by the time derivative, the convection and the Laplacian.
+
+        :param float viscosity: The viscosity :math:`\nu`.
+        :param list(str) components: the name of the output
+            variables representing the velocity. It should have the same
+            length of ``d``. If ``None``, all the output variables are
+            considered. Default is ``None``.
+        :param list(str) d: the name of the spatial input variables. If
+            ``None``, all the input variables except ``time`` are considered.
+            Default is ``None``.
+        :param str time: the name of the time variable, ``None`` for the
+            steady equation. Default is ``t``.
+        :raises ValueError: if ``components`` and ``d`` have different
+            length.
+        """
+        if components is not None and d is not None:
+            _check_velocity(components, d)
+
+        def equation(input_, output_):
+            velocity = components or output_.labels
+            space = _spatial_variables(input_, d, time)
+            _check_velocity(velocity, space)
+            gradient, laplace = _gradient_and_laplacian(
+                output_, input_, velocity, space, time
+            )
+            convection = torch.einsum(
+                "nkd,nd->nk",
+                gradient[..., : len(space)],
+                output_.extract(velocity).tensor,
+            )
+            result = convection - viscosity * laplace
+            if time is not None:
+                result = result + gradient[..., -1]
+            return _residual(result, velocity)
+
+        super().__init__(equation)
+
+
+class Heat(Equation):
+
+    def __init__(self, diffusivity, components=None, d=None, time="t"):
+        r"""
+        Heat Equation class. This class can be used to enforce the heat
+        equation :math:`\partial_t u - \alpha \Delta u = 0`. Each component
+        is differentiated once, and its gradient is shared by the time
+        derivative and the Laplacian.
+
+        :param float diffusivity: The diffusivity :math:`\alpha`.
+        :param list(str) components: the name of the output
+            variables to enforce the equation for. If ``None``, all the
+            output variables are considered. Default is ``None``.
+        :param list(str) d: the name of the spatial input variables. If
+            ``None``, all the input variables except ``time`` are considered.
+            Default is ``None``.
+        :param str time: the name of the time variable, ``None`` for the
+            steady equation. Default is ``t``.
+        """
+
+        def equation(input_, output_):
+            fields = components or output_.labels
+            space = _spatial_variables(input_, d, time)
+            gradient, laplace = _gradient_and_laplacian(
+                output_, input_, fields, space, time
+            )
+            result = -diffusivity * laplace
+            if time is not None:
+                result = result + gradient[..., -1]
+            return _residual(result, fields)
+
+        super().__init__(equation)
+
+
+class Wave(Equation):
+
+    def __init__(self, speed, components=None, d=None, time="t"):
+        r"""
+        Wave Equation class. This class can be used to enforce the wave
+        equation :math:`\partial_{tt} u - c^2 \Delta u = 0`. The second
+        derivatives of each component are computed from its gradient, see
+        :func:`~pina.operators.hessian`.
+
+        :param float speed: The wave speed :math:`c`.
+        :param list(str) components: the name of the output
+            variables to enforce the equation for. If ``None``, all the
+            output variables are considered. Default is ``None``.
+        :param list(str) d: the name of the spatial input variables. If
+            ``None``, all the input variables except ``time`` are considered.
+            Default is ``None``.
+        :param str time: the name of the time variable, ``None`` for the
+            steady equation. Default is ``t``.
+        """
+
+        def equation(input_, output_):
+            fields = components or output_.labels
+            space = _spatial_variables(input_, d, time)
+            variables = space if time is None else space + [time]
+            second = hessian(output_, input_, components=fields, d=variables)
+            second = second.tensor.reshape(
+                -1, len(fields), len(variables), len(variables)
+            )
+            second = second.diagonal(dim1=-2, dim2=-1)
+            result = -(speed**2) * second[..., : len(space)].sum(dim=-1)
+            if time is not None:
+                result = result + second[..., -1]
+            return _residual(result, fields)
+
+        super().__init__(equation)
+
+
+class AdvectionDiffusion(Equation):
+
+    def __init__(
+        self, velocity, diffusivity, components=None, d=None, time="t"
+    ):
+        r"""
+        Advection-Diffusion Equation class. This class can be used to enforce
+        the advection-diffusion equation, with constant velocity,
+        :math:`\partial_t u + \mathbf{v} \cdot \nabla u - D \Delta u = 0`.
+        Each component is differentiated once, and its gradient is shared
+        by the time derivative, the advection and the Laplacian.
+
+        :param list(float) velocity: The advection velocity
+            :math:`\mathbf{v}`, one value for each spatial variable.
+        :param float diffusivity: The diffusivity :math:`D`.
+        :param list(str) components: the name of the output
+            variables to enforce the equation for. If ``None``, all the
+            output variables are considered. Default is ``None``.
+        :param list(str) d: the name of the spatial input variables. If
+            ``None``, all the input variables except ``time`` are considered.
+            Default is ``None``.
+        :param str time: the name of the time variable, ``None`` for the
+            steady equation. Default is ``t``.
+        """
+
+        def equation(input_, output_):
+            fields = components or output_.labels
+            space = _spatial_variables(input_, d, time)
+            if len(velocity) != len(space):
+                raise ValueError(
+                    "velocity must have one value for each spatial variable"
+                )
+            gradient, laplace = _gradient_and_laplacian(
+                output_, input_, fields, space, time
+            )
+            spatial = gradient[..., : len(space)]
+            advection_ = spatial @ gradient.new_tensor(velocity)
+            result = advection_ - diffusivity * laplace
+            if time is not None:
+                result = result + gradient[..., -1]
+            return _residual(result, fields)
+
+        super().__init__(equation)
+
+
+class Stokes(Equation):
+
+    def __init__(self, viscosity=1.0, velocity=None, pressure="p", d=None):
+        r"""
+        Stokes Equation class. This class can be used to enforce the steady
+        Stokes equations
+        :math:`-\nu \Delta \mathbf{u} + \nabla p = 0`,
+        :math:`\nabla \cdot \mathbf{u} = 0`. The residual has one column
+        for each velocity component, and the last one for the continuity
+        equation. Each output variable is differentiated once, and the
+        gradient of the velocity is shared by all the terms of the
+        equations.
+
+        :param float viscosity: The viscosity :math:`\nu`. Default is 1.0.
+        :param list(str) velocity: the name of the output variables
+            representing the velocity. It should have the same length of
+            ``d``. If ``None``, all the output variables except ``pressure``
+            are considered. Default is ``None``.
+        :param str pressure: the name of the pressure output variable.
+            Default is ``p``.
+        :param list(str) d: the name of the spatial input variables. If
+            ``None``, all the input variables are considered. Default is
+            ``None``.
+        """
+
+        def equation(input_, output_):
+            return _navier_stokes_residual(
+                input_, output_, viscosity, velocity, pressure, d, None, False
+            )
+
+        super().__init__(equation)
+
+
+class NavierStokes(Equation):
+
+    def __init__(
+        self, viscosity, velocity=None, pressure="p", d=None, time="t"
+    ):
+        r"""
+        Navier-Stokes Equation class. This class can be used to enforce the
+        incompressible Navier-Stokes equations
+        :math:`\partial_t \mathbf{u} + (\mathbf{u} \cdot \nabla)
+        \mathbf{u} - \nu \Delta \mathbf{u} + \nabla p = 0`,
+        :math:`\nabla \cdot \mathbf{u} = 0`. The residual has one column
+        for each velocity component, and the last one for the continuity
+        equation. Each output variable is differentiated once, and the
+        gradient of the velocity is shared by all the terms of the
+        equations.
+
+        :param float viscosity: The kinematic viscosity :math:`\nu`.
+        :param list(str) velocity: the name of the output variables
+            representing the velocity. It should have the same length of
+            ``d``. If ``None``, all the output variables except ``pressure``
+            are considered. Default is ``None``.
+        :param str pressure: the name of the pressure output variable.
+            Default is ``p``.
+        :param list(str) d: the name of the spatial input variables. If
+            ``None``, all the input variables except ``time`` are considered.
+            Default is ``None``.
+        :param str time: the name of the time variable, ``None`` for the
+            steady equations. Default is ``t``.
+        """
+
+        def equation(input_, output_):
+            return _navier_stokes_residual(
+                input_, output_, viscosity, velocity, pressure, d, time, True
+            )
+
+        super().__init__(equation)
+
+
+def _navier_stokes_residual(
+    input_, output_, viscosity, velocity, pressure, d, time, convective
+):
+    """
+    Residual of the (Navier-)Stokes equations, see :class:`Stokes` and
+    :class:`NavierStokes`.
+    """
+    if velocity is None:
+        velocity = [label for label in output_.labels if label != pressure]
+    space = _spatial_variables(input_, d, time)
+    _check_velocity(velocity, space)
+
+    gradient, laplace = _gradient_and_laplacian(
+        output_, input_, velocity, space, time
+    )
+    spatial = gradient[..., : len(space)]
+    grad_p = grad(output_, input_, components=[pressure], d=space).tensor
+
+    momentum = -viscosity * laplace + grad_p
+    if convective:
+        momentum = momentum + torch.einsum(
+            "nkd,nd->nk", spatial, output_.extract(velocity).tensor
+        )
+    if time is not None:
+        momentum = momentum + gradient[..., -1]
+    continuity = spatial.diagonal(dim1=-2, dim2=-1).sum(dim=-1, keepdim=True)
+    div_label = "+".join(f"d{c}d{di}" for c, di in zip(velocity, space))
+    return _residual(
+        torch.cat((momentum, continuity), dim=1), velocity + [div_label]
+    )
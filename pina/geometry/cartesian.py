@@ -156,9 +156,7 @@ class CartesianDomain(Location):
 
                     tmp.append(pts_variable)
 
-            result = tmp[0]
-            for i in tmp[1:]:
-                result = result.append(i, mode="cross")
+            result = LabelTensor.cartesian_product(tmp)
 
             for variable in variables:
                 if variable in self.fixed_.keys():
@@ -247,6 +245,37 @@ class CartesianDomain(Location):
         else:
             raise ValueError(f"mode={mode} is not valid.")
 
+    def sample_tensor(
+        self, n, variables, device=None, dtype=None, generator=None
+    ):
+        """Sample ``n`` random points directly on ``device``, see
+        :meth:`~pina.geometry.location.Location.sample_tensor`.
+
+        :param int n: Number of points to sample.
+        :param list[str] variables: The variables to sample, in the order of
+            the columns of the returned tensor.
+        :param torch.device device: The device of the points.
+        :param torch.dtype dtype: The dtype of the points.
+        :param torch.Generator generator: The random generator.
+        :return: The sampled points, with shape ``(n, len(variables))``.
+        :rtype: torch.Tensor
+
+        :Example:
+            >>> spatial_domain = CartesianDomain({'x': [0, 1], 'y': 0})
+            >>> spatial_domain.sample_tensor(3, ['x', 'y'])
+                tensor([[0.4963, 0.0000],
+                        [0.7682, 0.0000],
+                        [0.0885, 0.0000]])
+        """
+        pts = torch.empty((n, len(variables)), device=device, dtype=dtype)
+        for i, variable in enumerate(variables):
+            if variable in self.range_:
+                low, high = self.range_[variable]
+                pts[:, i].uniform_(low, high, generator=generator)
+            else:
+                pts[:, i].fill_(self.fixed_[variable])
+        return pts
+
     def is_inside(self, point, check_border=False):
         """Check if a point is inside the ellipsoid.
 
@@ -195,6 +195,45 @@ class EllipsoidDomain(Location):
 
         return pts
 
+    def sample_tensor(
+        self, n, variables, device=None, dtype=None, generator=None
+    ):
+        """Sample ``n`` random points directly on ``device``, see
+        :meth:`~pina.geometry.location.Location.sample_tensor`.
+
+        :param int n: Number of points to sample.
+        :param list[str] variables: The variables to sample, in the order of
+            the columns of the returned tensor.
+        :param torch.device device: The device of the points.
+        :param torch.dtype dtype: The dtype of the points.
+        :param torch.Generator generator: The random generator.
+        :return: The sampled points, with shape ``(n, len(variables))``.
+        :rtype: torch.Tensor
+        """
+        ranged = [var for var in variables if var in self.range_]
+        pts = torch.empty((n, len(variables)), device=device, dtype=dtype)
+        if ranged:
+            # same strategy of _sample_range, on the unit sphere first
+            sphere = torch.randn(
+                (n, len(ranged)),
+                device=device,
+                dtype=pts.dtype,
+                generator=generator,
+            )
+            sphere /= torch.linalg.norm(sphere, dim=-1, keepdim=True)
+            if not self._sample_surface:
+                sphere *= torch.rand(
+                    (n, 1), device=device, dtype=pts.dtype, generator=generator
+                )
+        for i, variable in enumerate(variables):
+            if variable in self.range_:
+                column = sphere[:, ranged.index(variable)]
+                column = column * self._axis[variable] + self._centers[variable]
+                pts[:, i] = column
+            else:
+                pts[:, i].fill_(self.fixed_[variable])
+        return pts
+
     def sample(self, n, mode="random", variables="all"):
         """Sample routine.
 
@@ -1,6 +1,7 @@
 """Module for Location class."""
 
 from abc import ABCMeta, abstractmethod
+import torch
 
 
 class Location(metaclass=ABCMeta):
@@ -17,6 +18,33 @@ class Location(metaclass=ABCMeta):
         """
         pass
 
+    def sample_tensor(
+        self, n, variables, device=None, dtype=None, generator=None
+    ):
+        """
+        Sample ``n`` random points from the location as a plain
+        :class:`torch.Tensor`, e.g. to draw fresh collocation points at every
+        training step. The default implementation calls :meth:`sample` with
+        ``random`` mode and moves the result to ``device``, so the points are
+        drawn on the CPU with the global random generator; the child classes
+        can override it to draw the points directly on ``device``.
+
+        :param int n: Number of points to sample.
+        :param list[str] variables: The variables to sample, in the order of
+            the columns of the returned tensor.
+        :param torch.device device: The device of the points. Default is
+            ``None``, i.e. the default device.
+        :param torch.dtype dtype: The dtype of the points. Default is
+            ``None``, i.e. the default dtype.
+        :param torch.Generator generator: The random generator, on
+            ``device``. Default is ``None``.
+        :return: The sampled points, with shape ``(n, len(variables))``.
+        :rtype: torch.Tensor
+        """
+        pts = self.sample(n, mode="random", variables=list(variables))
+        pts = pts.extract(list(variables)).as_subclass(torch.Tensor)
+        return pts.to(device=device, dtype=dtype or torch.get_default_dtype())
+
     @abstractmethod
     def is_inside(self, point, check_border=False):
         """
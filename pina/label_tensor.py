@@ -1,6 +1,8 @@
 """ Module for LabelTensor """
 
 from copy import deepcopy
+from functools import reduce
+from math import prod
 import torch
 from torch import Tensor
 
@@ -78,6 +80,27 @@ class LabelTensor(torch.Tensor):
                 "the passed labels."
             )
         self._labels = labels
+        self._label_to_index = None
+
+    @classmethod
+    def __torch_function__(cls, func, types, args=(), kwargs=None):
+        """
+        Dispatch torch functions on :class:`LabelTensor`. The labels of the
+        input tensor are attached as metadata to the output of the operations
+        listed in ``_LABEL_PRESERVING_FUNCTIONS`` (device and dtype
+        conversions, ``detach``, ``clone``, ...), so that no copy of the
+        tensor is needed to keep track of them.
+        """
+        result = super().__torch_function__(func, types, args, kwargs)
+        if (
+            func in _LABEL_PRESERVING_FUNCTIONS
+            and isinstance(result, LabelTensor)
+            and result is not args[0]
+            and hasattr(args[0], "_labels")
+        ):
+            result._labels = args[0]._labels
+            result._label_to_index = getattr(args[0], "_label_to_index", None)
+        return result
 
     def __deepcopy__(self, __):
         """
@@ -112,6 +135,22 @@ class LabelTensor(torch.Tensor):
             )
 
         self._labels = labels  # assign the label
+        self._label_to_index = None  # invalidate the label lookup map
+
+    @property
+    def label_to_index(self):
+        """
+        Map from each label to the index of the corresponding column. The map
+        is built lazily on first access and cached until labels are changed.
+
+        :return: the label to column index map
+        :rtype: dict
+        """
+        label_map = getattr(self, "_label_to_index", None)
+        if label_map is None:
+            label_map = {label: i for i, label in enumerate(self.labels)}
+            self._label_to_index = label_map
+        return label_map
 
     @staticmethod
     def vstack(label_tensors):
@@ -132,65 +171,88 @@ class LabelTensor(torch.Tensor):
             raise RuntimeError("The tensors to stack have different labels")
 
         labels = label_tensors[0].labels
-        tensors = [lt.extract(labels) for lt in label_tensors]
-        return LabelTensor(torch.vstack(tensors), labels)
+        dtype = reduce(torch.promote_types, [lt.dtype for lt in label_tensors])
+        stacked = torch.empty(
+            (sum(lt.shape[0] for lt in label_tensors),)
+            + tuple(label_tensors[0].shape[1:]),
+            dtype=dtype,
+            device=label_tensors[0].device,
+        )
+
+        # copy every tensor in its block of the preallocated output, the
+        # columns are reordered only if the labels are not already aligned
+        start = 0
+        for lt in label_tensors:
+            block = stacked.narrow(0, start, lt.shape[0])
+            if lt.labels == labels:
+                block.copy_(lt.tensor)
+            else:
+                label_map = lt.label_to_index
+                for i, label in enumerate(labels):
+                    block.select(-1, i).copy_(
+                        lt.tensor.select(-1, label_map[label])
+                    )
+            start += lt.shape[0]
+
+        return LabelTensor(stacked, labels)
 
-    def clone(self, *args, **kwargs):
+    @staticmethod
+    def cartesian_product(label_tensors):
         """
-        Clone the LabelTensor. For more details, see
-        :meth:`torch.Tensor.clone`.
-
-        :return: A copy of the tensor.
+        Compute the cartesian product of the rows of the passed tensors. The
+        rows of the first tensor vary the fastest, the rows of the last one
+        the slowest. The result is written in a single pass into a
+        preallocated tensor by broadcasting each input, without building any
+        intermediate repeated copy.
+
+        :param list(LabelTensor) label_tensors: the tensors to combine. They
+            need to have different labels.
+        :raises RuntimeError: if the tensors have common labels.
+        :return: the tensor with one row for each combination of the rows
+            of the input tensors.
         :rtype: LabelTensor
-        """
-        # # used before merging
-        # try:
-        #     out = LabelTensor(super().clone(*args, **kwargs), self.labels)
-        # except:
-        #     out = super().clone(*args, **kwargs)
-        out = LabelTensor(super().clone(*args, **kwargs), self.labels)
-        return out
-
-    def to(self, *args, **kwargs):
-        """
-        Performs Tensor dtype and/or device conversion. For more details, see
-        :meth:`torch.Tensor.to`.
-        """
-        tmp = super().to(*args, **kwargs)
-        new = self.__class__.clone(self)
-        new.data = tmp.data
-        return new
-
-    def select(self, *args, **kwargs):
-        """
-        Performs Tensor selection. For more details, see :meth:`torch.Tensor.select`.
-        """
-        tmp = super().select(*args, **kwargs)
-        tmp._labels = self._labels
-        return tmp
 
-    def cuda(self, *args, **kwargs):
-        """
-        Send Tensor to cuda. For more details, see :meth:`torch.Tensor.cuda`.
+        :Example:
+            >>> from pina import LabelTensor
+            >>> x = LabelTensor(torch.tensor([[0.], [1.]]), ['x'])
+            >>> y = LabelTensor(torch.tensor([[2.], [3.]]), ['y'])
+            >>> LabelTensor.cartesian_product([x, y])
+            tensor([[0., 2.],
+                    [1., 2.],
+                    [0., 3.],
+                    [1., 3.]])
         """
-        tmp = super().cuda(*args, **kwargs)
-        new = self.__class__.clone(self)
-        new.data = tmp.data
-        return new
+        labels = [label for lt in label_tensors for label in lt.labels]
+        if len(set(labels)) != len(labels):
+            raise RuntimeError("The tensors to merge have common labels")
 
-    def cpu(self, *args, **kwargs):
-        """
-        Send Tensor to cpu. For more details, see :meth:`torch.Tensor.cpu`.
-        """
-        tmp = super().cpu(*args, **kwargs)
-        new = self.__class__.clone(self)
-        new.data = tmp.data
-        return new
+        dtype = reduce(torch.promote_types, [lt.dtype for lt in label_tensors])
+        rows = [lt.shape[0] for lt in label_tensors]
+        result = torch.empty(
+            (prod(rows), len(labels)),
+            dtype=dtype,
+            device=label_tensors[0].device,
+        )
+
+        # the i-th tensor is broadcasted along the (n - 1 - i)-th axis of
+        # the result, seen as a (rows[-1], ..., rows[0], columns) tensor
+        grid = result.view(*reversed(rows), len(labels))
+        column = 0
+        for i, lt in enumerate(label_tensors):
+            shape = [1] * len(rows) + [lt.shape[1]]
+            shape[len(rows) - 1 - i] = rows[i]
+            grid[..., column : column + lt.shape[1]] = lt.tensor.reshape(shape)
+            column += lt.shape[1]
+
+        return LabelTensor(result, labels)
 
     def extract(self, label_to_extract):
         """
         Extract the subset of the original tensor by returning all the columns
-        corresponding to the passed ``label_to_extract``.
+        corresponding to the passed ``label_to_extract``. If the requested
+        columns are contiguous and in the same order of the labels, the
+        returned tensor is a view of the original one (no copy is performed),
+        otherwise the columns are gathered into a new tensor.
 
         :param label_to_extract: The label(s) to extract.
         :type label_to_extract: str | list(str) | tuple(str)
@@ -207,32 +269,26 @@ class LabelTensor(torch.Tensor):
                 "`label_to_extract` should be a str, or a str iterator"
             )
 
-        indeces = []
-        for f in label_to_extract:
-            try:
-                indeces.append(self.labels.index(f))
-            except ValueError:
-                raise ValueError(f"`{f}` not in the labels list")
-
-        new_data = super(Tensor, self.T).__getitem__(indeces).T
+        label_map = self.label_to_index
+        try:
+            indeces = [label_map[f] for f in label_to_extract]
+        except KeyError as err:
+            raise ValueError(f"`{err.args[0]}` not in the labels list")
         new_labels = [self.labels[idx] for idx in indeces]
 
+        start = indeces[0] if indeces else 0
+        if indeces == list(range(start, start + len(indeces))):
+            # contiguous columns in order: return a strided view
+            new_data = self.tensor.narrow(-1, start, len(indeces))
+        else:
+            index = torch.tensor(indeces, device=self.device)
+            new_data = self.tensor.index_select(-1, index)
+
         extracted_tensor = new_data.as_subclass(LabelTensor)
         extracted_tensor.labels = new_labels
 
         return extracted_tensor
 
-    def detach(self):
-        detached = super().detach()
-        if hasattr(self, "_labels"):
-            detached._labels = self._labels
-        return detached
-
-    def requires_grad_(self, mode=True):
-        lt = super().requires_grad_(mode)
-        lt.labels = self.labels
-        return lt
-
     def append(self, lt, mode="std"):
         """
         Return a copy of the merged tensors.
@@ -251,16 +307,7 @@ class LabelTensor(torch.Tensor):
         elif mode == "first":
             raise NotImplementedError
         elif mode == "cross":
-            tensor1 = self
-            tensor2 = lt
-            n1 = tensor1.shape[0]
-            n2 = tensor2.shape[0]
-
-            tensor1 = LabelTensor(tensor1.repeat(n2, 1), labels=tensor1.labels)
-            tensor2 = LabelTensor(
-                tensor2.repeat_interleave(n1, dim=0), labels=tensor2.labels
-            )
-            new_tensor = torch.cat((tensor1, tensor2), dim=1)
+            return LabelTensor.cartesian_product([self, lt])
 
         new_tensor = new_tensor.as_subclass(LabelTensor)
         new_tensor.labels = new_labels
@@ -316,3 +363,22 @@ class LabelTensor(torch.Tensor):
             s = "no labels\n"
         s += super().__str__()
         return s
+
+
+# torch functions whose output keeps the same columns of the input tensor
+_LABEL_PRESERVING_FUNCTIONS = frozenset(
+    [
+        Tensor.to,
+        Tensor.cpu,
+        Tensor.cuda,
+        Tensor.clone,
+        Tensor.detach,
+        Tensor.requires_grad_,
+        Tensor.contiguous,
+        Tensor.pin_memory,
+        Tensor.float,
+        Tensor.double,
+        Tensor.half,
+        Tensor.select,
+    ]
+)
@@ -1,13 +1,36 @@
+import warnings
+from contextlib import contextmanager
 import torch
 import torch.nn as nn
 from ..utils import check_consistency
 from ..label_tensor import LabelTensor
 
 
+def _compile_errors():
+    """
+    Return the exceptions raised by :func:`torch.compile` when a model can
+    not be compiled, as opposed to the errors of the model itself (e.g.
+    shape or device mismatches), which are raised as they are.
+    """
+    from torch._dynamo import exc
+
+    return (
+        exc.BackendCompilerFailed,
+        exc.InternalTorchDynamoError,
+        exc.InvalidBackend,
+        exc.Unsupported,
+    )
+
+
 class Network(torch.nn.Module):
 
     def __init__(
-        self, model, input_variables, output_variables, extra_features=None
+        self,
+        model,
+        input_variables,
+        output_variables,
+        extra_features=None,
+        raw_tensor=False,
     ):
         """
         Network class with standard forward method
@@ -23,6 +46,14 @@ class Network(torch.nn.Module):
             problem setting.
         :param extra_features: List of torch models to augment the input, defaults to None.
         :type extra_features: list(torch.nn.Module)
+        :param bool raw_tensor: If ``True`` the wrapped model is executed on
+            plain :class:`torch.Tensor` s: the input columns are resolved from
+            the labels once and cached, and the output is converted to
+            :class:`pina.label_tensor.LabelTensor` only at the end of the
+            forward. This avoids the :class:`pina.label_tensor.LabelTensor`
+            dispatch on every layer of the model, but it can be used only
+            with models which do not rely on labels (e.g. ``FeedForward``).
+            Default is ``False``.
         """
         super().__init__()
 
@@ -30,8 +61,13 @@ class Network(torch.nn.Module):
         check_consistency(model, nn.Module)
         check_consistency(input_variables, str)
         check_consistency(output_variables, str)
+        check_consistency(raw_tensor, bool)
 
         self._model = model
+        self._raw_tensor = raw_tensor
+        self._input_columns = {}
+        self._compiled_forward = None
+        self._graph_breaks = None
         self._input_variables = input_variables
         self._output_variables = output_variables
 
@@ -63,6 +99,9 @@ class Network(torch.nn.Module):
             x, LabelTensor
         ), "Expected LabelTensor as input to the model."
 
+        if self._raw_tensor:
+            return self._forward_raw(x)
+
         # extract torch.Tensor from corresponding label
         # in case `input_variables = []` all points are used
         if self._input_variables:
@@ -80,6 +119,139 @@ class Network(torch.nn.Module):
 
         return output
 
+    def _forward_raw(self, x):
+        """
+        Forward method used when ``raw_tensor=True``. The columns of the
+        input variables are resolved only the first time a given input
+        labelling is seen, then the model runs on :class:`torch.Tensor` s.
+
+        :param LabelTensor x: Input of the network.
+        :return LabelTensor: Output of the network.
+        """
+        if self._extra_features:
+            # extra features are user defined and may use labels
+            if self._input_variables:
+                x = x.extract(self._input_variables)
+            for feature in self._extra_features:
+                x = x.append(feature(x))
+            x = x.tensor
+        else:
+            columns = self._resolve_input_columns(x)
+            x = x.tensor
+            if isinstance(columns, slice):
+                x = x[..., columns]
+            else:
+                x = x.index_select(-1, columns)
+
+        # perform forward pass + converting to LabelTensor
+        output = self._run_model(x).as_subclass(LabelTensor)
+        output.labels = self._output_variables
+
+        return output
+
+    def _run_model(self, x):
+        """
+        Run the compiled model if available, otherwise the eager one. If the
+        model can not be compiled, compilation is disabled and the eager model
+        is used from then on, while the errors of the model itself are
+        raised. The number of graph breaks is recorded the first time the
+        compiled model runs.
+
+        :param torch.Tensor x: Input of the model.
+        :return torch.Tensor: Output of the model.
+        """
+        if self._compiled_forward is None:
+            return self._model(x)
+        if self._graph_breaks is None:
+            return self._first_compiled_run(x)
+        try:
+            return self._compiled_forward(x)
+        except _compile_errors() as err:
+            self.disable_compile(f"compiled forward failed with {err!r}")
+            return self._model(x)
+
+    def _first_compiled_run(self, x):
+        """
+        Run the compiled model for the first time, counting the graph breaks
+        of the compilation.
+
+        :param torch.Tensor x: Input of the model.
+        :return torch.Tensor: Output of the model.
+        """
+        from torch._dynamo.utils import counters
+
+        breaks = sum(counters["graph_break"].values())
+        try:
+            output = self._compiled_forward(x)
+        except _compile_errors() as err:
+            self.disable_compile(f"compiled forward failed with {err!r}")
+            return self._model(x)
+
+        self._graph_breaks = sum(counters["graph_break"].values()) - breaks
+        if self._graph_breaks > 0:
+            warnings.warn(
+                f"The compiled model has {self._graph_breaks} graph "
+                "breaks, see torch._dynamo.explain for details."
+            )
+        return output
+
+    def compile_model(self, **kwargs):
+        """
+        Compile the wrapped model with :func:`torch.compile`. The compiled
+        model is used only when ``raw_tensor=True``, since graphs can not be
+        captured on :class:`pina.label_tensor.LabelTensor` without breaks.
+        The parameters of the model are shared, so the ``state_dict`` is
+        unchanged.
+
+        :param kwargs: Keyword arguments passed to :func:`torch.compile`.
+        """
+        if not self._raw_tensor:
+            raise RuntimeError(
+                "Model compilation is available only with raw_tensor=True."
+            )
+        self._compiled_forward = torch.compile(self._model.forward, **kwargs)
+        self._graph_breaks = None
+
+    def disable_compile(self, reason=None):
+        """
+        Disable the compiled model and go back to eager execution.
+
+        :param str reason: The reason of the fallback, used in the warning.
+        """
+        if self._compiled_forward is None:
+            return
+        self._compiled_forward = None
+        warnings.warn(
+            "Falling back to eager execution"
+            + (f": {reason}." if reason else ".")
+        )
+
+    def _resolve_input_columns(self, x):
+        """
+        Return the columns of ``x`` corresponding to the input variables,
+        as a ``slice`` if they are contiguous, otherwise as an index tensor.
+        The result is cached for each input labelling and device.
+
+        :param LabelTensor x: Input of the network.
+        :return: The input columns.
+        :rtype: slice | torch.Tensor
+        """
+        key = (tuple(x.labels), x.device)
+        columns = self._input_columns.get(key)
+        if columns is None:
+            if self._input_variables:
+                label_map = x.label_to_index
+                indeces = [label_map[var] for var in self._input_variables]
+            else:
+                indeces = list(range(len(x.labels)))
+            start = indeces[0] if indeces else 0
+            if indeces == list(range(start, start + len(indeces))):
+                columns = slice(start, start + len(indeces))
+            else:
+                columns = torch.tensor(indeces, device=x.device)
+            self._input_columns[key] = columns
+        return columns
+
     # TODO to remove in next releases (only used in GAROM solver)
     def forward_map(self, x):
         """
@@ -112,6 +284,35 @@ class Network(torch.nn.Module):
     def torchmodel(self):
         return self._model
 
+    @contextmanager
+    def eager_mode(self):
+        """
+        Context manager running the eager model, also if the model is
+        compiled.
+        """
+        compiled_forward = self._compiled_forward
+        self._compiled_forward = None
+        try:
+            yield
+        finally:
+            self._compiled_forward = compiled_forward
+
     @property
     def extra_features(self):
         return self._extra_features
+
+    @property
+    def raw_tensor(self):
+        return self._raw_tensor
+
+    @property
+    def is_compiled(self):
+        return self._compiled_forward is not None
+
+    @property
+    def graph_breaks(self):
+        """
+        Number of graph breaks of the compiled model, ``None`` if the
+        compiled model has not run yet.
+        """
+        return self._graph_breaks
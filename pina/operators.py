@@ -6,15 +6,654 @@ to which computing the operator, the name of the output variables to calculate t
 for (in case of multidimensional functions), and the variables name on which the operator is calculated.
 """
 
+import warnings
+from math import pi, prod
 import torch
 
 from pina.label_tensor import LabelTensor
 
 
+class DerivativeCache:
+    """
+    Cache of the derivatives computed by the differential operators. While
+    the cache is active, i.e. inside a ``with`` block, the gradient of each
+    output component with respect to each input tensor is computed only once
+    and reused by all the subsequent calls of :func:`grad`, :func:`div`,
+    :func:`laplacian` and :func:`advection`. The derivatives are identified
+    by the output column they refer to, not by the tensor object, so that
+    columns extracted from the same output share the same entries. Higher
+    order derivatives are identified by the chain of components and input
+    variables they are computed from. The entries are freed when the ``with``
+    block is exited, while the number of hits and misses is kept.
+
+    :Example:
+        >>> from pina.operators import DerivativeCache, grad, laplacian
+        >>> cache = DerivativeCache()
+        >>> with cache:
+        ...     gradient = grad(output_, input_)
+        ...     laplace = laplacian(output_, input_)
+        >>> cache.hits, cache.misses
+
+    .. warning::
+        The cached derivatives are returned without copy, thus they must not
+        be modified in-place.
+    """
+
+    _active = None
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._previous = None
+        self.clear()
+
+    def __enter__(self):
+        self._previous = DerivativeCache._active
+        DerivativeCache._active = self
+        return self
+
+    def __exit__(self, *_):
+        DerivativeCache._active = self._previous
+        self._previous = None
+        self.clear()
+
+    def clear(self):
+        """
+        Free all the cached derivatives.
+        """
+        self._jacobians = {}
+        self._derived = {}
+        self._tensors = []
+        self._blocks = {}
+        self._block_columns = {}
+
+    # the autograd nodes of the views, which share the memory of their base
+    _VIEW_NODES = (
+        "AliasBackward0",
+        "AsStridedBackward0",
+        "SelectBackward0",
+        "SliceBackward0",
+        "ViewBackward0",
+    )
+
+    @staticmethod
+    def _column_key(tensor, index):
+        """
+        Identify the memory of a column of a tensor, and the autograd node it
+        comes from, so that different views of the same column share the
+        same key, while a detached alias of the column does not.
+        """
+        return (
+            tensor.untyped_storage().data_ptr(),
+            tensor.storage_offset() + index * tensor.stride(-1),
+            tensor.stride(0),
+            tensor.shape[0],
+            tensor.dtype,
+            tensor._version,
+            tensor.requires_grad,
+            DerivativeCache._autograd_source(tensor),
+        )
+
+    @staticmethod
+    def _autograd_source(tensor):
+        """
+        Return the autograd node a tensor comes from, skipping the views: the
+        node of the operation computing its base, or the identity of the leaf
+        tensor itself. ``None`` if the tensor does not require grad. The node
+        object is returned, and not its ``id``, since the Python object of a
+        node is created on access and it is the same only while alive.
+        """
+        if not tensor.requires_grad:
+            return None
+        node = tensor.grad_fn
+        if node is None:
+            return id(tensor)
+        while type(node).__name__ in DerivativeCache._VIEW_NODES:
+            node = node.next_functions[0][0]
+        if type(node).__name__ == "AccumulateGrad":
+            return id(node.variable)
+        return node
+
+    def _derivative_key(self, tensor, index):
+        """
+        Return the key of a column, which is the chain of components and
+        input variables if the column is a derivative computed while the
+        cache is active, otherwise the memory of the column itself.
+        """
+        key = self._column_key(tensor, index)
+        return self._derived.get(key, key)
+
+    def jacobian(self, output_, input_, components):
+        """
+        Return the gradient of the ``components`` of ``output_`` with respect
+        to all the columns of ``input_``, computing only the missing ones.
+
+        :param LabelTensor output_: the output tensor onto which computing the
+            Jacobian.
+        :param LabelTensor input_: the input tensor with respect to which
+            computing the Jacobian.
+        :param list(str) components: the name of the output variables to
+            differentiate.
+        :return: the Jacobian tensor of shape ``[len(components), N, D]``.
+        :rtype: torch.Tensor
+        """
+        label_map = output_.label_to_index
+        columns = [label_map[c] for c in components]
+
+        # rows of a tensor split by register_blocks: the derivatives are
+        # computed on the whole tensor, once for all the blocks
+        block = self._blocks.get(id(input_))
+        if block is not None:
+            sources = [
+                self._block_columns.get(self._column_key(output_, column))
+                for column in columns
+            ]
+            if None not in sources:
+                full_input, rows = block
+                return torch.stack(
+                    [
+                        self._columns_jacobian(tensor, full_input, [column])[
+                            0, rows
+                        ]
+                        for tensor, column in sources
+                    ]
+                )
+
+        return self._columns_jacobian(output_, input_, columns)
+
+    def _columns_jacobian(self, output_, input_, columns):
+        """
+        Return the gradient of the ``columns`` of ``output_`` with respect to
+        all the columns of ``input_``, computing only the missing ones.
+        """
+        keys = [
+            (self._derivative_key(output_, column), id(input_))
+            for column in columns
+        ]
+        missing = [
+            column
+            for column, key in zip(columns, keys)
+            if key not in self._jacobians
+        ]
+        self.misses += len(missing)
+        self.hits += len(columns) - len(missing)
+
+        if missing:
+            jacobian = _compute_jacobian(output_, input_, missing)
+            for column, row in zip(missing, jacobian):
+                key = (self._derivative_key(output_, column), id(input_))
+                self._jacobians[key] = _constant_like(row, jacobian)
+            # keep the tensors alive, so that their memory is not reused
+            self._tensors.extend([output_, input_])
+            if len(missing) == len(columns):
+                return jacobian
+
+        rows = [self._jacobians[key] for key in keys]
+        if len(columns) == 1:
+            jacobian = rows[0].unsqueeze(0)
+        else:
+            jacobian = torch.stack(rows)
+        # all the columns are constant derivatives, see _is_constant
+        if all(row.grad_fn is None for row in rows):
+            jacobian = jacobian.detach().requires_grad_()
+        return jacobian
+
+    def register_blocks(self, output_, input_, outputs, inputs):
+        """
+        Record that ``outputs`` and ``inputs`` are consecutive blocks of rows
+        of ``output_`` and ``input_`` respectively, e.g. the points of
+        different conditions evaluated by a single forward pass. The
+        derivatives of the blocks are then computed on the whole tensors by a
+        single reverse pass, and shared among all the blocks. Each row of
+        ``output_`` must depend only on the same row of ``input_``, while
+        the derivatives of the blocks must be computed with respect to
+        ``inputs``.
+
+        :param LabelTensor output_: the whole output tensor.
+        :param torch.Tensor input_: the whole input tensor.
+        :param list(LabelTensor) outputs: the blocks of ``output_``.
+        :param list(LabelTensor) inputs: the blocks of ``input_``.
+        """
+        start = 0
+        for output_block, input_block in zip(outputs, inputs):
+            stop = start + input_block.shape[0]
+            self._blocks[id(input_block)] = (input_, slice(start, stop))
+            for column in range(output_block.shape[-1]):
+                key = self._column_key(output_block, column)
+                self._block_columns[key] = (output_, column)
+            start = stop
+        self._tensors.extend([output_, input_, *outputs, *inputs])
+
+    def register(self, gradients, output_, input_, components, d):
+        """
+        Record that the columns of ``gradients`` are the derivatives of the
+        ``components`` of ``output_`` with respect to the ``d`` variables of
+        ``input_``, so that they can be further differentiated using the
+        cache.
+
+        :param LabelTensor gradients: the gradient tensor.
+        :param LabelTensor output_: the differentiated tensor.
+        :param LabelTensor input_: the input tensor.
+        :param list(str) components: the differentiated components.
+        :param list(str) d: the variables of differentiation.
+        """
+        label_map = output_.label_to_index
+        block = self._blocks.get(id(input_))
+        index = 0
+        for c in components:
+            key = self._derivative_key(output_, label_map[c])
+            source = None
+            if block is not None:
+                source = self._block_columns.get(
+                    self._column_key(output_, label_map[c])
+                )
+            for di in d:
+                column = self._column_key(gradients, index)
+                self._derived[column] = (key, id(input_), di)
+                if source is not None:
+                    # the column is a block of the whole derivative, unless
+                    # it was computed without the cache, e.g. by stencils
+                    tensor, source_column = source
+                    whole_key = (
+                        self._derivative_key(tensor, source_column),
+                        id(block[0]),
+                    )
+                    whole = self._jacobians.get(whole_key)
+                    if whole is not None:
+                        self._block_columns[column] = (
+                            whole,
+                            input_.label_to_index[di],
+                        )
+                index += 1
+        self._tensors.append(gradients)
+
+
+class StencilGrid:
+    """
+    Structured grid on which the derivatives are computed by finite
+    differences instead of automatic differentiation. The grid is the
+    cartesian product of uniformly spaced points, as sampled by
+    :meth:`~pina.geometry.cartesian.CartesianDomain.sample` with
+    ``mode='grid'``. While the grid is active, i.e. inside a ``with`` block,
+    the differential operators applied to a tensor evaluated on all the grid
+    points (in any order) compute the derivatives with respect to the grid
+    variables by second order finite difference stencils, thus without
+    building the graph for the double backward. The derivatives with respect
+    to other variables, or on tensors not evaluated on the grid, are still
+    computed by automatic differentiation.
+
+    :Example:
+        >>> grid = StencilGrid(['x', 'y'], [[0, 1], [0, 1]], [10, 10])
+        >>> with grid:
+        ...     laplace = laplacian(output_, input_)
+    """
+
+    _active = None
+
+    def __init__(self, variables, bounds, shape):
+        """
+        :param list(str) variables: the name of the grid variables.
+        :param list(list(float)) bounds: the extrema of each variable.
+        :param list(int) shape: the number of points for each variable.
+        """
+        self.variables = list(variables)
+        self.bounds = [list(bound) for bound in bounds]
+        self.shape = tuple(shape)
+        self.spacing = [
+            (b - a) / (n - 1) for (a, b), n in zip(self.bounds, self.shape)
+        ]
+        self._warned = False
+        self._last_index = None
+        self._previous = None
+
+    def __enter__(self):
+        self._previous = StencilGrid._active
+        StencilGrid._active = self
+        return self
+
+    def __exit__(self, *_):
+        StencilGrid._active = self._previous
+        self._previous = None
+        self._last_index = None
+
+    @property
+    def size(self):
+        """
+        The number of points of the grid.
+        """
+        return prod(self.shape)
+
+    def lattice_index(self, input_):
+        """
+        Return the position in the grid of each point of ``input_``, or
+        ``None`` if ``input_`` does not contain exactly the grid points.
+
+        :param LabelTensor input_: the input points.
+        :return: the flattened position in the grid of each point.
+        :rtype: torch.Tensor
+        """
+        if self._last_index is not None and self._last_index[0] is input_:
+            return self._last_index[1]
+
+        index = None
+        if input_.shape[0] == self.size and all(
+            var in input_.label_to_index for var in self.variables
+        ):
+            coords = input_.extract(self.variables).tensor.detach()
+            lower = coords.new_tensor([bound[0] for bound in self.bounds])
+            spacing = coords.new_tensor(self.spacing)
+            position = torch.round((coords - lower) / spacing)
+            on_lattice = (
+                (coords - lower - position * spacing).abs() <= 1e-3 * spacing
+            ).all()
+            position = position.long()
+            shape = torch.tensor(self.shape, device=position.device)
+            in_range = ((position >= 0) & (position < shape)).all()
+            if on_lattice and in_range:
+                strides = torch.tensor(
+                    [prod(self.shape[i + 1 :]) for i in range(len(self.shape))],
+                    device=position.device,
+                )
+                index = (position * strides).sum(dim=1)
+                if torch.unique(index).numel() != self.size:
+                    index = None
+
+        if index is None and not self._warned:
+            warnings.warn(
+                "The points are not the full stencil grid, derivatives are "
+                "computed by automatic differentiation.",
+                RuntimeWarning,
+            )
+            self._warned = True
+
+        self._last_index = (input_, index)
+        return index
+
+    def supports(self, input_, d, order=1):
+        """
+        Check if the derivatives with respect to the ``d`` variables of
+        ``input_`` can be computed on the grid.
+
+        :param LabelTensor input_: the input points.
+        :param list(str) d: the variables of differentiation.
+        :param int order: the order of the derivatives.
+        :rtype: bool
+        """
+        if not all(di in self.variables for di in d):
+            return False
+        if min(self.shape[self.variables.index(di)] for di in d) < order + 2:
+            return False
+        return self.lattice_index(input_) is not None
+
+    def _to_grid(self, values, input_):
+        """
+        Reorder the rows of ``values`` as the grid points, and reshape them
+        as a ``[*shape, columns]`` tensor.
+        """
+        index = self.lattice_index(input_)
+        grid_values = torch.empty_like(values).index_copy(0, index, values)
+        return grid_values.reshape(self.shape + (values.shape[-1],))
+
+    def _from_grid(self, grid_values, input_):
+        """
+        Inverse of :meth:`_to_grid`.
+        """
+        index = self.lattice_index(input_)
+        return grid_values.reshape(self.size, -1).index_select(0, index)
+
+    def jacobian(self, output_, input_, components, d):
+        """
+        Compute the gradient of the ``components`` of ``output_`` with respect
+        to the ``d`` variables of ``input_`` by second order central
+        differences (one sided at the grid boundary).
+
+        :param LabelTensor output_: the output tensor.
+        :param LabelTensor input_: the input tensor.
+        :param list(str) components: the components to differentiate.
+        :param list(str) d: the variables of differentiation.
+        :return: the Jacobian tensor of shape ``[len(components), N, D]``,
+            whose columns not in ``d`` are zero.
+        :rtype: torch.Tensor
+        """
+        values = output_.extract(components).tensor
+        grid_values = self._to_grid(values, input_)
+        jacobian = values.new_zeros(
+            (len(components), input_.shape[0], input_.shape[1])
+        )
+        for di in d:
+            axis = self.variables.index(di)
+            derivative = torch.gradient(
+                grid_values,
+                spacing=self.spacing[axis],
+                dim=axis,
+                edge_order=2,
+            )[0]
+            jacobian[..., input_.label_to_index[di]] = self._from_grid(
+                derivative, input_
+            ).T
+        return jacobian
+
+    def laplacian(self, output_, input_, components, d):
+        """
+        Compute the Laplacian of the ``components`` of ``output_`` with
+        respect to the ``d`` variables of ``input_`` by the second order
+        three points stencil (four points one sided stencil at the grid
+        boundary).
+
+        :param LabelTensor output_: the output tensor.
+        :param LabelTensor input_: the input tensor.
+        :param list(str) components: the components to differentiate.
+        :param list(str) d: the variables of differentiation.
+        :return: the Laplacian tensor of shape ``[N, len(components)]``.
+        :rtype: torch.Tensor
+        """
+        values = output_.extract(components).tensor
+        grid_values = self._to_grid(values, input_)
+        result = torch.zeros_like(grid_values)
+        for di in d:
+            axis = self.variables.index(di)
+            result = result + self._second_difference(
+                grid_values, self.spacing[axis], axis
+            )
+        return self._from_grid(result, input_)
+
+    @staticmethod
+    def _second_difference(values, spacing, axis):
+        """
+        Second derivative along ``axis`` of the grid values.
+        """
+        n = values.shape[axis]
+
+        def shift(start, length=n - 2):
+            return values.narrow(axis, start, length)
+
+        interior = shift(2) - 2 * shift(1) + shift(0)
+        first = (
+            2 * shift(0, 1) - 5 * shift(1, 1) + 4 * shift(2, 1) - shift(3, 1)
+        )
+        last = (
+            2 * shift(n - 1, 1)
+            - 5 * shift(n - 2, 1)
+            + 4 * shift(n - 3, 1)
+            - shift(n - 4, 1)
+        )
+        return torch.cat((first, interior, last), dim=axis) / spacing**2
+
+
+def _check_derivative_labels(input_, d):
+    """
+    Check that the ``d`` variables of differentiation are labels of
+    ``input_``.
+
+    :raises RuntimeError: if some variables are not labels of ``input_``.
+    """
+    if not all(di in input_.label_to_index for di in d):
+        raise RuntimeError("derivative labels missing from input tensor")
+
+
+def _stencil_grid(input_, d, order=1):
+    """
+    Return the active :class:`StencilGrid` if the derivatives with respect to
+    the ``d`` variables of ``input_`` can be computed on it, otherwise
+    ``None``.
+    """
+    grid = StencilGrid._active
+    if grid is not None and grid.supports(input_, d, order):
+        return grid
+    return None
+
+
+def _jacobian(output_, input_, components, d):
+    """
+    Compute the gradient of the ``components`` of ``output_`` with respect to
+    all the columns of ``input_``. If the active :class:`StencilGrid` (if
+    any) supports the ``d`` variables, they are computed by finite
+    differences, otherwise the active :class:`DerivativeCache` (if any) is
+    used.
+
+    :param LabelTensor output_: the output tensor onto which computing the
+        Jacobian.
+    :param LabelTensor input_: the input tensor with respect to which
+        computing the Jacobian.
+    :param list(str) components: the name of the output variables to
+        differentiate.
+    :param list(str) d: the name of the input variables needed by the
+        caller, the other columns of the returned tensor may be not
+        computed.
+    :return: the Jacobian tensor of shape ``[len(components), N, D]``.
+    :rtype: torch.Tensor
+    """
+    grid = _stencil_grid(input_, d)
+    if grid is not None:
+        return grid.jacobian(output_, input_, components, d)
+    if DerivativeCache._active is None:
+        label_map = output_.label_to_index
+        columns = [label_map[c] for c in components]
+        return _compute_jacobian(output_, input_, columns)
+    return DerivativeCache._active.jacobian(output_, input_, components)
+
+
+def _is_constant(output_, input_):
+    """
+    Check if ``output_`` is constant with respect to ``input_``, i.e. it is
+    (a view of) a leaf tensor other than ``input_``. The derivatives computed
+    by the operators which are constant, e.g. the gradient of a linear
+    function, are leaf tensors requiring grad, so that their derivatives are
+    zero.
+
+    :param torch.Tensor output_: the tensor to differentiate.
+    :param torch.Tensor input_: the input tensor.
+    :raises RuntimeError: if ``output_`` is not tracked by autograd, e.g. it
+        is the output of a detached model.
+    :return: ``True`` if ``output_`` is constant.
+    :rtype: bool
+    """
+    if not output_.requires_grad:
+        raise RuntimeError(
+            "the tensor to differentiate is not tracked by autograd"
+        )
+    leaf = output_
+    node = output_.grad_fn
+    while type(node).__name__ in DerivativeCache._VIEW_NODES:
+        node = node.next_functions[0][0]
+    if type(node).__name__ == "AccumulateGrad":
+        leaf = node.variable
+    elif node is not None:
+        return False
+    return (
+        leaf.untyped_storage().data_ptr()
+        != input_.untyped_storage().data_ptr()
+    )
+
+
+def _compute_jacobian(output_, input_, columns):
+    """
+    Compute the gradient of the ``columns`` of ``output_`` with respect to
+    all the columns of ``input_``. For vector valued outputs, the whole
+    Jacobian is computed by a single batched reverse pass, using one-hot
+    ``grad_outputs`` for the different columns. If the Jacobian is constant
+    it is returned as a leaf tensor requiring grad, see :func:`_is_constant`.
+
+    :param torch.Tensor output_: the output tensor onto which computing the
+        Jacobian.
+    :param LabelTensor input_: the input tensor with respect to which
+        computing the Jacobian.
+    :param list(int) columns: the index of the output columns to
+        differentiate.
+    :raises RuntimeError: if ``output_`` is not tracked by autograd.
+    :return: the Jacobian tensor of shape ``[len(columns), N, D]``, where
+        ``N`` is the number of points and ``D`` the number of input columns.
+    :rtype: torch.Tensor
+    """
+    output_ = output_.as_subclass(torch.Tensor)
+
+    # output_ is a constant derivative, e.g. gradient of a linear function
+    if _is_constant(output_, input_):
+        return torch.zeros(
+            (len(columns),) + tuple(input_.shape),
+            dtype=input_.dtype,
+            device=input_.device,
+            requires_grad=True,
+        )
+
+    if len(columns) == 1:
+        output_column = output_.narrow(-1, columns[0], 1)
+        grad_outputs = torch.ones_like(output_column)
+        is_grads_batched = False
+    else:
+        output_column = output_
+        grad_outputs = torch.zeros(
+            (len(columns),) + tuple(output_.shape),
+            dtype=output_.dtype,
+            device=output_.device,
+        )
+        for i, column in enumerate(columns):
+            grad_outputs[i, ..., column] = 1
+        is_grads_batched = True
+
+    jacobian = torch.autograd.grad(
+        output_column,
+        input_,
+        grad_outputs=grad_outputs,
+        create_graph=True,
+        retain_graph=True,
+        allow_unused=True,
+        is_grads_batched=is_grads_batched,
+    )[0]
+
+    # output_ does not depend on input_
+    if jacobian is None:
+        jacobian = torch.zeros(
+            (len(columns),) + tuple(input_.shape),
+            dtype=input_.dtype,
+            device=input_.device,
+        )
+
+    jacobian = jacobian.as_subclass(torch.Tensor)
+    jacobian = jacobian.reshape((len(columns),) + tuple(input_.shape))
+
+    # constant derivative, e.g. of a linear function, see _is_constant
+    if not jacobian.requires_grad:
+        jacobian = jacobian.detach().requires_grad_()
+    return jacobian
+
+
+def _constant_like(tensor, like):
+    """
+    Return ``tensor`` as a constant derivative (see :func:`_is_constant`) if
+    ``like`` is a constant derivative, otherwise ``tensor`` itself.
+    """
+    if like.requires_grad and like.grad_fn is None:
+        return tensor.detach().requires_grad_()
+    return tensor
+
+
 def grad(output_, input_, components=None, d=None):
     """
     Perform gradient operation. The operator works for vectorial and scalar
-    functions, with multiple input coordinates.
+    functions, with multiple input coordinates. For vectorial functions the
+    gradients of all the components are computed together, with a single
+    batched reverse pass.
 
     :param LabelTensor output_: the output tensor onto which computing the
         gradient.
@@ -27,51 +666,10 @@ def grad(output_, input_, components=None, d=None):
         calculated. d should be a subset of the input labels. If None, all the
         input variables are considered. Default is None.
 
+    :raises RuntimeError: missing derivative labels.
     :return: the gradient tensor.
     :rtype: LabelTensor
     """
-
-    def grad_scalar_output(output_, input_, d):
-        """
-        Perform gradient operation for a scalar output.
-
-        :param LabelTensor output_: the output tensor onto which computing the
-            gradient. It has to be a column tensor.
-        :param LabelTensor input_: the input tensor with respect to which
-            computing the gradient.
-        :param list(str) d: the name of the input variables on which the
-            gradient is calculated. d should be a subset of the input labels. If
-            None, all the input variables are considered. Default is None.
-
-        :raises RuntimeError: a vectorial function is passed.
-        :raises RuntimeError: missing derivative labels.
-        :return: the gradient tensor.
-        :rtype: LabelTensor
-        """
-
-        if len(output_.labels) != 1:
-            raise RuntimeError("only scalar function can be differentiated")
-        if not all([di in input_.labels for di in d]):
-            raise RuntimeError("derivative labels missing from input tensor")
-
-        output_fieldname = output_.labels[0]
-        gradients = torch.autograd.grad(
-            output_,
-            input_,
-            grad_outputs=torch.ones(
-                output_.size(), dtype=output_.dtype, device=output_.device
-            ),
-            create_graph=True,
-            retain_graph=True,
-            allow_unused=True,
-        )[0]
-
-        gradients.labels = input_.labels
-        gradients = gradients.extract(d)
-        gradients.labels = [f"d{output_fieldname}d{i}" for i in d]
-
-        return gradients
-
     if not isinstance(input_, LabelTensor):
         raise TypeError
 
@@ -81,29 +679,94 @@ def grad(output_, input_, components=None, d=None):
     if components is None:
         components = output_.labels
 
-    if output_.shape[1] == 1:  # scalar output ################################
-
+    if output_.shape[1] == 1:  # scalar output
         if components != output_.labels:
             raise RuntimeError
-        gradients = grad_scalar_output(output_, input_, d)
+    elif output_.shape[1] < 1:
+        raise NotImplementedError
 
-    elif output_.shape[1] >= 2:  # vector output ##############################
+    _check_derivative_labels(input_, d)
 
-        for i, c in enumerate(components):
-            c_output = output_.extract([c])
-            if i == 0:
-                gradients = grad_scalar_output(c_output, input_, d)
-            else:
-                gradients = gradients.append(
-                    grad_scalar_output(c_output, input_, d)
-                )
-    else:
-        raise NotImplementedError
+    # jacobian of shape [len(components), N, D]
+    full_jacobian = _jacobian(output_, input_, components, d)
+    jacobian = full_jacobian
+    if list(d) != list(input_.labels):
+        index = torch.tensor(
+            [input_.label_to_index[di] for di in d], device=jacobian.device
+        )
+        jacobian = jacobian.index_select(-1, index)
+
+    gradients = jacobian.transpose(0, 1).reshape(
+        input_.shape[0], len(components) * len(d)
+    )
+    gradients = _constant_like(gradients, full_jacobian)
+    gradients = gradients.as_subclass(LabelTensor)
+    gradients.labels = [f"d{c}d{di}" for c in components for di in d]
+
+    if DerivativeCache._active is not None:
+        DerivativeCache._active.register(
+            gradients, output_, input_, components, d
+        )
 
     return gradients
 
 
-def div(output_, input_, components=None, d=None):
+def _hutchinson_trace(output_, input_, d, n_probes):
+    """
+    Estimate, for each point, the trace of the Jacobian of ``output_`` with
+    respect to the ``d`` variables of ``input_`` by the Hutchinson estimator.
+    The vector-Jacobian products of all the Rademacher probes are computed by
+    a single batched reverse pass, so that the cost does not depend on the
+    number of variables.
+
+    :param LabelTensor output_: the output tensor, whose ``i``-th column is
+        differentiated with respect to the ``i``-th variable of ``d``.
+    :param LabelTensor input_: the input tensor.
+    :param list(str) d: the name of the input variables.
+    :param int n_probes: the number of random probes.
+    :return: the trace estimate, of shape ``[N]``.
+    :rtype: torch.Tensor
+    """
+    if not isinstance(n_probes, int) or n_probes < 1:
+        raise ValueError("n_probes must be a positive int")
+
+    # checked before drawing the probes, not to advance the random stream
+    if _is_constant(output_, input_):
+        return torch.zeros(
+            input_.shape[0], dtype=output_.dtype, device=output_.device
+        )
+
+    probes = torch.randint(
+        0,
+        2,
+        (n_probes,) + tuple(output_.shape),
+        device=output_.device,
+    ).to(output_.dtype)
+    probes = 2 * probes - 1
+
+    vjp = torch.autograd.grad(
+        output_,
+        input_,
+        grad_outputs=probes,
+        create_graph=True,
+        retain_graph=True,
+        allow_unused=True,
+        is_grads_batched=True,
+    )[0]
+
+    if vjp is None:
+        return torch.zeros(
+            input_.shape[0], dtype=output_.dtype, device=output_.device
+        )
+
+    index = torch.tensor(
+        [input_.label_to_index[di] for di in d], device=vjp.device
+    )
+    vjp = vjp.as_subclass(torch.Tensor).index_select(-1, index)
+    return (vjp * probes).sum(dim=-1).mean(dim=0)
+
+
+def div(output_, input_, components=None, d=None, method="std", n_probes=10):
     """
     Perform divergence operation. The operator works for vectorial functions,
     with multiple input coordinates.
@@ -118,6 +781,12 @@ def div(output_, input_, components=None, d=None):
     :param list(str) d: the name of the input variables on which the divergence
         is calculated. d should be a subset of the input labels. If None, all
         the input variables are considered. Default is None.
+    :param str method: used method to calculate the divergence, defaults to
+        'std'. With 'hutchinson' the divergence is estimated by the
+        Hutchinson estimator, whose cost does not depend on the number of
+        components.
+    :param int n_probes: the number of random probes of the 'hutchinson'
+        method. Default is 10.
 
     :raises TypeError: div operator works only for LabelTensor.
     :raises ValueError: div operator works only for vector fields.
@@ -141,20 +810,56 @@ def div(output_, input_, components=None, d=None):
     if len(components) != len(d):
         raise ValueError
 
-    grad_output = grad(output_, input_, components, d)
-    div = torch.zeros(input_.shape[0], 1, device=output_.device)
-    labels = [None] * len(components)
-    for i, (c, d) in enumerate(zip(components, d)):
-        c_fields = f"d{c}d{d}"
-        div[:, 0] += grad_output.extract(c_fields).sum(axis=1)
-        labels[i] = c_fields
+    if method == "hutchinson" and _stencil_grid(input_, d) is None:
+        div = _hutchinson_trace(
+            output_.extract(components), input_, d, n_probes
+        ).reshape(-1, 1)
+        div = div.as_subclass(LabelTensor)
+        div.labels = ["+".join(f"d{c}d{di}" for c, di in zip(components, d))]
+        return div
+
+    if method not in ("std", "hutchinson"):
+        raise ValueError(f"method {method} not available for div")
 
-    div = div.as_subclass(LabelTensor)
+    # the diagonal entries of the jacobian are summed in a single operation
+    jacobian = _jacobian(output_, input_, components, d)
+    index = torch.tensor(
+        [input_.label_to_index[di] for di in d], device=jacobian.device
+    )
+    div = jacobian[torch.arange(len(components)), :, index].sum(dim=0)
+    div = div.reshape(-1, 1).as_subclass(LabelTensor)
+    labels = [f"d{c}d{di}" for c, di in zip(components, d)]
     div.labels = ["+".join(labels)]
     return div
 
 
-def laplacian(output_, input_, components=None, d=None, method="std"):
+def _scalar_hessian(output_, input_, component, d):
+    """
+    Compute the Hessian of a component of ``output_``. The gradient is
+    computed first, then the second derivatives of all its columns are
+    computed by a single batched reverse pass.
+
+    :param LabelTensor output_: the output tensor onto which computing the
+        Hessian.
+    :param LabelTensor input_: the input tensor with respect to which
+        computing the Hessian.
+    :param str component: the name of the output variable.
+    :param list(str) d: the name of the input variables on which the Hessian
+        is computed.
+    :return: the Hessian tensor of shape ``[len(d), N, len(d)]``.
+    :rtype: torch.Tensor
+    """
+    grad_output = grad(output_, input_, components=[component], d=d)
+    hessian = _jacobian(grad_output, input_, grad_output.labels, d)
+    index = torch.tensor(
+        [input_.label_to_index[di] for di in d], device=hessian.device
+    )
+    return hessian.index_select(-1, index)
+
+
+def laplacian(
+    output_, input_, components=None, d=None, method="std", n_probes=10
+):
     """
     Compute Laplace operator. The operator works for vectorial and
     scalar functions, with multiple input coordinates.
@@ -170,8 +875,21 @@ def laplacian(output_, input_, components=None, d=None, method="std"):
         is calculated. d should be a subset of the input labels. If None, all
         the input variables are considered. Default is None.
     :param str method: used method to calculate Laplacian, defaults to 'std'.
+        Available methods are 'std', which differentiates each column of the
+        gradient separately, and 'divgrad', which computes the diagonal of
+        the Hessian of each component with a single batched reverse pass
+        over its gradient, and 'hutchinson', which estimates the trace of
+        the Hessian of each component by the Hutchinson estimator, whose
+        cost does not depend on the number of input variables.
+    :param int n_probes: the number of random probes of the 'hutchinson'
+        method. Default is 10.
+
+    .. note::
+        If a :class:`StencilGrid` supporting the ``d`` variables is active,
+        the Laplacian is computed by finite differences whatever the
+        ``method``.
 
-    :raises NotImplementedError: 'divgrad' not implemented as method.
+    :raises ValueError: if the method is not available.
     :return: The tensor containing the result of the Laplacian operator.
     :rtype: LabelTensor
     """
@@ -210,11 +928,39 @@ def laplacian(output_, input_, components=None, d=None, method="std"):
     if components is None:
         components = output_.labels
 
-    if method == "divgrad":
-        raise NotImplementedError("divgrad not implemented as method")
-        # TODO fix
-        # grad_output = grad(output_, input_, components, d)
-        # result = div(grad_output, input_, d=d)
+    if isinstance(components, str):
+        components = [components]
+
+    if method not in ("std", "divgrad", "hutchinson"):
+        raise ValueError(f"method {method} not available for laplacian")
+
+    grid = _stencil_grid(input_, d, order=2)
+    if grid is not None:
+        result = grid.laplacian(output_, input_, components, d)
+        labels = [f"dd{c}" for c in components]
+
+    elif method == "divgrad":
+        result = torch.empty(
+            size=(input_.shape[0], len(components)),
+            dtype=output_.dtype,
+            device=output_.device,
+        )
+        for idx, c in enumerate(components):
+            # only the diagonal of the Hessian is kept
+            hessian = _scalar_hessian(output_, input_, c, d)
+            result[:, idx] = hessian.diagonal(dim1=0, dim2=2).sum(dim=-1)
+        labels = [f"dd{c}" for c in components]
+
+    elif method == "hutchinson":
+        result = torch.empty(
+            size=(input_.shape[0], len(components)),
+            dtype=output_.dtype,
+            device=output_.device,
+        )
+        for idx, c in enumerate(components):
+            grad_output = grad(output_, input_, components=[c], d=d)
+            result[:, idx] = _hutchinson_trace(grad_output, input_, d, n_probes)
+        labels = [f"dd{c}" for c in components]
 
     elif method == "std":
         if len(components) == 1:
@@ -229,7 +975,9 @@ def laplacian(output_, input_, components=None, d=None, method="std"):
             )
             labels = [None] * len(components)
             for idx, c in enumerate(components):
-                result[:, idx] = scalar_laplace(output_, input_, c, d).flatten()
+                result[:, idx] = scalar_laplace(
+                    output_, input_, [c], d
+                ).flatten()
                 labels[idx] = f"dd{c}"
 
     result = result.as_subclass(LabelTensor)
@@ -237,24 +985,202 @@ def laplacian(output_, input_, components=None, d=None, method="std"):
     return result
 
 
+def hessian(output_, input_, components=None, d=None, symmetric=False):
+    """
+    Compute the Hessian of vectorial and scalar functions, with multiple input
+    coordinates. For each component, all the second derivatives are computed
+    by a single batched reverse pass over the gradient.
+
+    :param LabelTensor output_: the output tensor onto which computing the
+        Hessian.
+    :param LabelTensor input_: the input tensor with respect to which computing
+        the Hessian.
+    :param list(str) components: the name of the output variables to calculate
+        the Hessian for. It should be a subset of the output labels. If None,
+        all the output variables are considered. Default is None.
+    :param list(str) d: the name of the input variables on which the Hessian
+        is calculated. d should be a subset of the input labels. If None, all
+        the input variables are considered. Default is None.
+    :param bool symmetric: If ``True`` only the upper triangular part of the
+        Hessian (mixed derivatives included once) is returned. The full
+        Hessian of each component is still computed, since each reverse pass
+        over a column of the gradient gives a whole row of the Hessian, and
+        all the rows are needed for the diagonal: the backward passes and
+        the peak memory are the same, only the returned tensor is smaller.
+        Default is ``False``.
+
+    :raises RuntimeError: missing derivative labels.
+    :return: the Hessian tensor, with ``len(d) * len(d)`` columns for each
+        component (``len(d) * (len(d) + 1) / 2`` if ``symmetric``), labelled
+        as the nested :func:`grad` calls would do, e.g. ``ddudxdy``. If not
+        ``symmetric``, the ``N x len(d) x len(d)`` Hessian of the ``i``-th
+        component is obtained by reshaping the ``i``-th block of columns.
+    :rtype: LabelTensor
+    """
+    if not isinstance(input_, LabelTensor):
+        raise TypeError
+
+    if d is None:
+        d = input_.labels
+
+    if components is None:
+        components = output_.labels
+
+    _check_derivative_labels(input_, d)
+
+    # indices of the returned entries of the Hessian
+    pairs = [
+        (i, j)
+        for i in range(len(d))
+        for j in range(len(d))
+        if j >= i or not symmetric
+    ]
+    rows, cols = [i for i, _ in pairs], [j for _, j in pairs]
+
+    result = []
+    labels = []
+    for c in components:
+        # hessian of shape [len(d), N, len(d)]
+        hessian_ = _scalar_hessian(output_, input_, c, d)
+        result.append(hessian_[rows, :, cols].T)
+        labels += [f"dd{c}d{d[i]}d{d[j]}" for i, j in zip(rows, cols)]
+
+    result = torch.cat(result, dim=1).as_subclass(LabelTensor)
+    result.labels = labels
+    return result
+
+
+def derivatives(output_, input_, orders, components=None):
+    """
+    Compute several mixed partial derivatives of arbitrary order. Each
+    derivative is given as a multi-index, i.e. a ``dict`` mapping the input
+    variables to the order of differentiation. The variables are
+    differentiated following the order of the input labels, and the
+    derivatives sharing a common lower order derivative reuse it, so that
+    only one reverse pass is performed for each distinct lower order
+    derivative of each component.
+
+    :param LabelTensor output_: the output tensor onto which computing the
+        derivatives.
+    :param LabelTensor input_: the input tensor with respect to which computing
+        the derivatives.
+    :param list(dict) orders: the multi-indices of the derivatives to compute,
+        e.g. ``[{'x': 2}, {'x': 1, 't': 1}]``.
+    :param list(str) components: the name of the output variables to calculate
+        the derivatives for. It should be a subset of the output labels. If
+        None, all the output variables are considered. Default is None.
+
+    :raises ValueError: if an order is not a non negative integer.
+    :raises RuntimeError: missing derivative labels.
+    :return: the tensor containing the derivatives, with one column for each
+        component and multi-index. The columns are labelled as the nested
+        :func:`grad` calls would do, e.g. ``dddudxdxdt`` for
+        ``{'x': 2, 't': 1}``.
+    :rtype: LabelTensor
+
+    :Example:
+        >>> derivatives(output_, input_, [{'x': 4}, {'x': 2, 'y': 2}])
+    """
+    if not isinstance(input_, LabelTensor):
+        raise TypeError
+
+    if components is None:
+        components = output_.labels
+
+    # sequence of variables to differentiate for each multi-index
+    sequences = []
+    for multi_index in orders:
+        _check_derivative_labels(input_, multi_index)
+        for order in multi_index.values():
+            if not isinstance(order, int) or order < 0:
+                raise ValueError("derivative orders must be non negative int")
+        sequences.append(
+            tuple(
+                var
+                for var in input_.labels
+                for _ in range(multi_index.get(var, 0))
+            )
+        )
+
+    # for each lower order derivative, the variables to differentiate it
+    needed = {}
+    for sequence in sequences:
+        for i in range(len(sequence)):
+            needed.setdefault(sequence[:i], [])
+            if sequence[i] not in needed[sequence[:i]]:
+                needed[sequence[:i]].append(sequence[i])
+
+    result = []
+    labels = []
+    for c in components:
+        # derivatives of the component, starting from the component itself
+        # and computed in increasing order
+        nodes = {(): output_.extract([c])}
+        for sequence in sorted(needed, key=len):
+            d = needed[sequence]
+            gradients = grad(nodes[sequence], input_, d=d)
+            for label, var in zip(gradients.labels, d):
+                nodes[sequence + (var,)] = gradients.extract([label])
+        for sequence in sequences:
+            result.append(nodes[sequence])
+            labels.append(nodes[sequence].labels[0])
+
+    result = torch.cat([r.tensor for r in result], dim=1)
+    result = result.as_subclass(LabelTensor)
+    result.labels = labels
+    return result
+
+
+def derivative(output_, input_, orders, components=None):
+    """
+    Compute a mixed partial derivative of arbitrary order, given as a
+    multi-index mapping the input variables to the order of differentiation.
+    See :func:`derivatives` for computing several derivatives at once.
+
+    :param LabelTensor output_: the output tensor onto which computing the
+        derivative.
+    :param LabelTensor input_: the input tensor with respect to which computing
+        the derivative.
+    :param dict orders: the multi-index of the derivative to compute,
+        e.g. ``{'x': 3, 't': 1}``.
+    :param list(str) components: the name of the output variables to calculate
+        the derivative for. It should be a subset of the output labels. If
+        None, all the output variables are considered. Default is None.
+    :return: the tensor containing the derivative of each component.
+    :rtype: LabelTensor
+
+    :Example:
+        >>> derivative(output_, input_, {'x': 3, 't': 1})
+    """
+    return derivatives(output_, input_, [orders], components)
+
+
 def advection(output_, input_, velocity_field, components=None, d=None):
     """
     Perform advection operation. The operator works for vectorial functions,
-    with multiple input coordinates.
+    with multiple input coordinates. The Jacobian of all the components is
+    computed by a single batched reverse pass, and contracted with the
+    velocity field.
 
     :param LabelTensor output_: the output tensor onto which computing the
         advection.
     :param LabelTensor input_: the input tensor with respect to which computing
         the advection.
-    :param str velocity_field: the name of the output variables which is used
-        as velocity field. It should be a subset of the output labels.
+    :param velocity_field: the name of the output variables which is used as
+        velocity field. It should be a subset of the output labels, with the
+        same length of ``d``. A single variable is used as velocity along
+        all the ``d`` variables.
+    :type velocity_field: str | list(str)
     :param list(str) components: the name of the output variables to calculate
-        the Laplacian for. It should be a subset of the output labels. If None,
-        all the output variables are considered. Default is None.
+        the advection for. It should be a subset of the output labels. If
+        None, all the output variables are considered. Default is None.
     :param list(str) d: the name of the input variables on which the advection
         is calculated. d should be a subset of the input labels. If None, all
         the input variables are considered. Default is None.
-    :return: the tensor containing the result of the advection operator.
+    :raises ValueError: if ``velocity_field`` has more than one variable and
+        a different length of ``d``.
+    :return: the tensor containing the result of the advection operator,
+        labelled as e.g. ``ududx+vdudy`` for the ``u`` component.
     :rtype: LabelTensor
     """
     if d is None:
@@ -263,11 +1189,317 @@ def advection(output_, input_, velocity_field, components=None, d=None):
     if components is None:
         components = output_.labels
 
-    tmp = (
-        grad(output_, input_, components, d)
-        .reshape(-1, len(components), len(d))
-        .transpose(0, 1)
+    if isinstance(velocity_field, str):
+        velocity_field = [velocity_field]
+
+    # a single velocity variable is broadcast over all the d variables
+    if len(velocity_field) == 1:
+        velocity_field = list(velocity_field) * len(d)
+
+    if len(velocity_field) != len(d):
+        raise ValueError("velocity field and d must have the same length")
+
+    jacobian = _jacobian(output_, input_, components, d)
+    result = _contract_velocity(output_, input_, jacobian, velocity_field, d)
+    result = result.as_subclass(LabelTensor)
+    result.labels = [
+        "+".join(f"{v}d{c}d{di}" for v, di in zip(velocity_field, d))
+        for c in components
+    ]
+    return result
+
+
+def _contract_velocity(output_, input_, jacobian, velocity_field, d):
+    """
+    Contract the jacobian with the velocity field.
+
+    :param LabelTensor output_: the output tensor containing the velocity.
+    :param LabelTensor input_: the input tensor.
+    :param torch.Tensor jacobian: the jacobian of shape
+        ``[len(components), N, D]``.
+    :param list(str) velocity_field: the velocity components.
+    :param list(str) d: the variables of differentiation, one for each
+        velocity component.
+    :return: the ``velocity . grad`` tensor of shape ``[N, len(components)]``.
+    :rtype: torch.Tensor
+    """
+    index = torch.tensor(
+        [input_.label_to_index[di] for di in d], device=jacobian.device
+    )
+    velocity = output_.extract(velocity_field).tensor
+    return torch.einsum(
+        "knd,nd->nk", jacobian.index_select(-1, index), velocity
+    )
+
+
+def material_derivative(
+    output_, input_, velocity_field, components=None, d=None, time="t"
+):
+    """
+    Compute the material derivative ``du/dt + (v . grad) u``. The
+    derivatives with respect to time and space are obtained from the same
+    Jacobian, computed by a single batched reverse pass.
+
+    :param LabelTensor output_: the output tensor onto which computing the
+        material derivative.
+    :param LabelTensor input_: the input tensor with respect to which computing
+        the material derivative.
+    :param list(str) velocity_field: the name of the output variables which is
+        used as velocity field. It should be a subset of the output labels,
+        with the same length of ``d``.
+    :param list(str) components: the name of the output variables to calculate
+        the material derivative for. It should be a subset of the output
+        labels. If None, all the output variables are considered. Default is
+        None.
+    :param list(str) d: the name of the spatial input variables. If None, all
+        the input variables except ``time`` are considered. Default is None.
+    :param str time: the name of the time variable. Default is ``t``.
+    :return: the tensor containing the material derivative, labelled as e.g.
+        ``DuDt`` for the ``u`` component.
+    :rtype: LabelTensor
+    """
+    if not isinstance(input_, LabelTensor):
+        raise TypeError
+
+    if d is None:
+        d = [label for label in input_.labels if label != time]
+
+    if components is None:
+        components = output_.labels
+
+    if isinstance(velocity_field, str):
+        velocity_field = [velocity_field]
+
+    if len(velocity_field) != len(d):
+        raise ValueError("velocity field and d must have the same length")
+
+    if time not in input_.label_to_index:
+        raise RuntimeError("time label missing from input tensor")
+
+    jacobian = _jacobian(output_, input_, components, list(d) + [time])
+    result = jacobian.select(-1, input_.label_to_index[time]).T
+    result = result + _contract_velocity(
+        output_, input_, jacobian, velocity_field, d
     )
+    result = result.as_subclass(LabelTensor)
+    result.labels = [f"D{c}Dt" for c in components]
+    return result
+
+
+def curl(output_, input_, components=None, d=None):
+    """
+    Compute the curl of a vector field. For a three dimensional field the
+    result has three components, while for a two dimensional field the
+    result is the scalar ``dvdx - dudy``. All the derivatives are obtained
+    from the same Jacobian, computed by a single batched reverse pass.
+
+    :param LabelTensor output_: the output tensor onto which computing the
+        curl.
+    :param LabelTensor input_: the input tensor with respect to which computing
+        the curl.
+    :param list(str) components: the name of the output variables to calculate
+        the curl for. It should be a subset of the output labels. If None,
+        all the output variables are considered. Default is None.
+    :param list(str) d: the name of the input variables on which the curl
+        is calculated. d should be a subset of the input labels. If None, all
+        the input variables are considered. Default is None.
+
+    :raises ValueError: curl operator works only for two or three dimensional
+        vector fields, with as many coordinates as components.
+    :return: the curl tensor.
+    :rtype: LabelTensor
+    """
+    if not isinstance(input_, LabelTensor):
+        raise TypeError
+
+    if d is None:
+        d = input_.labels
+
+    if components is None:
+        components = output_.labels
+
+    if len(components) not in (2, 3) or len(components) != len(d):
+        raise ValueError(
+            "curl supported only for 2D or 3D vector fields, with as many "
+            "coordinates as components"
+        )
+
+    # each entry of the curl is dc_i/dd_j - dc_j/dd_i
+    if len(components) == 3:
+        pairs = [(2, 1), (0, 2), (1, 0)]
+    else:
+        pairs = [(1, 0)]
+
+    jacobian = _jacobian(output_, input_, components, d)
+    var = [input_.label_to_index[di] for di in d]
+    first = [i for i, _ in pairs]
+    second = [j for _, j in pairs]
+    result = (
+        jacobian[first, :, [var[j] for j in second]]
+        - jacobian[second, :, [var[i] for i in first]]
+    ).T
+    result = result.as_subclass(LabelTensor)
+    result.labels = [
+        f"d{components[i]}d{d[j]}-d{components[j]}d{d[i]}" for i, j in pairs
+    ]
+    return result
+
+
+def _field_axes(output_, spacing, d):
+    """
+    Return the spatial axes of a grid valued tensor of shape
+    ``[batch, X_1, ..., X_n, channels]``, with their names and spacing.
+    """
+    axes = list(range(1, output_.ndim - 1))
+    if not axes:
+        raise ValueError("the tensor has no spatial axes")
+
+    if d is None:
+        d = ["x", "y", "z"][: len(axes)] if len(axes) <= 3 else None
+        d = d or [f"x{i}" for i in range(len(axes))]
+
+    if isinstance(spacing, (int, float)):
+        spacing = [spacing] * len(axes)
+
+    if len(d) != len(axes) or len(spacing) != len(axes):
+        raise ValueError(
+            "d and spacing must have one entry for each spatial axis"
+        )
+    return axes, list(d), list(spacing)
+
+
+def _wavenumbers(values, axes, spacing):
+    """
+    Return the wavenumbers of the real fft of ``values`` along each axis,
+    shaped to be broadcasted against the transformed tensor.
+    """
+    wavenumbers = []
+    for i, (axis, h) in enumerate(zip(axes, spacing)):
+        n = values.shape[axis]
+        if i == len(axes) - 1:
+            k = torch.fft.rfftfreq(n, d=h, device=values.device)
+        else:
+            k = torch.fft.fftfreq(n, d=h, device=values.device)
+        shape = [1] * values.ndim
+        shape[axis] = k.shape[0]
+        wavenumbers.append((2 * pi * k).to(values.dtype).reshape(shape))
+    return wavenumbers
+
+
+def spectral_grad(output_, spacing, components=None, d=None, method="spectral"):
+    """
+    Compute the gradient of grid valued functions, e.g. the output of the
+    neural operators, of shape ``[batch, X_1, ..., X_n, channels]``. The
+    derivatives are computed on the whole fields by spectral differentiation,
+    which assumes periodic fields, or by second order finite differences for
+    non periodic fields. No automatic differentiation with respect to the
+    points is performed.
+
+    :param LabelTensor output_: the grid valued tensor onto which computing
+        the gradient, with labels on the last (channels) dimension.
+    :param spacing: the distance between two grid points, for each spatial
+        axis. For the ``spectral`` method the period of the fields along an
+        axis is ``X_i * spacing``.
+    :type spacing: float | list(float)
+    :param list(str) components: the name of the output variables to calculate
+        the gradient for. It should be a subset of the output labels. If None,
+        all the output variables are considered. Default is None.
+    :param list(str) d: the name of the spatial axes, used for labelling. If
+        None, ``['x', 'y', 'z']`` are used. Default is None.
+    :param str method: used method to calculate the gradient, 'spectral' for
+        periodic fields or 'fd' for non periodic ones. Default is 'spectral'.
+
+    :raises ValueError: if the method is not available.
+    :return: the gradient tensor, of shape
+        ``[batch, X_1, ..., X_n, len(components) * n]``.
+    :rtype: LabelTensor
+    """
+    if components is None:
+        components = output_.labels
 
-    tmp *= output_.extract(velocity_field)
-    return tmp.sum(dim=2).T
+    axes, d, spacing = _field_axes(output_, spacing, d)
+    values = output_.extract(components).tensor
+
+    if method == "spectral":
+        coeffs = torch.fft.rfftn(values, dim=axes)
+        sizes = [values.shape[axis] for axis in axes]
+        gradients = []
+        for axis, k in zip(axes, _wavenumbers(values, axes, spacing)):
+            # the Nyquist mode of odd derivatives is removed
+            if values.shape[axis] % 2 == 0:
+                k = k.clone()
+                k.select(axis, values.shape[axis] // 2).zero_()
+            gradients.append(
+                torch.fft.irfftn(coeffs * (1j * k), s=sizes, dim=axes)
+            )
+    elif method == "fd":
+        gradients = [
+            torch.gradient(values, spacing=h, dim=axis, edge_order=2)[0]
+            for axis, h in zip(axes, spacing)
+        ]
+    else:
+        raise ValueError(f"method {method} not available for spectral_grad")
+
+    result = torch.stack(gradients, dim=-1).flatten(start_dim=-2)
+    result = result.as_subclass(LabelTensor)
+    result.labels = [f"d{c}d{di}" for c in components for di in d]
+    return result
+
+
+def spectral_laplacian(
+    output_, spacing, components=None, d=None, method="spectral"
+):
+    """
+    Compute the Laplacian of grid valued functions, e.g. the output of the
+    neural operators, of shape ``[batch, X_1, ..., X_n, channels]``. The
+    derivatives are computed on the whole fields by spectral differentiation,
+    which assumes periodic fields, or by second order finite differences for
+    non periodic fields. No automatic differentiation with respect to the
+    points is performed.
+
+    :param LabelTensor output_: the grid valued tensor onto which computing
+        the Laplacian, with labels on the last (channels) dimension.
+    :param spacing: the distance between two grid points, for each spatial
+        axis. For the ``spectral`` method the period of the fields along an
+        axis is ``X_i * spacing``.
+    :type spacing: float | list(float)
+    :param list(str) components: the name of the output variables to calculate
+        the Laplacian for. It should be a subset of the output labels. If
+        None, all the output variables are considered. Default is None.
+    :param list(str) d: the name of the spatial axes. If None, ``['x', 'y',
+        'z']`` are used. Default is None.
+    :param str method: used method to calculate the Laplacian, 'spectral' for
+        periodic fields or 'fd' for non periodic ones. Default is 'spectral'.
+
+    :raises ValueError: if the method is not available.
+    :return: the Laplacian tensor, of shape
+        ``[batch, X_1, ..., X_n, len(components)]``.
+    :rtype: LabelTensor
+    """
+    if components is None:
+        components = output_.labels
+
+    axes, d, spacing = _field_axes(output_, spacing, d)
+    values = output_.extract(components).tensor
+
+    if method == "spectral":
+        coeffs = torch.fft.rfftn(values, dim=axes)
+        symbol = sum(k**2 for k in _wavenumbers(values, axes, spacing))
+        result = torch.fft.irfftn(
+            -coeffs * symbol,
+            s=[values.shape[axis] for axis in axes],
+            dim=axes,
+        )
+    elif method == "fd":
+        result = sum(
+            StencilGrid._second_difference(values, h, axis)
+            for axis, h in zip(axes, spacing)
+        )
+    else:
+        raise ValueError(
+            f"method {method} not available for spectral_laplacian"
+        )
+
+    result = result.as_subclass(LabelTensor)
+    result.labels = [f"dd{c}" for c in components]
+    return result
@@ -2,6 +2,8 @@
 
 from abc import ABCMeta, abstractmethod
 from ..utils import merge_tensors, check_consistency
+from ..geometry import CartesianDomain
+from ..operators import StencilGrid
 from copy import deepcopy
 import torch
 
@@ -21,12 +23,20 @@ class AbstractProblem(metaclass=ABCMeta):
         # variable storing all points
         self.input_pts = {}
 
+        # variable storing the structured grids of the locations sampled
+        # with grid mode, used to compute derivatives by finite differences
+        self.stencil_grids = {}
+
         # varible to check if sampling is done. If no location
         # element is presented in Condition this variable is set to true
         self._have_sampled_points = {}
         for condition_name in self.conditions:
             self._have_sampled_points[condition_name] = False
 
+        # the streaming conditions draw their points during the training
+        for condition_name in self.streaming_conditions:
+            self._have_sampled_points[condition_name] = True
+
         # put in self.input_pts all the points that we don't need to sample
         self._span_condition_points()
 
@@ -98,6 +108,22 @@ class AbstractProblem(metaclass=ABCMeta):
         else:
             raise RuntimeError("different domains")
 
+    @property
+    def streaming_conditions(self):
+        """
+        The names of the streaming conditions, whose points are drawn at
+        every training step instead of being discretised (see
+        :class:`~pina.condition.Condition`).
+
+        :return: the streaming conditions names
+        :rtype: list[str]
+        """
+        return [
+            name
+            for name, condition in self.conditions.items()
+            if getattr(condition, "stream_points", None) is not None
+        ]
+
     @input_variables.setter
     def input_variables(self, variables):
         raise RuntimeError
@@ -172,6 +198,17 @@ class AbstractProblem(metaclass=ABCMeta):
             compositions ``Union``, ``Difference``, ``Exclusion``, ``Intersection``. The
             modes ``latin`` or ``lh``,  ``chebyshev``, ``grid`` are only implemented for
             ``CartesianDomain``.
+
+        .. note::
+            When a ``CartesianDomain`` is sampled with ``grid`` mode, the grid
+            is stored in ``stencil_grids`` as a
+            :class:`~pina.operators.StencilGrid`, which solvers can use to
+            compute the derivatives by finite differences.
+
+        .. note::
+            The locations of the streaming conditions (see
+            :class:`~pina.condition.Condition`) are not discretised, their
+            points are drawn at every training step.
         """
 
         # check consistecy n
@@ -195,10 +232,12 @@ class AbstractProblem(metaclass=ABCMeta):
             )
 
         # check consistency location
+        streaming = self.streaming_conditions
         locations_to_sample = [
             condition
             for condition in self.conditions
             if hasattr(self.conditions[condition], "location")
+            and condition not in streaming
         ]
         if locations == "all":
             # only locations that can be sampled
@@ -238,6 +277,26 @@ class AbstractProblem(metaclass=ABCMeta):
             pts = merge_tensors(samples)
             self.input_pts[location] = pts
 
+            # record the grid, if all the variables are sampled on it
+            if (
+                mode == "grid"
+                and n > 1
+                and not already_sampled
+                and isinstance(condition.location, CartesianDomain)
+            ):
+                grid_variables = [
+                    var
+                    for var in sorted(variables)
+                    if var in condition.location.range_
+                ]
+                self.stencil_grids[location] = StencilGrid(
+                    grid_variables,
+                    [condition.location.range_[var] for var in grid_variables],
+                    [n] * len(grid_variables),
+                )
+            else:
+                self.stencil_grids.pop(location, None)
+
             # the condition is sampled if input_pts contains all labels
             if sorted(self.input_pts[location].labels) == sorted(
                 self.input_variables
@@ -283,6 +342,9 @@ class AbstractProblem(metaclass=ABCMeta):
             merged_pts.labels = old_pts.labels
             self.input_pts[location] = merged_pts
 
+            # the points are no more a structured grid
+            self.stencil_grids.pop(location, None)
+
     @property
     def have_sampled_points(self):
         """
@@ -8,6 +8,7 @@ __all__ = [
     "SAPINN",
     "RBAPINN",
     "SupervisedSolver",
+    "PhysicsInformedSupervisedSolver",
     "ReducedOrderModelSolver",
     "GAROM",
 ]
@@ -15,5 +16,6 @@ __all__ = [
 from .solver import SolverInterface
 from .pinns import *
 from .supervised import SupervisedSolver
+from .physics_supervised import PhysicsInformedSupervisedSolver
 from .rom import ReducedOrderModelSolver
 from .garom import GAROM
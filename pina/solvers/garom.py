@@ -253,9 +253,7 @@ class GAROM(SolverInterface):
         :rtype: LabelTensor
         """
 
-        condition_idx = batch["condition"]
-
-        for condition_id in range(condition_idx.min(), condition_idx.max() + 1):
+        for condition_id, rows in batch["slices"].items():
 
             condition_name = self._dataloader.condition_names[condition_id]
             condition = self.problem.conditions[condition_name]
@@ -272,8 +270,8 @@ class GAROM(SolverInterface):
                 )
 
             # get data
-            snapshots = out[condition_idx == condition_id]
-            parameters = pts[condition_idx == condition_id]
+            snapshots = out[rows]
+            parameters = pts[rows]
 
             d_loss_real, d_loss_fake, d_loss = self._train_discriminator(
                 parameters, snapshots
@@ -0,0 +1,133 @@
+""" Module for PhysicsInformedSupervisedSolver """
+
+import torch
+
+from torch.optim.lr_scheduler import ConstantLR
+
+from .supervised import SupervisedSolver
+from ..equation.equation_interface import EquationInterface
+from ..utils import check_consistency
+
+
+class PhysicsInformedSupervisedSolver(SupervisedSolver):
+    r"""
+    PhysicsInformedSupervisedSolver solver class. This class implements a
+    SupervisedSolver whose data loss is augmented by a physics loss, computed
+    on the whole output fields of the ``model``, e.g. a neural operator
+    evaluated on a regular grid.
+
+    Given a model :math:`\mathcal{M}` and the residual :math:`\mathcal{A}`
+    of the differential ``equation``, the following loss function is
+    minimized during training:
+
+    .. math::
+        \mathcal{L}_{\rm{problem}} = \frac{1}{N}\sum_{i=1}^N
+        \mathcal{L}(\mathbf{u}_i - \mathcal{M}(\mathbf{v}_i)) +
+        \lambda \frac{1}{N}\sum_{i=1}^N
+        \mathcal{L}(\mathcal{A}[\mathcal{M}(\mathbf{v}_i)](\mathbf{v}_i))
+
+    where :math:`\mathcal{L}` is a specific loss function, default Mean Square
+    Error, and :math:`\lambda` is the ``physics_weight``.
+
+    .. note::
+        The ``equation`` is evaluated on the input and output fields of the
+        batch, thus the derivatives should be computed on the whole fields,
+        e.g. by :func:`~pina.operators.spectral_grad` and
+        :func:`~pina.operators.spectral_laplacian`, at FFT cost and without
+        automatic differentiation with respect to the grid points.
+    """
+
+    def __init__(
+        self,
+        problem,
+        model,
+        equation,
+        physics_weight=1.0,
+        extra_features=None,
+        loss=torch.nn.MSELoss(),
+        optimizer=torch.optim.Adam,
+        optimizer_kwargs={"lr": 0.001},
+        scheduler=ConstantLR,
+        scheduler_kwargs={"factor": 1, "total_iters": 0},
+        raw_tensor=False,
+        compile_model=False,
+    ):
+        """
+        :param AbstractProblem problem: The formualation of the problem.
+        :param torch.nn.Module model: The neural network model to use.
+        :param EquationInterface equation: The equation whose residual,
+            computed on the input and output fields, is minimized.
+        :param float physics_weight: The weight of the physics loss; default
+            is 1.0.
+        :param torch.nn.Module extra_features: The additional input
+            features to use as augmented input.
+        :param torch.nn.Module loss: The loss function used as minimizer,
+            default :class:`torch.nn.MSELoss`.
+        :param torch.optim.Optimizer optimizer: The neural network optimizer to
+            use; default is :class:`torch.optim.Adam`.
+        :param dict optimizer_kwargs: Optimizer constructor keyword args.
+        :param torch.optim.LRScheduler scheduler: Learning
+            rate scheduler.
+        :param dict scheduler_kwargs: LR scheduler constructor keyword args.
+        :param bool raw_tensor: If ``True`` the model is executed on plain
+            :class:`torch.Tensor` s, see
+            :class:`~pina.solvers.supervised.SupervisedSolver`. Default is
+            ``False``.
+        :param compile_model: If ``True`` (or a ``dict`` of
+            :func:`torch.compile` keyword arguments) the forward of the model
+            is compiled, implying ``raw_tensor=True``. Default is ``False``.
+        :type compile_model: bool | dict
+        """
+        super().__init__(
+            problem=problem,
+            model=model,
+            extra_features=extra_features,
+            loss=loss,
+            optimizer=optimizer,
+            optimizer_kwargs=optimizer_kwargs,
+            scheduler=scheduler,
+            scheduler_kwargs=scheduler_kwargs,
+            raw_tensor=raw_tensor,
+            compile_model=compile_model,
+        )
+
+        # check consistency
+        check_consistency(equation, EquationInterface)
+        check_consistency(physics_weight, (float, int))
+
+        # assign variables
+        self._equation = equation
+        self._physics_weight = physics_weight
+
+    def loss_data(self, input_pts, output_pts):
+        """
+        The loss for the PhysicsInformedSupervisedSolver. It computes the
+        loss between the network output against the true solution, plus the
+        weighted loss of the equation residual on the network output. The
+        network is evaluated only once.
+
+        :param LabelTensor input_pts: The input to the neural networks.
+        :param LabelTensor output_pts: The true solution to compare the
+            network solution.
+        :return: The sum of the data and physics losses.
+        :rtype: torch.Tensor
+        """
+        output = self.forward(input_pts)
+        residual = self.equation.residual(input_pts, output)
+        data_loss = self.loss(output, output_pts)
+        physics_loss = self.loss(residual, torch.zeros_like(residual))
+        return data_loss + self.physics_weight * physics_loss
+
+    @property
+    def equation(self):
+        """
+        Equation of the physics loss.
+        """
+        return self._equation
+
+    @property
+    def physics_weight(self):
+        """
+        Weight of the physics loss.
+        """
+        return self._physics_weight
@@ -2,11 +2,14 @@
 
 import sys
 from abc import ABCMeta, abstractmethod
+from contextlib import nullcontext
 import torch
 
 from ...solvers.solver import SolverInterface
 from pina.utils import check_consistency
 from pina.loss import LossInterface
+from pina.operators import DerivativeCache
+from pina.label_tensor import LabelTensor
 from pina.problem import InverseProblem
 from torch.nn.modules.loss import _Loss
 
@@ -34,6 +37,11 @@ class PINNInterface(SolverInterface, metaclass=ABCMeta):
         optimizers_kwargs,
         extra_features,
         loss,
+        raw_tensor=False,
+        compile_model=False,
+        cache_derivatives=False,
+        stencil_derivatives=False,
+        fused_forward=False,
     ):
         """
         :param models: Multiple torch neural network models instances.
@@ -52,6 +60,36 @@ class PINNInterface(SolverInterface, metaclass=ABCMeta):
             is passed to a model.
         :param torch.nn.Module loss: The loss function used as minimizer,
             default :class:`torch.nn.MSELoss`.
+        :param bool raw_tensor: If ``True`` the models are executed on plain
+            :class:`torch.Tensor` s, and labels are used only to resolve the
+            input columns and to label the output. Default is ``False``.
+        :param compile_model: If ``True`` (or a ``dict`` of
+            :func:`torch.compile` keyword arguments) the forward of the models
+            is compiled, while the residuals and the losses are computed
+            eagerly. If the compiled models can not be used, e.g. the backend
+            does not support the double backward needed by the physics losses,
+            the solver falls back to eager execution. Default is ``False``.
+        :type compile_model: bool | dict
+        :param bool cache_derivatives: If ``True`` the derivatives computed by
+            the differential operators are cached during each training step,
+            and shared among all the equations and conditions. Default is
+            ``False``.
+        :param bool stencil_derivatives: If ``True`` the residuals of the
+            conditions sampled on a grid (see
+            :meth:`~pina.problem.AbstractProblem.discretise_domain`)
+            are computed using finite differences for the derivatives with
+            respect to the grid variables, see
+            :class:`~pina.operators.StencilGrid`. The batch must contain all
+            the grid points of the condition, otherwise automatic
+            differentiation is used. Default is ``False``.
+        :param bool fused_forward: If ``True`` the models are evaluated once on
+            the points of all the physics conditions in the batch, and the
+            output is split among the conditions to compute the residuals,
+            instead of evaluating the models separately for each condition.
+            The derivatives are computed once on the whole batch, and shared
+            among the conditions by the derivatives cache, which is thus
+            enabled. The models must evaluate each point independently of
+            the others. Default is ``False``.
         """
         super().__init__(
             models=models,
@@ -59,14 +97,31 @@ class PINNInterface(SolverInterface, metaclass=ABCMeta):
             optimizers=optimizers,
             optimizers_kwargs=optimizers_kwargs,
             extra_features=extra_features,
+            raw_tensor=raw_tensor,
+            compile_model=compile_model,
         )
 
         # check consistency
         check_consistency(loss, (LossInterface, _Loss), subclass=False)
+        check_consistency(cache_derivatives, bool)
+        check_consistency(stencil_derivatives, bool)
+        check_consistency(fused_forward, bool)
 
         # assign variables
         self._loss = loss
 
+        # cache of the derivatives, emptied at the end of each training step
+        if cache_derivatives or fused_forward:
+            self._derivative_cache = DerivativeCache()
+        else:
+            self._derivative_cache = None
+
+        # finite differences on the grids sampled in the problem
+        self._stencil_derivatives = stencil_derivatives
+
+        # single forward pass for all the physics conditions in a batch
+        self._fused_forward = fused_forward
+
         # inverse problem handling
         if isinstance(self.problem, InverseProblem):
             self._params = self.problem.unknown_parameters
@@ -85,6 +140,77 @@ class PINNInterface(SolverInterface, metaclass=ABCMeta):
         # variable will be stored with name = self.__logged_metric
         self.__logged_metric = None
 
+        # variable used internally to store, for each equation, if the
+        # unknown parameters of the inverse problem must be passed to it
+        self.__equation_needs_params = {}
+
+        # variable used internally to store, for the samples of each physics
+        # condition in the batch, the precomputed output and forcing
+        self.__precomputed = {}
+
+    def on_train_start(self):
+        """
+        On training start this function checks that the compiled models (if
+        any) support the double backward needed by the physics losses,
+        otherwise it falls back to eager execution.
+        """
+        if any(model.is_compiled for model in self.models):
+            self._check_compiled_double_backward()
+        return super().on_train_start()
+
+    def _check_compiled_double_backward(self):
+        """
+        Differentiate twice the compiled models output with respect to a few
+        sample points, and disable compilation if the backend does not
+        support it (the reason is reported in the warning of
+        :meth:`~pina.model.network.Network.disable_compile`). The eager
+        models are differentiated first, so that their errors are raised.
+        Nothing is checked if the problem has no stored points (e.g. only
+        streaming conditions).
+        """
+        pts = next(iter(self.problem.input_pts.values()), None)
+        if pts is None or len(pts) == 0:
+            return
+        pts = pts[:2].detach().to(device=self.device, dtype=self.dtype)
+        pts = pts.requires_grad_(True)
+
+        def derivative(model):
+            output = model(pts).sum()
+            return torch.autograd.grad(output, pts, create_graph=True)[0]
+
+        def second_derivative(grad_output):
+            torch.autograd.grad(grad_output.sum(), pts, allow_unused=True)
+
+        with torch.enable_grad():
+            for model in self.models:
+                if not model.is_compiled:
+                    continue
+                with model.eager_mode():
+                    eager_grad_output = derivative(model)
+                    if eager_grad_output.requires_grad:
+                        second_derivative(eager_grad_output)
+
+                try:
+                    grad_output = derivative(model)
+                    if grad_output.requires_grad:
+                        second_derivative(grad_output)
+                        continue
+                except RuntimeError as err:
+                    # the eager model supports the double backward, so the
+                    # error comes from the backward of the compiled graph
+                    model.disable_compile(
+                        f"double backward failed with {err!r}"
+                    )
+                    continue
+
+                # the derivative is constant for a linear model, otherwise
+                # the backward of the compiled model is not differentiable
+                if eager_grad_output.requires_grad:
+                    model.disable_compile(
+                        "the backward of the compiled model is not "
+                        "differentiable, double backward not supported"
+                    )
+
     def training_step(self, batch, _):
         """
         The Physics Informed Solver Training Step. This function takes care
@@ -100,28 +226,38 @@ class PINNInterface(SolverInterface, metaclass=ABCMeta):
         """
 
         condition_losses = []
-        condition_idx = batch["condition"]
-
-        for condition_id in range(condition_idx.min(), condition_idx.max() + 1):
-
-            condition_name = self._dataloader.condition_names[condition_id]
-            condition = self.problem.conditions[condition_name]
-            pts = batch["pts"]
-            # condition name is logged (if logs enabled)
-            self.__logged_metric = condition_name
-
-            if len(batch) == 2:
-                samples = pts[condition_idx == condition_id]
-                loss = self.loss_phys(samples, condition.equation)
-            elif len(batch) == 3:
-                samples = pts[condition_idx == condition_id]
-                ground_truth = batch["output"][condition_idx == condition_id]
-                loss = self.loss_data(samples, ground_truth)
-            else:
-                raise ValueError("Batch size not supported")
-
-            # add condition losses for each epoch
-            condition_losses.append(loss * condition.data_weight)
+        slices = batch["slices"]
+        pts = batch["pts"]
+        cache = self._derivative_cache or nullcontext()
+
+        with cache:
+            if "output" not in batch:
+                samples = {
+                    condition_id: pts[rows]
+                    for condition_id, rows in slices.items()
+                }
+                self.__precomputed = self._precompute(
+                    samples, batch.get("forcing", {})
+                )
+
+            for condition_id, rows in slices.items():
+
+                condition_name = self._dataloader.condition_names[condition_id]
+                condition = self.problem.conditions[condition_name]
+                # condition name is logged (if logs enabled)
+                self.__logged_metric = condition_name
+
+                if "output" not in batch:
+                    loss = self.loss_phys(
+                        samples[condition_id], condition.equation
+                    )
+                else:
+                    loss = self.loss_data(pts[rows], batch["output"][rows])
+
+                # add condition losses for each epoch
+                condition_losses.append(loss * condition.data_weight)
+
+            self.__precomputed = {}
 
         # clamp unknown parameters in InverseProblem (if needed)
         self._clamp_params()
@@ -131,6 +267,42 @@ class PINNInterface(SolverInterface, metaclass=ABCMeta):
         self.save_logs_and_release()
         return total_loss.as_subclass(torch.Tensor)
 
+    def _precompute(self, samples, forcing):
+        """
+        Precompute the quantities needed by the residuals of the physics
+        conditions in the batch, i.e. the models output if
+        ``fused_forward=True``, and the equations forcing.
+
+        :param dict samples: The samples of each condition in the batch.
+        :param dict forcing: The precomputed forcing of the conditions in the
+            batch, see :class:`~pina.dataset.SamplePointLoader`.
+        :return: The samples, output (``None`` if not precomputed) and
+            forcing of each condition, indexed by the samples ``id``.
+        :rtype: dict
+        """
+        outputs = {}
+        if self._fused_forward and len(samples) > 1:
+            # one forward pass on the concatenation of the samples, the
+            # samples are kept in the graph to differentiate the outputs
+            inputs = torch.cat([pts.tensor for pts in samples.values()])
+            inputs = inputs.as_subclass(LabelTensor)
+            inputs.labels = next(iter(samples.values())).labels
+            output = self.forward(inputs)
+            sizes = [pts.shape[0] for pts in samples.values()]
+            for condition_id, chunk in zip(samples, output.tensor.split(sizes)):
+                outputs[condition_id] = chunk.as_subclass(LabelTensor)
+                outputs[condition_id].labels = output.labels
+            # the derivatives of the outputs are computed on the whole batch,
+            # by a single reverse pass for all the conditions
+            self._derivative_cache.register_blocks(
+                output, inputs, list(outputs.values()), list(samples.values())
+            )
+
+        return {
+            id(pts): (pts, outputs.get(condition_id), forcing.get(condition_id))
+            for condition_id, pts in samples.items()
+        }
+
     def loss_data(self, input_tensor, output_tensor):
         """
         The data loss for the PINN solver. It computes the loss between
@@ -175,14 +347,59 @@ class PINNInterface(SolverInterface, metaclass=ABCMeta):
         :return: The residual of the neural network solution.
         :rtype: LabelTensor
         """
-        try:
-            residual = equation.residual(samples, self.forward(samples))
-        except (
-            TypeError
-        ):  # this occurs when the function has three inputs, i.e. inverse problem
+        # the output and forcing precomputed in the training step are valid
+        # only if the samples are the ones of the batch (e.g. not a chunk)
+        output, forcing = None, None
+        precomputed = self.__precomputed.get(id(samples))
+        if precomputed is not None and precomputed[0] is samples:
+            _, output, forcing = precomputed
+        if output is None:
+            output = self.forward(samples)
+
+        grid = None
+        if self._stencil_derivatives:
+            grid = self.problem.stencil_grids.get(self.current_condition_name)
+
+        with grid or nullcontext():
+            residual = self._evaluate_equation(
+                samples, output, equation, forcing
+            )
+        return residual
+
+    def _evaluate_equation(self, samples, output, equation, forcing=None):
+        """
+        Evaluate the equation residual, passing the unknown parameters of the
+        inverse problem if the equation needs them.
+
+        :param LabelTensor samples: The samples to evaluate the physics loss.
+        :param LabelTensor output: The network output on the samples.
+        :param EquationInterface equation: The governing equation
+            representing the physics.
+        :param torch.Tensor forcing: The precomputed forcing of the equation
+            on the samples, if any. Default is ``None``.
+        :return: The residual of the neural network solution.
+        :rtype: LabelTensor
+        """
+        kwargs = {} if forcing is None else {"forcing_": forcing}
+        needs_params = self.__equation_needs_params.get(equation)
+        if needs_params is None:
+            # the first time an equation is used, we check if it needs the
+            # unknown parameters (inverse problem), which occurs when the
+            # function has three inputs
+            try:
+                residual = equation.residual(samples, output, **kwargs)
+                self.__equation_needs_params[equation] = False
+            except TypeError:
+                residual = equation.residual(
+                    samples, output, self._params, **kwargs
+                )
+                self.__equation_needs_params[equation] = True
+        elif needs_params:
             residual = equation.residual(
-                samples, self.forward(samples), self._params
+                samples, output, self._params, **kwargs
             )
+        else:
+            residual = equation.residual(samples, output, **kwargs)
         return residual
 
     def store_log(self, loss_value):
@@ -238,6 +455,17 @@ class PINNInterface(SolverInterface, metaclass=ABCMeta):
         """
         return self._loss
 
+    @property
+    def derivative_cache(self):
+        """
+        The cache of the derivatives used during the training steps, or
+        ``None`` if derivatives are not cached. Its ``hits`` and ``misses``
+        attributes count the reused and the computed derivatives.
+
+        :rtype: DerivativeCache
+        """
+        return self._derivative_cache
+
     @property
     def current_condition_name(self):
         """
@@ -66,6 +66,11 @@ class PINN(PINNInterface):
         optimizer_kwargs={"lr": 0.001},
         scheduler=ConstantLR,
         scheduler_kwargs={"factor": 1, "total_iters": 0},
+        raw_tensor=False,
+        compile_model=False,
+        cache_derivatives=False,
+        stencil_derivatives=False,
+        fused_forward=False,
     ):
         """
         :param AbstractProblem problem: The formulation of the problem.
@@ -80,6 +85,33 @@ class PINN(PINNInterface):
         :param torch.optim.LRScheduler scheduler: Learning
             rate scheduler.
         :param dict scheduler_kwargs: LR scheduler constructor keyword args.
+        :param bool raw_tensor: If ``True`` the model is executed on plain
+            :class:`torch.Tensor` s, and labels are used only to resolve the
+            input columns and to label the output. It can be used only with
+            models which do not rely on labels. Default is ``False``.
+        :param compile_model: If ``True`` (or a ``dict`` of
+            :func:`torch.compile` keyword arguments) the forward of the model
+            is compiled, implying ``raw_tensor=True``. Default is ``False``.
+        :type compile_model: bool | dict
+        :param bool cache_derivatives: If ``True`` the derivatives computed by
+            the differential operators are shared among all the equations
+            and conditions of a training step, see
+            :class:`~pina.operators.DerivativeCache`. Default is ``False``.
+        :param bool stencil_derivatives: If ``True`` the residuals of the
+            conditions sampled on a grid (see
+            :meth:`~pina.problem.AbstractProblem.discretise_domain`)
+            are computed using finite differences for the derivatives with
+            respect to the grid variables, see
+            :class:`~pina.operators.StencilGrid`. The batch must contain all
+            the grid points of the condition, otherwise automatic
+            differentiation is used. Default is ``False``.
+        :param bool fused_forward: If ``True`` the model is evaluated once on
+            the points of all the physics conditions in the batch, instead of
+            once for each condition. It reduces the per-step overhead when
+            there are many conditions and the model is small. The
+            derivatives are computed once on the whole batch and shared among
+            the conditions by the derivatives cache, which is thus enabled.
+            Default is ``False``.
         """
         super().__init__(
             models=[model],
@@ -88,6 +120,11 @@ class PINN(PINNInterface):
             optimizers_kwargs=[optimizer_kwargs],
             extra_features=extra_features,
             loss=loss,
+            raw_tensor=raw_tensor,
+            compile_model=compile_model,
+            cache_derivatives=cache_derivatives,
+            stencil_derivatives=stencil_derivatives,
+            fused_forward=fused_forward,
         )
 
         # check consistency
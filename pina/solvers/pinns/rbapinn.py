@@ -66,6 +66,9 @@ class RBAPINN(PINN):
         j.cma.2024.116805 <https://doi.org/10.1016/j.cma.2024.116805>`_.
     """
 
+    # the residual based weights are attached to the points of the batches
+    shuffle_points = False
+
     def __init__(
         self,
         problem,
@@ -107,6 +107,9 @@ class SAPINN(PINNInterface):
         j.jcp.2022.111722 <https://doi.org/10.1016/j.jcp.2022.111722>`_.
     """
 
+    # the self adaptive weights are attached to the points of the conditions
+    shuffle_points = False
+
     def __init__(
         self,
         problem,
@@ -200,6 +203,9 @@ class SAPINN(PINNInterface):
         self._vectorial_loss = deepcopy(loss)
         self._vectorial_loss.reduction = "none"
 
+        # number of points of each condition visited in the current epoch
+        self._visited_points = {}
+
     def forward(self, x):
         """
         Forward pass implementation for the PINN
@@ -227,9 +233,11 @@ class SAPINN(PINNInterface):
             samples and equation.
         :rtype: torch.Tensor
         """
+        rows = self._weights_rows(samples.shape[0])
+
         # train weights
         self.optimizer_weights.zero_grad()
-        weighted_loss, _ = self._loss_phys(samples, equation)
+        weighted_loss, _ = self._loss_phys(samples, equation, rows)
         loss_value = -weighted_loss.as_subclass(torch.Tensor)
         self.manual_backward(loss_value)
         self.optimizer_weights.step()
@@ -242,7 +250,7 @@ class SAPINN(PINNInterface):
 
         # train model
         self.optimizer_model.zero_grad()
-        weighted_loss, loss = self._loss_phys(samples, equation)
+        weighted_loss, loss = self._loss_phys(samples, equation, rows)
         loss_value = weighted_loss.as_subclass(torch.Tensor)
         self.manual_backward(loss_value)
         self.optimizer_model.step()
@@ -263,9 +271,11 @@ class SAPINN(PINNInterface):
         :return: The computed data loss.
         :rtype: torch.Tensor
         """
+        rows = self._weights_rows(input_tensor.shape[0])
+
         # train weights
         self.optimizer_weights.zero_grad()
-        weighted_loss, _ = self._loss_data(input_tensor, output_tensor)
+        weighted_loss, _ = self._loss_data(input_tensor, output_tensor, rows)
         loss_value = -weighted_loss.as_subclass(torch.Tensor)
         self.manual_backward(loss_value)
         self.optimizer_weights.step()
@@ -278,7 +288,7 @@ class SAPINN(PINNInterface):
 
         # train model
         self.optimizer_model.zero_grad()
-        weighted_loss, loss = self._loss_data(input_tensor, output_tensor)
+        weighted_loss, loss = self._loss_data(input_tensor, output_tensor, rows)
         loss_value = weighted_loss.as_subclass(torch.Tensor)
         self.manual_backward(loss_value)
         self.optimizer_model.step()
@@ -343,8 +353,25 @@ class SAPINN(PINNInterface):
             self.weights_dict.torchmodel[condition_name].sa_weights.data = (
                 torch.rand((tensor.shape[0], 1), device=device)
             )
+        if self.trainer.shuffle:
+            raise RuntimeError(
+                "SAPINN attaches the self adaptive weights to the points of "
+                "the conditions, so the points must not be shuffled."
+            )
         return super().on_train_start()
 
+    def on_train_epoch_start(self):
+        """
+        This method is called at the start of each training epoch, and it
+        resets the number of visited points of the conditions.
+
+        :return: Whatever is returned by the parent
+            method ``on_train_epoch_start``.
+        :rtype: Any
+        """
+        self._visited_points = {}
+        return super().on_train_epoch_start()
+
     def on_load_checkpoint(self, checkpoint):
         """
         Overriding the Pytorch Lightning ``on_load_checkpoint`` to handle
@@ -359,51 +386,78 @@ class SAPINN(PINNInterface):
             )
         return super().on_load_checkpoint(checkpoint)
 
-    def _loss_phys(self, samples, equation):
+    def _weights_rows(self, n_points):
+        """
+        Return the rows of the self adaptive weights of the points of the
+        current condition in the batch. The points are not shuffled, so the
+        batches of an epoch visit the points of each condition in order,
+        cyclically if the condition has less points than the others.
+
+        :param int n_points: The number of points of the condition in the
+            batch.
+        :return: The rows of the self adaptive weights.
+        :rtype: torch.Tensor
+        """
+        condition_name = self.current_condition_name
+        sa_weights = self.weights_dict.torchmodel[condition_name].sa_weights
+        start = self._visited_points.get(condition_name, 0)
+        self._visited_points[condition_name] = start + n_points
+        rows = torch.arange(start, start + n_points, device=sa_weights.device)
+        return rows % sa_weights.shape[0]
+
+    def _loss_phys(self, samples, equation, rows):
         """
         Elaboration of the physical loss for the SAPINN solver.
 
         :param LabelTensor samples: Input samples to evaluate the physics loss.
         :param EquationInterface equation: the governing equation representing
             the physics.
+        :param torch.Tensor rows: The rows of the self adaptive weights of
+            the samples.
 
         :return: tuple with weighted and not weighted scalar loss
         :rtype: List[LabelTensor, LabelTensor]
         """
         residual = self.compute_residual(samples, equation)
-        return self._compute_loss(residual)
+        return self._compute_loss(residual, rows)
 
-    def _loss_data(self, input_tensor, output_tensor):
+    def _loss_data(self, input_tensor, output_tensor, rows):
         """
         Elaboration of the loss related to data for the SAPINN solver.
 
         :param LabelTensor input_tensor: The input to the neural networks.
         :param LabelTensor output_tensor: The true solution to compare the
             network solution.
+        :param torch.Tensor rows: The rows of the self adaptive weights of
+            the input points.
 
         :return: tuple with weighted and not weighted scalar loss
         :rtype: List[LabelTensor, LabelTensor]
         """
         residual = self.forward(input_tensor) - output_tensor
-        return self._compute_loss(residual)
+        return self._compute_loss(residual, rows)
 
-    def _compute_loss(self, residual):
+    def _compute_loss(self, residual, rows):
         """
         Elaboration of the pointwise loss through the mask model and the
         self adaptive weights
 
         :param LabelTensor residual: the matrix of residuals that have to
             be weighted
+        :param torch.Tensor rows: The rows of the self adaptive weights of
+            the residual points.
 
         :return: tuple with weighted and not weighted loss
         :rtype List[LabelTensor, LabelTensor]
         """
         weights = self.weights_dict.torchmodel[
             self.current_condition_name
-        ].forward()
+        ].forward()[rows]
         loss_value = self._vectorial_loss(
             torch.zeros_like(residual, requires_grad=True), residual
         )
+        # one weight for each point, e.g. LpLoss reduces the components
+        weights = weights.reshape((-1,) + (1,) * (loss_value.dim() - 1))
         return (
             self._vect_to_scalar(weights * loss_value),
             self._vect_to_scalar(loss_value),
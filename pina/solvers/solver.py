@@ -14,8 +14,15 @@ class SolverInterface(pytorch_lightning.LightningModule, metaclass=ABCMeta):
     Solver base class. This class inherits is a wrapper of
     LightningModule class, inheriting all the
     LightningModule methods.
+
+    :var bool shuffle_points: If ``False`` the solver keeps a state attached
+        to the training points (e.g. pointwise weights), so the points must
+        not be reshuffled among the batches. It is used by
+        :class:`~pina.trainer.Trainer` when ``shuffle`` is not given.
     """
 
+    shuffle_points = True
+
     def __init__(
         self,
         models,
@@ -23,6 +30,8 @@ class SolverInterface(pytorch_lightning.LightningModule, metaclass=ABCMeta):
         optimizers,
         optimizers_kwargs,
         extra_features=None,
+        raw_tensor=False,
+        compile_model=False,
     ):
         """
         :param models: A torch neural network model instance.
@@ -37,6 +46,17 @@ class SolverInterface(pytorch_lightning.LightningModule, metaclass=ABCMeta):
             are passed. If it is a list of :class:`torch.nn.Module`, the extra feature
             list is passed to all models. If it is a list of extra features' lists,
             each single list of extra feature is passed to a model.
+        :param bool raw_tensor: If ``True`` the models are executed on plain
+            :class:`torch.Tensor` s, with the input columns resolved once from
+            the labels, and the outputs are converted to
+            :class:`~pina.label_tensor.LabelTensor` only at the end. See
+            :class:`~pina.model.network.Network`. Default is ``False``.
+        :param compile_model: If ``True`` the forward of the models is
+            compiled with :func:`torch.compile`, if a ``dict`` it is passed as
+            keyword arguments to :func:`torch.compile`. Compilation implies
+            ``raw_tensor=True``. If the compiled models can not be built, the
+            solver falls back to eager execution. Default is ``False``.
+        :type compile_model: bool | dict
         """
         super().__init__()
 
@@ -45,6 +65,7 @@ class SolverInterface(pytorch_lightning.LightningModule, metaclass=ABCMeta):
         check_consistency(problem, AbstractProblem)
         check_consistency(optimizers, torch.optim.Optimizer, subclass=True)
         check_consistency(optimizers_kwargs, dict)
+        check_consistency(compile_model, (bool, dict))
 
         # put everything in a list if only one input
         if not isinstance(models, list):
@@ -93,6 +114,11 @@ class SolverInterface(pytorch_lightning.LightningModule, metaclass=ABCMeta):
                         "of list of extra features."
                     )
 
+        # compiled models run on torch.Tensor
+        if compile_model:
+            raw_tensor = True
+            compile_kwargs = {} if compile_model is True else compile_model
+
         # assigning model and optimizers
         self._pina_models = []
         self._pina_optimizers = []
@@ -103,7 +129,10 @@ class SolverInterface(pytorch_lightning.LightningModule, metaclass=ABCMeta):
                 input_variables=problem.input_variables,
                 output_variables=problem.output_variables,
                 extra_features=extra_features[idx],
+                raw_tensor=raw_tensor,
             )
+            if compile_model:
+                model_.compile_model(**compile_kwargs)
             optim_ = optimizers[idx](
                 model_.parameters(), **optimizers_kwargs[idx]
             )
@@ -57,6 +57,8 @@ class SupervisedSolver(SolverInterface):
         optimizer_kwargs={"lr": 0.001},
         scheduler=ConstantLR,
         scheduler_kwargs={"factor": 1, "total_iters": 0},
+        raw_tensor=False,
+        compile_model=False,
     ):
         """
         :param AbstractProblem problem: The formualation of the problem.
@@ -72,6 +74,14 @@ class SupervisedSolver(SolverInterface):
         :param torch.optim.LRScheduler scheduler: Learning
             rate scheduler.
         :param dict scheduler_kwargs: LR scheduler constructor keyword args.
+        :param bool raw_tensor: If ``True`` the model is executed on plain
+            :class:`torch.Tensor` s, and labels are used only to resolve the
+            input columns and to label the output. It can be used only with
+            models which do not rely on labels. Default is ``False``.
+        :param compile_model: If ``True`` (or a ``dict`` of
+            :func:`torch.compile` keyword arguments) the forward of the model
+            is compiled, implying ``raw_tensor=True``. Default is ``False``.
+        :type compile_model: bool | dict
         """
         super().__init__(
             models=[model],
@@ -79,6 +89,8 @@ class SupervisedSolver(SolverInterface):
             optimizers=[optimizer],
             optimizers_kwargs=[optimizer_kwargs],
             extra_features=extra_features,
+            raw_tensor=raw_tensor,
+            compile_model=compile_model,
         )
 
         # check consistency
@@ -119,9 +131,7 @@ class SupervisedSolver(SolverInterface):
         :rtype: LabelTensor
         """
 
-        condition_idx = batch["condition"]
-
-        for condition_id in range(condition_idx.min(), condition_idx.max() + 1):
+        for condition_id, rows in batch["slices"].items():
 
             condition_name = self._dataloader.condition_names[condition_id]
             condition = self.problem.conditions[condition_name]
@@ -137,8 +147,8 @@ class SupervisedSolver(SolverInterface):
                     f"{type(self).__name__} works only in data-driven mode."
                 )
 
-            output_pts = out[condition_idx == condition_id]
-            input_pts = pts[condition_idx == condition_id]
+            output_pts = out[rows]
+            input_pts = pts[rows]
 
             loss = (
                 self.loss_data(input_pts=input_pts, output_pts=output_pts)
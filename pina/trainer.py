@@ -2,27 +2,83 @@
 
 import torch
 import pytorch_lightning
+from pytorch_lightning.callbacks import Callback
+from pytorch_lightning.strategies import DDPStrategy
 from .utils import check_consistency
-from .dataset import SamplePointDataset, SamplePointLoader, DataPointDataset
+from .dataset import (
+    SamplePointDataset,
+    SamplePointLoader,
+    DataPointDataset,
+    StreamingPointDataset,
+)
 from .solvers.solver import SolverInterface
 
 
+class _DistributedTraining(Callback):
+    """
+    Callback keeping a parallel training consistent across the ranks, see
+    :meth:`Trainer._setup_distributed` and
+    :meth:`Trainer._all_reduce_unknown_parameters`.
+    """
+
+    def setup(self, trainer, pl_module, stage):
+        if stage == "fit":
+            trainer._setup_distributed()
+
+    def on_after_backward(self, trainer, pl_module):
+        trainer._all_reduce_unknown_parameters()
+
+
 class Trainer(pytorch_lightning.Trainer):
 
-    def __init__(self, solver, batch_size=None, **kwargs):
+    def __init__(
+        self,
+        solver,
+        batch_size=None,
+        shuffle=None,
+        prefetch=0,
+        pin_memory=False,
+        **kwargs,
+    ):
         """
         PINA Trainer class for costumizing every aspect of training via flags.
 
         :param solver: A pina:class:`SolverInterface` solver for the differential problem.
         :type solver: SolverInterface
         :param batch_size: How many samples per batch to load. If ``batch_size=None`` all
-            samples are loaded and data are not batched, defaults to None.
-        :type batch_size: int | None
+            samples are loaded and data are not batched. If a ``dict``, the
+            number (or fraction) of samples of each condition in every batch,
+            see :class:`~pina.dataset.SamplePointLoader`. Defaults to None.
+        :type batch_size: int | dict | None
+        :param shuffle: How the points are shuffled among the batches at every
+            epoch, see :class:`~pina.dataset.SamplePointLoader`. If ``None``,
+            the points are shuffled unless the solver keeps a state attached
+            to them (see ``shuffle_points`` of the solver). Defaults to None.
+        :type shuffle: bool | str | None
+        :param int prefetch: How many batches are prepared ahead by a
+            background thread during the training step, see
+            :class:`~pina.dataset.SamplePointLoader`. Defaults to 0.
+        :param bool pin_memory: Whether the data points read from
+            memory-mapped files are staged in pinned memory before being
+            copied to the GPU. Defaults to False.
 
         :Keyword Arguments:
             The additional keyword arguments specify the training setup
             and can be choosen from the `pytorch-lightning
             Trainer API <https://lightning.ai/docs/pytorch/stable/common/trainer.html#trainer-class-api>`_
+
+        .. note::
+            The training is parallel if more than one device is passed, with
+            a DDP ``strategy`` (e.g. ``strategy='ddp'`` or ``'ddp_fork'``,
+            with ``accelerator='cpu'`` and the ``gloo`` backend on CPU). Every
+            rank trains on a disjoint shard of the points of each condition
+            (see :meth:`~pina.dataset.SamplePointLoader.shard`) and the
+            gradients are averaged across the ranks. The sample points of
+            the problem and the unknown parameters of the inverse problems
+            are broadcast from the rank 0 when the training starts, and the
+            points are broadcast again whenever they change (e.g. by
+            :class:`~pina.callbacks.R3Refinement`), so the ranks stay
+            consistent.
         """
 
         super().__init__(**kwargs)
@@ -30,10 +86,15 @@ class Trainer(pytorch_lightning.Trainer):
         # check inheritance consistency for solver and batch size
         check_consistency(solver, SolverInterface)
         if batch_size is not None:
-            check_consistency(batch_size, int)
+            check_consistency(batch_size, (int, dict))
 
         self._model = solver
         self.batch_size = batch_size
+        if shuffle is None:
+            shuffle = solver.shuffle_points
+        self.shuffle = shuffle
+        self.prefetch = prefetch
+        self.pin_memory = pin_memory
 
         # create dataloader
         if solver.problem.have_sampled_points is False:
@@ -45,25 +106,166 @@ class Trainer(pytorch_lightning.Trainer):
                 "in the provided locations."
             )
 
+        if solver.problem.streaming_conditions and not solver.shuffle_points:
+            raise RuntimeError(
+                f"{type(solver).__name__} keeps a state attached to the "
+                "training points, so it does not support the streaming "
+                f"conditions {solver.problem.streaming_conditions}."
+            )
+
+        if len(self._accelerator_connector._parallel_devices) > 1:
+            if not isinstance(self.strategy, DDPStrategy):
+                raise RuntimeError(
+                    "Parallel training is supported only with the DDP "
+                    f"strategies, got {type(self.strategy).__name__}."
+                )
+            if not solver.shuffle_points:
+                raise RuntimeError(
+                    f"{type(solver).__name__} keeps a state attached to the "
+                    "training points, so it does not support parallel "
+                    "training."
+                )
+            self.callbacks.append(_DistributedTraining())
+
         self._create_or_update_loader()
 
+    @property
+    def _is_distributed(self):
+        """
+        ``True`` if the ranks of a parallel training are running.
+        """
+        return (
+            torch.distributed.is_available()
+            and torch.distributed.is_initialized()
+            and self.world_size > 1
+        )
+
+    def _setup_distributed(self):
+        """
+        Set up a rank of a parallel training, once the ranks are running:
+        the loader keeps only the shard of the points of the rank, the
+        sample points of the problem are replaced by the ones of the rank 0
+        (see :meth:`_broadcast_problem_points`), and so are the unknown
+        parameters of the inverse problems.
+        """
+        if not self._is_distributed:
+            return
+
+        device = self.strategy.root_device
+        self._loader.shard(self.global_rank, self.world_size, device)
+        self._broadcast_problem_points()
+        self._loader.update(self._model.problem)
+
+        pb = self._model.problem
+        if hasattr(pb, "unknown_parameters"):
+            for key in pb.unknown_parameters:
+                param = torch.nn.Parameter(
+                    pb.unknown_parameters[key].data.to(device)
+                )
+                torch.distributed.broadcast(param.data, src=0)
+                pb.unknown_parameters[key] = param
+
+    def _broadcast_problem_points(self, names=None):
+        """
+        Replace the sample points of some conditions of the problem with the
+        ones of the rank 0, e.g. after a random refinement performed by
+        every rank. The conditions changed in any rank are broadcast, as
+        tensors: first the shape of the points, then their values.
+
+        :param list(str) names: The changed conditions. Default is ``None``,
+            i.e. all the sample conditions.
+        """
+        pb = self._model.problem
+        device = self.strategy.root_device
+        sample_names = [
+            name
+            for name, condition in pb.conditions.items()
+            if name in pb.input_pts and not hasattr(condition, "output_points")
+        ]
+        if not sample_names:
+            return
+
+        changed = torch.tensor(
+            [names is None or name in names for name in sample_names],
+            dtype=torch.int32,
+            device=device,
+        )
+        torch.distributed.all_reduce(changed, op=torch.distributed.ReduceOp.MAX)
+        for name, is_changed in zip(sample_names, changed.tolist()):
+            if not is_changed:
+                continue
+            pts = pb.input_pts[name]
+            shape = torch.tensor(pts.shape, device=device)
+            torch.distributed.broadcast(shape, src=0)
+            if self.global_rank == 0:
+                values = pts.tensor.detach().to(device).contiguous()
+            else:
+                values = torch.empty(
+                    tuple(shape.tolist()), dtype=pts.dtype, device=device
+                )
+            torch.distributed.broadcast(values, src=0)
+            if self.global_rank != 0:
+                pb.input_pts[name] = SamplePointLoader._label(
+                    values.to(pts.device), pts.labels
+                )
+
+    def _all_reduce_unknown_parameters(self):
+        """
+        Average the gradients of the unknown parameters of the inverse
+        problems across the ranks. They are not parameters of the solver,
+        so the gradients are not averaged by DDP.
+        """
+        pb = self._model.problem
+        if not self._is_distributed or not hasattr(pb, "unknown_parameters"):
+            return
+        for param in pb.unknown_parameters.values():
+            if param.grad is None:
+                param.grad = torch.zeros_like(param)
+            torch.distributed.all_reduce(param.grad)
+            param.grad /= self.world_size
+
     def _create_or_update_loader(self):
         """
         This method is used here because is resampling is needed
         during training, there is no need to define to touch the
-        trainer dataloader, just call the method.
+        trainer dataloader, just call the method. If the loader already
+        exists, only the points of the conditions which have changed are
+        updated, see :meth:`~pina.dataset.SamplePointLoader.update`. In a
+        parallel training, the points of the rank 0 are used by all the
+        ranks.
         """
         devices = self._accelerator_connector._parallel_devices
+        loader = getattr(self, "_loader", None)
+        if self._is_distributed:
+            names = None
+            if loader is not None:
+                names = loader.sample_dataset.changed_conditions(
+                    self._model.problem
+                )
+            self._broadcast_problem_points(names)
 
-        if len(devices) > 1:
-            raise RuntimeError("Parallel training is not supported yet.")
+        if loader is not None and loader.update(self._model.problem):
+            return
 
         device = devices[0]
+        if self._is_distributed:
+            device = self.strategy.root_device
         dataset_phys = SamplePointDataset(self._model.problem, device)
         dataset_data = DataPointDataset(self._model.problem, device)
+        dataset_stream = None
+        if self._model.problem.streaming_conditions:
+            dataset_stream = StreamingPointDataset(self._model.problem, device)
         self._loader = SamplePointLoader(
-            dataset_phys, dataset_data, batch_size=self.batch_size, shuffle=True
+            dataset_phys,
+            dataset_data,
+            batch_size=self.batch_size,
+            shuffle=self.shuffle,
+            stream_dataset=dataset_stream,
+            prefetch=self.prefetch,
+            pin_memory=self.pin_memory,
         )
+        if self._is_distributed:
+            self._loader.shard(self.global_rank, self.world_size, device)
         pb = self._model.problem
         if hasattr(pb, "unknown_parameters"):
             for key in pb.unknown_parameters:
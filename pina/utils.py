@@ -1,7 +1,6 @@
 """Utils module"""
 
 from torch.utils.data import Dataset, DataLoader
-from functools import reduce
 import types
 
 import torch
@@ -71,19 +70,12 @@ def number_parameters(
 
 def merge_tensors(tensors):  # name to be changed
     if tensors:
-        return reduce(merge_two_tensors, tensors[1:], tensors[0])
+        return LabelTensor.cartesian_product(tensors)
     raise ValueError("Expected at least one tensor")
 
 
 def merge_two_tensors(tensor1, tensor2):
-    n1 = tensor1.shape[0]
-    n2 = tensor2.shape[0]
-
-    tensor1 = LabelTensor(tensor1.repeat(n2, 1), labels=tensor1.labels)
-    tensor2 = LabelTensor(
-        tensor2.repeat_interleave(n1, dim=0), labels=tensor2.labels
-    )
-    return tensor1.append(tensor2)
+    return LabelTensor.cartesian_product([tensor1, tensor2])
 
 
 def torch_lhs(n, dim):
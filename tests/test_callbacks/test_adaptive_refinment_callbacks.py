@@ -87,3 +87,36 @@ def test_r3refinment_routine():
     trainer.train()
     after_n_points = {loc : len(pts) for loc, pts in trainer.solver.problem.input_pts.items()}
     assert before_n_points == after_n_points
+
+def test_r3refinment_updates_loader():
+    model = FeedForward(len(poisson_problem.input_variables),
+                    len(poisson_problem.output_variables))
+    solver = PINN(problem=poisson_problem, model=model)
+    trainer = Trainer(solver=solver,
+                      callbacks=[R3Refinement(sample_every=1)],
+                      accelerator='cpu',
+                      max_epochs=2)
+    loader = trainer._loader
+    trainer.train()
+    # the loader iterated by lightning is updated in place
+    assert trainer._loader is loader
+    dataset = loader.sample_dataset
+    for i, name in enumerate(dataset.condition_names):
+        rows = dataset.condition_indeces == i
+        assert torch.equal(dataset.pts.tensor[rows],
+                           poisson_problem.input_pts[name].extract(
+                               dataset.pts.labels).tensor)
+
+def test_r3refinment_residual_keeps_points():
+    model = FeedForward(len(poisson_problem.input_variables),
+                    len(poisson_problem.output_variables))
+    solver = PINN(problem=poisson_problem, model=model)
+    r3 = R3Refinement(sample_every=1)
+    trainer = Trainer(solver=solver, callbacks=[r3], accelerator='cpu',
+                      max_epochs=1)
+    r3.on_train_start(trainer, None)
+    r3._compute_residual(trainer)
+    # the residual is computed on copies of the problem points
+    for pts in poisson_problem.input_pts.values():
+        assert not pts.requires_grad
+        assert pts.grad is None
@@ -42,3 +42,20 @@ def test_init_inputfunc():
         Condition(input_points=3., equation='example')
     with pytest.raises(TypeError):
         Condition(input_points=example_domain, equation=example_output_pts)
+
+
+def test_init_stream_points():
+    condition = Condition(location=example_domain,
+                          equation=FixedValue(0.0),
+                          stream_points=10)
+    assert condition.stream_points == 10
+    assert Condition(location=example_domain,
+                     equation=FixedValue(0.0)).stream_points is None
+    with pytest.raises(ValueError):
+        Condition(input_points=example_input_pts,
+                  equation=FixedValue(0.0),
+                  stream_points=10)
+    with pytest.raises(ValueError):
+        Condition(location=example_domain,
+                  equation=FixedValue(0.0),
+                  stream_points=0)
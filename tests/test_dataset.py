@@ -1,7 +1,13 @@
+import math
+import threading
+
+import numpy as np
 import torch
 import pytest
 
-from pina.dataset import SamplePointDataset, SamplePointLoader, DataPointDataset
+from pina.dataset import (SamplePointDataset, SamplePointLoader,
+                           DataPointDataset, StreamingPointDataset,
+                           MemoryMappedPoints)
 from pina import LabelTensor, Condition
 from pina.equation import Equation
 from pina.geometry import CartesianDomain
@@ -81,14 +87,382 @@ def test_loader():
     loader = SamplePointLoader(sample_dataset, data_dataset, batch_size=10)
 
     for batch in loader:
-        assert len(batch) in [2, 3]
+        assert len(batch) in [3, 4]
         assert batch['pts'].shape[0] <= 10
+        for condition_id, rows in batch['slices'].items():
+            assert (batch['condition'][rows] == condition_id).all()
+        assert sum(rows.stop - rows.start
+                   for rows in batch['slices'].values()) == len(batch['pts'])
         assert batch['pts'].requires_grad == True
         assert batch['pts'].labels == ['x', 'y']
 
     loader2 = SamplePointLoader(sample_dataset, data_dataset, batch_size=None)
     assert len(list(loader2)) == 2
 
+def test_loader_forcing():
+    def source(input_):
+        return torch.sin(input_.extract(['x']) * torch.pi)
+
+    class ForcedPoisson(SpatialProblem):
+        output_variables = ['u']
+        spatial_domain = CartesianDomain({'x': [0, 1], 'y': [0, 1]})
+        conditions = {
+            'gamma1': Condition(
+                location=CartesianDomain({'x': [0, 1], 'y':  1}),
+                equation=FixedValue(0.0)),
+            'D': Condition(
+                location=CartesianDomain({'x': [0, 1], 'y': [0, 1]}),
+                equation=Equation(laplace_equation, forcing=source)),
+        }
+
+    problem = ForcedPoisson()
+    problem.discretise_domain(15, 'random')
+    sample_dataset = SamplePointDataset(problem, device='cpu')
+    data_dataset = DataPointDataset(problem, device='cpu')
+    assert sample_dataset.forcing[0] is None
+    assert sample_dataset.forcing[1].shape == (15, 1)
+
+    for shuffle in [False, True, 'stratified']:
+        loader = SamplePointLoader(sample_dataset, data_dataset,
+                                   batch_size=10, shuffle=shuffle)
+        forcing = []
+        for batch in loader:
+            mask = batch['condition'] == 1
+            if not mask.any():
+                assert 'forcing' not in batch
+                continue
+            assert list(batch['forcing']) == [1]
+            assert batch['forcing'][1].shape[0] == mask.sum()
+            assert torch.allclose(batch['forcing'][1],
+                                  source(batch['pts'][mask]))
+            forcing.append(batch['forcing'][1])
+        if not shuffle:
+            assert torch.equal(torch.cat(forcing), sample_dataset.forcing[1])
+
+def test_loader_shuffle():
+    sample_dataset = SamplePointDataset(poisson, device='cpu')
+    data_dataset = DataPointDataset(poisson, device='cpu')
+    with pytest.raises(ValueError):
+        SamplePointLoader(sample_dataset, data_dataset, shuffle='random')
+
+    def epoch(loader):
+        batches = [batch for batch in loader if 'output' not in batch]
+        return torch.cat([batch['pts'].tensor for batch in batches])
+
+    fixed = SamplePointLoader(sample_dataset, data_dataset, batch_size=40,
+                              shuffle=False)
+    assert torch.equal(epoch(fixed), epoch(fixed))
+
+    loader = SamplePointLoader(sample_dataset, data_dataset, batch_size=40)
+    first, second = epoch(loader), epoch(loader)
+    # each epoch sees all the points, in a different order
+    assert not torch.equal(first, second)
+    assert torch.equal(first.sort(dim=0).values, second.sort(dim=0).values)
+    assert torch.equal(first.sort(dim=0).values,
+                       sample_dataset.pts.tensor.sort(dim=0).values)
+
+    stratified = SamplePointLoader(sample_dataset, data_dataset,
+                                   batch_size=40, shuffle='stratified')
+    counts = torch.bincount(sample_dataset.condition_indeces)
+    for batch in stratified:
+        if 'output' in batch:
+            continue
+        assert (batch['condition'].diff() >= 0).all()
+        batch_counts = torch.bincount(batch['condition'], minlength=5)
+        # 140 points in 4 batches: a quarter of each condition per batch
+        assert ((batch_counts - counts / 4).abs() <= 1).all()
+        for condition_id, rows in batch['slices'].items():
+            assert (batch['condition'][rows] == condition_id).all()
+
+def test_loader_condition_batch_size():
+    sample_dataset = SamplePointDataset(poisson, device='cpu')
+    data_dataset = DataPointDataset(poisson, device='cpu')
+    with pytest.raises(ValueError):
+        SamplePointLoader(sample_dataset, data_dataset, batch_size={'E': 10})
+    with pytest.raises(ValueError):
+        SamplePointLoader(sample_dataset, data_dataset, batch_size={'D': 1.5})
+
+    for shuffle in [False, True]:
+        sample_dataset = SamplePointDataset(poisson, device='cpu')
+        data_dataset = DataPointDataset(poisson, device='cpu')
+        loader = SamplePointLoader(
+            sample_dataset, data_dataset, shuffle=shuffle,
+            batch_size={'D': 30, 'gamma1': 0.5, 'data2': 20})
+        # D needs 4 batches of 30 points, data2 3 batches of 20 points
+        assert len(loader) == 7
+        interior = []
+        for batch in loader:
+            counts = {loader.condition_names[i]: rows.stop - rows.start
+                      for i, rows in batch['slices'].items()}
+            if 'output' in batch:
+                assert counts == {'data': 1, 'data2': 20}
+            else:
+                assert counts == {'gamma1': 5, 'gamma2': 10, 'gamma3': 10,
+                                  'gamma4': 10, 'D': 30}
+                interior.append(batch['pts'][batch['slices'][4]].tensor)
+        # every interior point is visited in the epoch
+        interior = torch.cat(interior).unique(dim=0)
+        assert interior.shape == (100, 2)
+
+def test_loader_condition_batch_plan():
+    sample_dataset = SamplePointDataset(poisson, device='cpu')
+    data_dataset = DataPointDataset(poisson, device='cpu')
+    loader = SamplePointLoader(sample_dataset, data_dataset,
+                               batch_size={'D': 0.25, 'gamma1': 5})
+    sizes = {'D': math.ceil(0.25 * 100), 'gamma1': 5, 'gamma2': 10,
+             'gamma3': 10, 'gamma4': 10}
+    batch_num = max(math.ceil(100 / sizes['D']), math.ceil(10 / 5))
+    # the data conditions are included in full, in a single batch
+    assert len(loader) == batch_num + 1
+    for _ in range(2):
+        batches = [batch for batch in loader if 'output' not in batch]
+        assert len(batches) == batch_num
+        for batch in batches:
+            counts = {loader.condition_names[i]: rows.stop - rows.start
+                      for i, rows in batch['slices'].items()}
+            assert counts == sizes
+
+    # no batches if all the conditions are empty
+    plan = SamplePointLoader._plan_batches(
+        ['D', 'gamma1'], torch.zeros(0, dtype=torch.int64), {'D': 0.25})
+    assert plan == ([0, 0], 0)
+
+def test_loader_update():
+    problem = Poisson()
+    problem.discretise_domain(10, 'grid', locations=boundaries)
+    sample_dataset = SamplePointDataset(problem, device='cpu')
+    data_dataset = DataPointDataset(problem, device='cpu')
+    loader = SamplePointLoader(sample_dataset, data_dataset, batch_size=50,
+                               shuffle=False)
+    data_pts = data_dataset.input_pts
+    storage = sample_dataset.pts.untyped_storage().data_ptr()
+
+    # same number of points: the segment is replaced in place
+    problem.discretise_domain(10, 'random', locations=['gamma2'])
+    assert loader.update(problem)
+    assert sample_dataset.pts.untyped_storage().data_ptr() == storage
+    assert torch.equal(sample_dataset.pts.tensor[10:20],
+                       problem.input_pts['gamma2'].tensor)
+
+    # different number of points: the segment is resized
+    problem.add_points({'gamma3': LabelTensor(torch.rand(5, 2), ['x', 'y'])})
+    assert loader.update(problem)
+    assert len(sample_dataset) == 145
+    assert torch.equal(sample_dataset.pts.tensor[20:35],
+                       problem.input_pts['gamma3'].tensor)
+    assert (sample_dataset.condition_indeces[20:35] == 2).all()
+    assert len(loader) == 3 + 2
+    pts = torch.cat([batch['pts'].tensor for batch in loader
+                     if 'output' not in batch])
+    assert torch.equal(pts, sample_dataset.pts.tensor)
+    assert data_dataset.input_pts is data_pts
+
+    # the conditions changed: the loader can not be updated
+    problem.conditions = {name: condition for name, condition
+                          in Poisson.conditions.items() if name != 'data2'}
+    assert not loader.update(problem)
+
+def test_loader_streaming():
+    def source(input_):
+        return torch.sin(input_.extract(['x']) * torch.pi)
+
+    class StreamingPoisson(SpatialProblem):
+        output_variables = ['u']
+        spatial_domain = CartesianDomain({'x': [0, 1], 'y': [0, 1]})
+        conditions = {
+            'gamma1': Condition(
+                location=CartesianDomain({'x': [0, 1], 'y':  1}),
+                equation=FixedValue(0.0)),
+            'D': Condition(
+                location=CartesianDomain({'x': [0, 1], 'y': [0, 1]}),
+                equation=Equation(laplace_equation, forcing=source),
+                stream_points=20),
+            'data': Condition(
+                input_points=in_,
+                output_points=out_),
+        }
+
+    problem = StreamingPoisson()
+    problem.discretise_domain(15, 'random')
+    assert 'D' not in problem.input_pts
+
+    def make_loader(seed):
+        return SamplePointLoader(
+            SamplePointDataset(problem, device='cpu'),
+            DataPointDataset(problem, device='cpu'),
+            batch_size=10,
+            stream_dataset=StreamingPointDataset(problem, 'cpu', seed=seed))
+
+    loader = make_loader(0)
+    assert loader.condition_names == ['gamma1', 'D', 'data']
+    assert len(loader) == 2 + 1
+    streamed = []
+    for _ in range(2):
+        for batch in loader:
+            if 'output' in batch:
+                assert list(batch['slices']) == [2]
+                continue
+            rows = batch['slices'][1]
+            assert rows.stop == len(batch['pts']) and rows.stop - rows.start == 20
+            assert (batch['condition'][rows] == 1).all()
+            assert list(batch['forcing']) == [1]
+            assert torch.allclose(batch['forcing'][1],
+                                  source(batch['pts'][rows]))
+            streamed.append(batch['pts'].tensor[rows].detach())
+    # fresh points at every batch, reproducible with the seed
+    assert len(streamed) == 4
+    assert not torch.equal(streamed[0], streamed[1])
+    batch = next(b for b in make_loader(0) if 'output' not in b)
+    assert torch.equal(batch['pts'].tensor[batch['slices'][1]], streamed[0])
+
+    # the loader keeps the streaming conditions when updated
+    problem.discretise_domain(15, 'random', locations=['gamma1'])
+    assert loader.update(problem)
+    with pytest.raises(ValueError):
+        SamplePointLoader(SamplePointDataset(problem, device='cpu'),
+                          DataPointDataset(problem, device='cpu'),
+                          batch_size={'D': 5},
+                          stream_dataset=StreamingPointDataset(problem, 'cpu'))
+
+def test_loader_memory_mapped(tmp_path):
+    np.save(tmp_path / 'params.npy', np.random.rand(50, 2))
+    np.save(tmp_path / 'snapshots.npy', np.random.rand(50, 1))
+    params = MemoryMappedPoints(tmp_path / 'params.npy', ['x', 'y'])
+    snapshots = MemoryMappedPoints(tmp_path / 'snapshots.npy', 'u')
+    with pytest.raises(ValueError):
+        MemoryMappedPoints(tmp_path / 'params.npy', ['x'])
+    with pytest.raises(TypeError):
+        Condition(input_points=params, equation=my_laplace)
+
+    class SnapshotProblem(SpatialProblem):
+        output_variables = ['u']
+        spatial_domain = CartesianDomain({'x': [0, 1], 'y': [0, 1]})
+        conditions = {
+            'data': Condition(input_points=in2_, output_points=out2_),
+            'snapshots': Condition(input_points=params,
+                                   output_points=snapshots),
+        }
+
+    problem = SnapshotProblem()
+    data_dataset = DataPointDataset(problem, device='cpu')
+    assert data_dataset.memory_mapped
+    assert len(data_dataset) == 110
+    input_pts, output_pts = data_dataset.read(slice(55, 70))
+    assert input_pts.labels == ['x', 'y'] and output_pts.labels == ['u']
+    expected = torch.cat([in2_.tensor,
+                          torch.tensor(np.load(tmp_path / 'params.npy'),
+                                       dtype=in2_.dtype)])
+    assert torch.equal(input_pts.tensor, expected[55:70])
+
+    expected = torch.cat([out2_.tensor,
+                          torch.tensor(np.load(tmp_path / 'snapshots.npy'),
+                                       dtype=out2_.dtype)])
+    for shuffle in [False, True, 'stratified']:
+        loader = SamplePointLoader(
+            SamplePointDataset(problem, device='cpu'), data_dataset,
+            batch_size=20, shuffle=shuffle)
+        assert len(loader) == 6
+        outputs = []
+        for batch in loader:
+            assert batch['pts'].labels == ['x', 'y']
+            for condition_id, rows in batch['slices'].items():
+                assert (batch['condition'][rows] == condition_id).all()
+            outputs.append(batch['output'].tensor)
+        outputs = torch.cat(outputs)
+        if not shuffle:
+            assert torch.equal(outputs, expected)
+        # every point is read once per epoch
+        assert torch.equal(outputs.sort(dim=0).values,
+                           expected.sort(dim=0).values)
+
+def test_loader_prefetch():
+    sample_dataset = SamplePointDataset(poisson, device='cpu')
+    data_dataset = DataPointDataset(poisson, device='cpu')
+    with pytest.raises(ValueError):
+        SamplePointLoader(sample_dataset, data_dataset, prefetch=-1)
+    with pytest.raises(TypeError):
+        SamplePointLoader(sample_dataset, data_dataset, prefetch=1.5)
+
+    fixed = SamplePointLoader(sample_dataset, data_dataset, batch_size=20,
+                              shuffle=False)
+    prefetched = SamplePointLoader(sample_dataset, data_dataset,
+                                   batch_size=20, shuffle=False, prefetch=2)
+    # the dataset shared by the loaders is not modified
+    assert data_dataset.condition_indeces.tolist() == [0] + [1] * 60
+    conditions = torch.cat([batch['condition'] for batch in prefetched])
+    assert conditions.unique().tolist() == list(
+        range(len(prefetched.condition_names)))
+    # the same batches, in the same order
+    for batch, expected in zip(prefetched, fixed):
+        assert batch['pts'].requires_grad
+        assert batch['pts'].labels == expected['pts'].labels
+        assert torch.equal(batch['pts'].tensor, expected['pts'].tensor)
+        assert torch.equal(batch['condition'], expected['condition'])
+    assert len(list(prefetched)) == len(fixed)
+
+    # stopping the iteration stops the background thread
+    iterator = iter(prefetched)
+    next(iterator)
+    iterator.close()
+
+
+def test_loader_prefetch_error(monkeypatch):
+    sample_dataset = SamplePointDataset(poisson, device='cpu')
+    data_dataset = DataPointDataset(poisson, device='cpu')
+    loader = SamplePointLoader(sample_dataset, data_dataset, batch_size=20,
+                               shuffle=False, prefetch=2)
+    batch = loader._batch
+
+    def failing_batch(i):
+        if i == 1:
+            raise RuntimeError('broken batch')
+        return batch(i)
+
+    monkeypatch.setattr(loader, '_batch', failing_batch)
+    n_threads = threading.active_count()
+    iterator = iter(loader)
+    next(iterator)
+    # the error of the background thread is raised in the consumer, and
+    # the thread is joined
+    with pytest.raises(RuntimeError, match='broken batch'):
+        next(iterator)
+    assert threading.active_count() == n_threads
+
+
+def test_loader_shard():
+    shards = []
+    for rank in range(3):
+        sample_dataset = SamplePointDataset(poisson, device='cpu')
+        data_dataset = DataPointDataset(poisson, device='cpu')
+        loader = SamplePointLoader(sample_dataset, data_dataset,
+                                   batch_size=20, shuffle=False)
+        loader.shard(rank, 3)
+        # ceil(count / 3) points of each condition in every shard
+        counts = torch.bincount(sample_dataset.condition_indeces).tolist()
+        assert counts == [4, 4, 4, 4, 34]
+        assert len(data_dataset) == 1 + 20
+        assert len(loader) == 3 + 2
+        shards.append(sample_dataset.pts.tensor[-34:])
+        for batch in loader:
+            for condition_id, rows in batch['slices'].items():
+                assert (batch['condition'][rows] == condition_id).all()
+    # the shards of the interior points cover all the points
+    interior = poisson.input_pts['D'].tensor
+    assert torch.equal(torch.cat(shards)[:100], interior)
+    assert torch.equal(torch.cat(shards)[100:], interior[:2])
+
+    # the updated points are sharded
+    problem = Poisson()
+    problem.discretise_domain(10, 'grid', locations=boundaries)
+    sample_dataset = SamplePointDataset(problem, device='cpu')
+    loader = SamplePointLoader(sample_dataset,
+                               DataPointDataset(problem, device='cpu'))
+    loader.shard(1, 2)
+    problem.add_points({'gamma3': LabelTensor(torch.rand(4, 2), ['x', 'y'])})
+    assert loader.update(problem)
+    assert torch.equal(sample_dataset.pts.tensor[10:17],
+                       problem.input_pts['gamma3'].tensor[7:])
+
 def test_loader2():
     poisson2 = Poisson()
     del poisson.conditions['data2']
@@ -99,7 +473,7 @@ def test_loader2():
     loader = SamplePointLoader(sample_dataset, data_dataset, batch_size=10)
 
     for batch in loader:
-        assert len(batch) == 2 # only phys condtions
+        assert len(batch) == 3 # only phys condtions
         assert batch['pts'].shape[0] <= 10
         assert batch['pts'].requires_grad == True
         assert batch['pts'].labels == ['x', 'y']
@@ -116,7 +490,7 @@ def test_loader3():
     loader = SamplePointLoader(sample_dataset, data_dataset, batch_size=10)
 
     for batch in loader:
-        assert len(batch) == 2 # only phys condtions
+        assert len(batch) == 3 # only phys condtions
         assert batch['pts'].shape[0] <= 10
         assert batch['pts'].requires_grad == True
         assert batch['pts'].labels == ['x', 'y']
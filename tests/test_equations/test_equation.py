@@ -46,3 +46,26 @@ def test_residual():
 
     assert eq_1_res.shape == torch.Size([10, 2])
     assert eq_2_res.shape == torch.Size([10, 1])
+
+
+def test_forcing():
+    def source(input_):
+        return (torch.sin(input_.extract(['x']) * torch.pi) *
+                torch.sin(input_.extract(['y']) * torch.pi))
+
+    def laplace(input_, output_):
+        return laplacian(output_.extract(['u1']), input_)
+
+    with pytest.raises(ValueError):
+        Equation(laplace, forcing=1.0)
+    eq = Equation(laplace, forcing=source)
+
+    pts = LabelTensor(torch.rand(10, 2), labels=['x', 'y'])
+    pts.requires_grad = True
+    u = torch.pow(pts, 2)
+    u.labels = ['u1', 'u2']
+
+    assert torch.allclose(eq.residual(pts, u), Equation(eq2).residual(pts, u))
+    forcing = torch.ones(10, 1)
+    assert torch.allclose(eq.residual(pts, u, forcing_=forcing),
+                          laplace(pts, u) - 1)
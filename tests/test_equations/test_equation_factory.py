@@ -0,0 +1,170 @@
+from math import pi
+
+import torch
+import pytest
+
+from pina import LabelTensor
+from pina.operators import grad, laplacian, DerivativeCache
+from pina.equation import (
+    Burgers,
+    Heat,
+    Wave,
+    AdvectionDiffusion,
+    Stokes,
+    NavierStokes,
+)
+
+
+def _points():
+    torch.manual_seed(0)
+    pts = LabelTensor(torch.rand(20, 3), labels=['x', 'y', 't'])
+    pts.requires_grad = True
+    return pts
+
+
+def _output(pts):
+    x, y, t = pts.extract(['x']), pts.extract(['y']), pts.extract(['t'])
+    u = torch.sin(x * y + t) * x
+    v = torch.cos(x + y * t) * t
+    p = x**2 * y * t
+    out = torch.cat([u, v, p], dim=1).as_subclass(LabelTensor)
+    out.labels = ['u', 'v', 'p']
+    return out
+
+
+def test_burgers():
+    pts = _points()
+    u = _output(pts)
+    res = Burgers(0.01 / pi, components=['u'], d=['x']).residual(pts, u)
+    du = grad(u, pts)
+    ddu = grad(du, pts, components=['dudx'], d=['x'])
+    expected = (du.extract(['dudt']) + u.extract(['u']) * du.extract(['dudx'])
+                - 0.01 / pi * ddu)
+    assert res.labels == ['u']
+    torch.testing.assert_close(res.tensor, expected.tensor)
+
+
+def test_heat():
+    pts = _points()
+    u = _output(pts)
+    res = Heat(0.3, components=['u', 'v']).residual(pts, u)
+    du = grad(u, pts, components=['u', 'v'], d=['t'])
+    lap = laplacian(u, pts, components=['u', 'v'], d=['x', 'y'])
+    assert res.labels == ['u', 'v']
+    torch.testing.assert_close(res.tensor, (du - 0.3 * lap).tensor)
+
+
+def test_wave():
+    pts = _points()
+    u = _output(pts)
+    res = Wave(2.0, components=['u'], d=['x', 'y']).residual(pts, u)
+    du = grad(u, pts, components=['u'])
+    u_tt = grad(du, pts, components=['dudt'], d=['t'])
+    lap = laplacian(u, pts, components=['u'], d=['x', 'y'])
+    torch.testing.assert_close(res.tensor, (u_tt - 4.0 * lap).tensor)
+
+
+def test_advection_diffusion():
+    pts = _points()
+    u = _output(pts)
+    res = AdvectionDiffusion([1.0, 2.0], 0.3, components=['u']).residual(
+        pts, u)
+    du = grad(u, pts, components=['u'])
+    lap = laplacian(u, pts, components=['u'], d=['x', 'y'])
+    expected = (du.extract(['dudt']) + du.extract(['dudx'])
+                + 2.0 * du.extract(['dudy']) - 0.3 * lap)
+    torch.testing.assert_close(res.tensor, expected.tensor)
+    with pytest.raises(ValueError):
+        AdvectionDiffusion([1.0], 0.3).residual(pts, u)
+
+
+def test_steady():
+    pts = _points()
+    u = _output(pts)
+    du = grad(u, pts, components=['u'])
+    lap = laplacian(u, pts, components=['u'], d=['x', 'y'])
+    convection = (u.extract(['u']) * du.extract(['dudx'])
+                  + u.extract(['v']) * du.extract(['dudy']))
+    res = Burgers(0.1, components=['u', 'v'], d=['x', 'y'],
+                  time=None).residual(pts, u)
+    torch.testing.assert_close(res.extract(['u']).tensor,
+                               (convection - 0.1 * lap).tensor)
+    res = Heat(0.3, components=['u'], d=['x', 'y'], time=None).residual(
+        pts, u)
+    torch.testing.assert_close(res.tensor, (-0.3 * lap).tensor)
+    res = Wave(2.0, components=['u'], d=['x', 'y'], time=None).residual(
+        pts, u)
+    torch.testing.assert_close(res.tensor, (-4.0 * lap).tensor)
+    res = AdvectionDiffusion([1.0, 2.0], 0.3, components=['u'],
+                             d=['x', 'y'], time=None).residual(pts, u)
+    expected = (du.extract(['dudx']) + 2.0 * du.extract(['dudy'])
+                - 0.3 * lap)
+    torch.testing.assert_close(res.tensor, expected.tensor)
+
+
+def test_missing_time():
+    pts = _points().extract(['x', 'y'])
+    u = _output(_points())
+    for equation in [Burgers(0.1), Heat(0.3), Wave(2.0),
+                     AdvectionDiffusion([1.0, 2.0], 0.3), NavierStokes(0.1)]:
+        with pytest.raises(ValueError):
+            equation.residual(pts, u)
+
+
+def test_burgers_components():
+    with pytest.raises(ValueError):
+        Burgers(0.1, components=['u'], d=['x', 'y'])
+    pts = _points()
+    u = _output(pts)
+    with pytest.raises(ValueError):
+        Burgers(0.1, d=['x', 'y']).residual(pts, u)
+
+
+def test_stokes_components():
+    pts = _points()
+    u = _output(pts)
+    for equation in [Stokes(d=['x']), NavierStokes(0.1, d=['x', 'y', 't'],
+                                                   time=None)]:
+        with pytest.raises(ValueError):
+            equation.residual(pts, u)
+
+
+def test_stokes():
+    pts = _points()
+    u = _output(pts)
+    res = Stokes(viscosity=0.5, d=['x', 'y']).residual(pts, u)
+    du = grad(u, pts, d=['x', 'y'])
+    lap = laplacian(u, pts, components=['u', 'v'], d=['x', 'y'])
+    momentum = -0.5 * lap + du.extract(['dpdx', 'dpdy'])
+    continuity = du.extract(['dudx']) + du.extract(['dvdy'])
+    assert res.labels == ['u', 'v', 'dudx+dvdy']
+    torch.testing.assert_close(res.extract(['u', 'v']).tensor,
+                               momentum.tensor)
+    torch.testing.assert_close(res.extract(['dudx+dvdy']).tensor,
+                               continuity.tensor)
+
+
+def test_navier_stokes():
+    pts = _points()
+    u = _output(pts)
+    res = NavierStokes(0.1, d=['x', 'y'], time='t').residual(pts, u)
+    du = grad(u, pts)
+    lap = laplacian(u, pts, components=['u', 'v'], d=['x', 'y'])
+    vel = u.extract(['u', 'v'])
+    for i, c in enumerate(['u', 'v']):
+        expected = (du.extract([f'd{c}dt'])
+                    + vel.extract(['u']) * du.extract([f'd{c}dx'])
+                    + vel.extract(['v']) * du.extract([f'd{c}dy'])
+                    - 0.1 * lap.tensor[:, i:i + 1]
+                    + du.extract([f'dpd{"xy"[i]}']))
+        torch.testing.assert_close(res.extract([c]).tensor, expected.tensor)
+
+
+def test_shared_derivatives():
+    pts = _points()
+    u = _output(pts)
+    with DerivativeCache() as cache:
+        NavierStokes(0.1, d=['x', 'y'], time='t').residual(pts, u)
+        assert cache.hits == 0
+        grad(u, pts, components=['u', 'v', 'p'])
+    assert cache.hits == 3
@@ -32,3 +32,24 @@ def test_is_inside_fixed_variables():
     domain = CartesianDomain({'x': 1, 'y': [0, 1]})
     for pt, exp_result in zip([pt_1, pt_2, pt_3], [False, True, False]):
         assert domain.is_inside(pt, check_border=False) == exp_result
+
+
+def test_sample_tensor():
+    domain = CartesianDomain({'x': [0, 1], 'y': 2, 'z': [-1, 0]})
+    generator = torch.Generator().manual_seed(0)
+    pts = domain.sample_tensor(20, ['z', 'y', 'x'],
+                               dtype=torch.float64,
+                               generator=generator)
+    assert not isinstance(pts, LabelTensor)
+    assert pts.shape == (20, 3)
+    assert pts.dtype == torch.float64
+    assert ((pts[:, 0] >= -1) & (pts[:, 0] <= 0)).all()
+    assert (pts[:, 1] == 2).all()
+    assert ((pts[:, 2] >= 0) & (pts[:, 2] <= 1)).all()
+
+    generator.manual_seed(0)
+    assert torch.equal(
+        pts,
+        domain.sample_tensor(20, ['z', 'y', 'x'],
+                             dtype=torch.float64,
+                             generator=generator))
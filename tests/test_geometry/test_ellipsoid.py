@@ -28,3 +28,12 @@ def test_is_inside_sample_surface_true():
     pt_3 = LabelTensor(torch.tensor([[1.5, 0.5]]), ['x', 'y'])
     for pt, exp_result in zip([pt_1, pt_2, pt_3], [False, True, False]):
         assert domain.is_inside(pt) == exp_result
+
+
+def test_sample_tensor():
+    domain = EllipsoidDomain({'x': [0, 2], 'y': [0, 1], 'z': 3})
+    generator = torch.Generator().manual_seed(0)
+    pts = domain.sample_tensor(50, ['x', 'y', 'z'], generator=generator)
+    assert pts.shape == (50, 3)
+    assert (pts[:, 2] == 3).all()
+    assert (((pts[:, 0] - 1)**2 + ((pts[:, 1] - 0.5) / 0.5)**2) <= 1 + 1e-6).all()
@@ -117,3 +117,73 @@ def test_slice():
     tensor_view3 = tensor[:, 2]
     assert tensor_view3.labels == labels[2]
     assert torch.allclose(tensor_view3, data[:, 2].reshape(-1, 1))
+
+
+def test_extract_view():
+    tensor = LabelTensor(data, labels)
+    new = tensor.extract(['b', 'c'])
+    assert new.labels == ['b', 'c']
+    assert new.data_ptr() == tensor[:, 1:].data_ptr()
+    assert torch.allclose(new, data[:, 1:])
+
+    new = tensor.extract(['c', 'b'])
+    assert new.data_ptr() != tensor.data_ptr()
+    assert torch.allclose(new, data[:, [2, 1]])
+
+
+def test_label_to_index():
+    tensor = LabelTensor(data, labels)
+    assert tensor.label_to_index == {'a': 0, 'b': 1, 'c': 2}
+    tensor.labels = ['c', 'b', 'a']
+    assert tensor.label_to_index == {'c': 0, 'b': 1, 'a': 2}
+    assert torch.allclose(tensor.extract('a'), data[:, 2].reshape(-1, 1))
+
+
+def test_conversion_no_copy(monkeypatch):
+    tensor = LabelTensor(data, labels)
+
+    def fail_clone(*args, **kwargs):
+        raise AssertionError("conversion must not clone the tensor")
+
+    monkeypatch.setattr(LabelTensor, 'clone', fail_clone)
+
+    for new in [tensor.to('cpu'), tensor.to(torch.float32), tensor.cpu(),
+                tensor.detach(), tensor.requires_grad_(False)]:
+        assert isinstance(new, LabelTensor)
+        assert new.labels == labels
+        assert new.untyped_storage().data_ptr() == tensor.untyped_storage(
+        ).data_ptr()
+
+    new = tensor.to(torch.float64)
+    assert new.labels == labels
+    assert new.dtype == torch.float64
+
+
+def test_vstack():
+    tensor1 = LabelTensor(data, labels)
+    tensor2 = LabelTensor(data[:, [2, 0, 1]], ['c', 'a', 'b'])
+    stacked = LabelTensor.vstack([tensor1, tensor2])
+    assert stacked.labels == labels
+    assert stacked.shape == (40, 3)
+    assert torch.allclose(stacked, torch.vstack([data, data]))
+
+
+def test_cartesian_product():
+    tensor1 = LabelTensor(torch.rand((4, 2)), ['a', 'b'])
+    tensor2 = LabelTensor(torch.rand((3, 1)), ['c'])
+    tensor3 = LabelTensor(torch.rand((2, 1)), ['d'])
+    product = LabelTensor.cartesian_product([tensor1, tensor2, tensor3])
+    assert product.labels == ['a', 'b', 'c', 'd']
+    assert product.shape == (24, 4)
+    expected = torch.cat(
+        (tensor1.repeat(6, 1),
+         tensor2.repeat_interleave(4, dim=0).repeat(2, 1),
+         tensor3.repeat_interleave(12, dim=0)),
+        dim=1)
+    assert torch.allclose(product, expected)
+
+    crossed = tensor1.append(tensor2, mode='cross')
+    assert crossed.labels == ['a', 'b', 'c']
+    assert torch.allclose(crossed, product[:12, :3])
+    with pytest.raises(RuntimeError):
+        LabelTensor.cartesian_product([tensor1, tensor1])
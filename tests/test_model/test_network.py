@@ -46,4 +46,21 @@ def test_backward():
     out = net.torchmodel(data)
     l = torch.mean(out)
     l.backward()
-    assert data._grad.shape == torch.Size([20, 3])
\ No newline at end of file
+    assert data._grad.shape == torch.Size([20, 3])
+
+def test_forward_raw_tensor():
+    torchmodel_2d = FeedForward(2, output_dim)
+    net = Network(model=torchmodel_2d,
+                  input_variables=['x', 'z'],
+                  output_variables=['a', 'b', 'c', 'd'],
+                  raw_tensor=True)
+    net_lt = Network(model=torchmodel_2d,
+                     input_variables=['x', 'z'],
+                     output_variables=['a', 'b', 'c', 'd'])
+    out_raw = net(data_lt)
+    out_lt = net_lt(data_lt)
+    assert isinstance(out_raw, LabelTensor)
+    assert out_raw.labels == ['a', 'b', 'c', 'd']
+    assert torch.allclose(out_raw, out_lt)
+    # the second call uses the cached input columns
+    assert torch.allclose(net(data_lt), out_lt)
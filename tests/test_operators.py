@@ -1,8 +1,13 @@
+import math
 import torch
 import pytest
 
 from pina import LabelTensor
-from pina.operators import grad, div, laplacian
+from pina.operators import (
+    grad, div, laplacian, hessian, derivative, derivatives, advection, curl,
+    material_derivative, spectral_grad, spectral_laplacian, DerivativeCache,
+    StencilGrid
+)
 
 
 def func_vector(x):
@@ -75,6 +80,23 @@ def test_grad_vector_output():
     assert torch.allclose(grad_tensor_v, true_val)
 
 
+def test_grad_vector_output_components():
+    grad_tensor_v = grad(tensor_v, inp, components=['c', 'a'], d=['z', 'x'])
+    true_val = torch.cat(
+        (2*inp.extract(['z']),
+         torch.zeros_like(inp.extract(['x'])),
+         torch.zeros_like(inp.extract(['z'])),
+         2*inp.extract(['x'])
+        ), dim=1
+    )
+    assert grad_tensor_v.labels == ['dcdz', 'dcdx', 'dadz', 'dadx']
+    assert torch.allclose(grad_tensor_v, true_val)
+
+    # the batched jacobian keeps the graph for higher order derivatives
+    grad_grad = grad(grad_tensor_v, inp, components=['dcdz'], d=['z'])
+    assert torch.allclose(grad_grad, 2*torch.ones_like(grad_grad))
+
+
 def test_div_vector_output():
     div_tensor_v = div(tensor_v, inp)
     true_val = 2*torch.sum(inp, dim=1).reshape(-1,1)
@@ -122,3 +144,340 @@ def test_laplacian_vector_output():
         f'dd{i}' for i in ['a', 'b']
     ]
     assert torch.allclose(laplace_tensor_v, true_val)
+
+    # multi-character component names
+    tensor_long = LabelTensor(func_vector(inp), ['ux', 'uy', 'uz'])
+    laplace_tensor_v = laplacian(tensor_long, inp, components=['ux', 'uy'])
+    assert laplace_tensor_v.labels == ['ddux', 'dduy']
+    assert torch.allclose(laplace_tensor_v, 2*torch.ones_like(
+        tensor_long.extract(['ux', 'uy'])))
+
+
+def test_laplacian_divgrad():
+    laplace_tensor_s = laplacian(tensor_s, inp, method='divgrad')
+    assert laplace_tensor_s.labels == [f"dd{tensor_s.labels[0]}"]
+    assert torch.allclose(laplace_tensor_s, 6*torch.ones_like(tensor_s))
+
+    laplace_tensor_v = laplacian(tensor_v,
+                                 inp,
+                                 components=['a', 'b'],
+                                 d=['x', 'y'],
+                                 method='divgrad')
+    true_val = laplacian(tensor_v, inp, components=['a', 'b'], d=['x', 'y'])
+    assert laplace_tensor_v.labels == ['dda', 'ddb']
+    assert torch.allclose(laplace_tensor_v, true_val)
+
+    with pytest.raises(ValueError):
+        laplacian(tensor_s, inp, method='fancy')
+
+
+def test_derivative_cache():
+    cache = DerivativeCache()
+    with cache:
+        grad_tensor_v = grad(tensor_v, inp)
+        assert (cache.hits, cache.misses) == (0, 3)
+        # same columns, extracted from the output
+        grad_tensor_a = grad(tensor_v.extract(['a']), inp, d=['x'])
+        assert (cache.hits, cache.misses) == (1, 3)
+        # the first derivatives are reused by the Laplacian
+        laplace_tensor_v = laplacian(tensor_v, inp)
+        assert (cache.hits, cache.misses) == (4, 12)
+        laplacian(tensor_v, inp, method='divgrad')
+        assert (cache.hits, cache.misses) == (16, 12)
+    assert torch.allclose(grad_tensor_v, grad(tensor_v, inp))
+    assert torch.allclose(grad_tensor_a, 2*inp.extract(['x']))
+    assert torch.allclose(laplace_tensor_v, 2*torch.ones_like(tensor_v))
+    assert cache._jacobians == {}
+
+
+def test_derivative_cache_detached_alias():
+    expected = grad(tensor_v, inp)
+    for detached_first in [True, False]:
+        with DerivativeCache() as cache:
+            if detached_first:
+                with pytest.raises(RuntimeError):
+                    grad(tensor_v.detach(), inp)
+            gradient = grad(tensor_v, inp)
+            if not detached_first:
+                with pytest.raises(RuntimeError):
+                    grad(tensor_v.detach(), inp)
+            # the alias shares the memory, not the autograd graph
+            assert cache.hits == 0
+        assert torch.allclose(gradient, expected)
+
+
+def test_grad_untracked_and_constant():
+    # the output of a detached model is not differentiated
+    with pytest.raises(RuntimeError):
+        grad(tensor_v.detach(), inp)
+    with pytest.raises(RuntimeError):
+        laplacian(tensor_v.detach(), inp, method='hutchinson')
+
+    # the derivatives of a constant gradient are zero
+    linear = LabelTensor(inp.sum(dim=1, keepdim=True), ['u'])
+    gradient = grad(linear, inp)
+    assert torch.allclose(gradient, torch.ones_like(gradient))
+    for method in ['std', 'divgrad', 'hutchinson']:
+        laplace = laplacian(linear, inp, method=method)
+        assert torch.equal(laplace, torch.zeros_like(laplace))
+    with DerivativeCache():
+        laplace = laplacian(linear, inp)
+    assert torch.equal(laplace, torch.zeros_like(laplace))
+    third = derivative(linear, inp, {'x': 3})
+    assert torch.equal(third, torch.zeros_like(third))
+
+
+def test_derivative_cache_blocks():
+    x = torch.rand((30, 3), requires_grad=True)
+    blocks = [LabelTensor(x[:10], ['x', 'y', 'z']),
+              LabelTensor(x[10:], ['x', 'y', 'z'])]
+    inputs = LabelTensor(torch.cat(blocks), ['x', 'y', 'z'])
+    output_ = LabelTensor(func_vector(inputs), ['a', 'b', 'c'])
+    outputs = [LabelTensor(o, ['a', 'b', 'c']) for o in output_.split(
+        [10, 20])]
+    with DerivativeCache() as cache:
+        cache.register_blocks(output_, inputs, outputs, blocks)
+        gradients = [grad(o, b) for o, b in zip(outputs, blocks)]
+        # the second block reuses the derivatives of the whole output
+        assert (cache.hits, cache.misses) == (3, 3)
+        laplaces = [laplacian(o, b) for o, b in zip(outputs, blocks)]
+        assert (cache.hits, cache.misses) == (18, 12)
+    for block, gradient, laplace in zip(blocks, gradients, laplaces):
+        assert gradient.shape == (block.shape[0], 9)
+        assert torch.allclose(gradient.extract(['dadx', 'dbdy', 'dcdz']),
+                              2*block)
+        assert torch.allclose(laplace, 2*torch.ones_like(block))
+
+
+def test_derivative():
+    x = LabelTensor(torch.rand((20, 2), requires_grad=True), ['x', 't'])
+    x_, t_ = x.extract(['x']), x.extract(['t'])
+    output_ = LabelTensor(
+        torch.cat((torch.sin(x_) * t_**2, x_**4), dim=1), ['u', 'v'])
+
+    derivative_tensor = derivative(output_, x, {'x': 3, 't': 1})
+    assert derivative_tensor.labels == ['ddddudxdxdxdt', 'ddddvdxdxdxdt']
+    assert torch.allclose(derivative_tensor.extract(['ddddudxdxdxdt']),
+                          -2*torch.cos(x_)*t_)
+    assert torch.allclose(derivative_tensor.extract(['ddddvdxdxdxdt']),
+                          torch.zeros_like(x_))
+
+    derivative_tensor = derivative(output_, x, {'x': 4}, components=['v'])
+    assert derivative_tensor.labels == ['ddddvdxdxdxdx']
+    assert torch.allclose(derivative_tensor, 24*torch.ones_like(x_))
+
+    with pytest.raises(RuntimeError):
+        derivative(output_, x, {'y': 1})
+    with pytest.raises(ValueError):
+        derivative(output_, x, {'x': -1})
+
+
+def test_derivatives():
+    x = LabelTensor(torch.rand((20, 2), requires_grad=True), ['x', 't'])
+    x_, t_ = x.extract(['x']), x.extract(['t'])
+    output_ = LabelTensor(torch.sin(x_) * t_**2, ['u'])
+
+    cache = DerivativeCache()
+    with cache:
+        derivative_tensor = derivatives(
+            output_, x, [{'x': 2}, {'t': 1, 'x': 1}, {}])
+    # one reverse pass for u and one for dudx, shared by the derivatives
+    assert cache.misses == 2
+    assert derivative_tensor.labels == ['ddudxdx', 'ddudxdt', 'u']
+    true_val = torch.cat((-torch.sin(x_)*t_**2,
+                          2*torch.cos(x_)*t_,
+                          output_), dim=1)
+    assert torch.allclose(derivative_tensor, true_val)
+
+
+def test_hessian():
+    x = LabelTensor(torch.rand((20, 2), requires_grad=True), ['x', 'y'])
+    x_, y_ = x.extract(['x']), x.extract(['y'])
+    output_ = LabelTensor(torch.cat((x_**2 * y_**3, x_ * y_), dim=1),
+                          ['u', 'v'])
+
+    hessian_tensor = hessian(output_, x)
+    assert hessian_tensor.labels == [
+        f'dd{c}d{i}d{j}' for c in ['u', 'v'] for i in ['x', 'y']
+        for j in ['x', 'y']
+    ]
+    true_val = torch.cat((2*y_**3, 6*x_*y_**2, 6*x_*y_**2, 6*x_**2*y_,
+                          torch.zeros_like(x_), torch.ones_like(x_),
+                          torch.ones_like(x_), torch.zeros_like(x_)), dim=1)
+    assert torch.allclose(hessian_tensor, true_val)
+
+    hessian_tensor = hessian(output_, x, components=['u'], symmetric=True)
+    assert hessian_tensor.labels == ['ddudxdx', 'ddudxdy', 'ddudydy']
+    assert torch.allclose(hessian_tensor, true_val[:, [0, 1, 3]])
+
+    hessian_tensor = hessian(output_, x, components=['u'], d=['y'])
+    assert hessian_tensor.labels == ['ddudydy']
+    assert torch.allclose(hessian_tensor, 6*x_**2*y_)
+
+
+def test_hutchinson():
+    torch.manual_seed(42)
+    x = LabelTensor(torch.rand((20, 4), requires_grad=True),
+                    ['x', 'y', 'z', 't'])
+    output_ = LabelTensor(
+        torch.cat((torch.sum(x**2, dim=1, keepdim=True),
+                   torch.prod(x, dim=1, keepdim=True)), dim=1), ['u', 'v'])
+
+    # the Hessian of u is diagonal, so the estimate is exact
+    laplace_tensor = laplacian(output_, x, components=['u'],
+                               method='hutchinson', n_probes=3)
+    assert laplace_tensor.labels == ['ddu']
+    assert torch.allclose(laplace_tensor, 8*torch.ones_like(laplace_tensor))
+
+    laplace_tensor = laplacian(output_, x, method='hutchinson',
+                               n_probes=5000)
+    true_val = laplacian(output_, x)
+    assert laplace_tensor.labels == true_val.labels
+    assert torch.allclose(laplace_tensor, true_val, atol=0.1)
+
+    div_tensor = div(tensor_v, inp, method='hutchinson', n_probes=2)
+    assert div_tensor.labels == ['dadx+dbdy+dcdz']
+    assert torch.allclose(div_tensor, div(tensor_v, inp))
+
+    # the gradient of a linear function is constant: no probes are drawn
+    linear = LabelTensor(x.sum(dim=1, keepdim=True), ['u'])
+    state = torch.get_rng_state()
+    laplace_tensor = laplacian(linear, x, method='hutchinson', n_probes=3)
+    assert torch.equal(torch.get_rng_state(), state)
+    assert torch.equal(laplace_tensor, torch.zeros_like(laplace_tensor))
+
+    with pytest.raises(ValueError):
+        laplacian(output_, x, method='hutchinson', n_probes=0)
+    with pytest.raises(ValueError):
+        div(tensor_v, inp, method='fancy')
+
+
+x_t = LabelTensor(torch.rand((20, 4), requires_grad=True), ['x', 'y', 'z', 't'])
+x_, y_, z_, t_ = (x_t.extract([i]) for i in ['x', 'y', 'z', 't'])
+tensor_uvw = LabelTensor(torch.cat((y_*z_*t_, x_**2, x_*y_*z_), dim=1),
+                         ['u', 'v', 'w'])
+
+
+def test_advection():
+    advection_tensor = advection(tensor_uvw, x_t, ['u', 'v', 'w'],
+                                 d=['x', 'y', 'z'])
+    assert advection_tensor.labels == [
+        'ududx+vdudy+wdudz', 'udvdx+vdvdy+wdvdz', 'udwdx+vdwdy+wdwdz'
+    ]
+    u, v, w = tensor_uvw.extract(['u']), tensor_uvw.extract(['v']), \
+        tensor_uvw.extract(['w'])
+    true_val = torch.cat((v*z_*t_ + w*y_*t_,
+                          u*2*x_,
+                          u*y_*z_ + v*x_*z_ + w*x_*y_), dim=1)
+    assert torch.allclose(advection_tensor, true_val)
+
+    with pytest.raises(ValueError):
+        advection(tensor_uvw, x_t, ['u', 'v'], d=['x', 'y', 'z'])
+
+
+def test_advection_single_velocity():
+    # baseline implementation, broadcasting the single velocity variable
+    jacobian = grad(tensor_uvw, x_t, d=['x', 'y', 'z']).reshape(-1, 3, 3)
+    true_val = (jacobian * tensor_uvw.extract('u').unsqueeze(1)).sum(dim=-1)
+
+    advection_tensor = advection(tensor_uvw, x_t, 'u', d=['x', 'y', 'z'])
+    assert advection_tensor.labels == [
+        'ududx+ududy+ududz', 'udvdx+udvdy+udvdz', 'udwdx+udwdy+udwdz'
+    ]
+    assert torch.allclose(advection_tensor, true_val)
+    assert torch.allclose(
+        advection(tensor_uvw, x_t, ['u'], d=['x', 'y', 'z']), true_val)
+
+
+def test_material_derivative():
+    material_tensor = material_derivative(tensor_uvw, x_t, ['u', 'v', 'w'])
+    assert material_tensor.labels == ['DuDt', 'DvDt', 'DwDt']
+    true_val = advection(tensor_uvw, x_t, ['u', 'v', 'w'], d=['x', 'y', 'z'])
+    true_val = true_val + torch.cat((y_*z_, 0*x_, 0*x_), dim=1)
+    assert torch.allclose(material_tensor, true_val)
+
+
+def test_curl():
+    curl_tensor = curl(tensor_uvw, x_t, d=['x', 'y', 'z'])
+    assert curl_tensor.labels == ['dwdy-dvdz', 'dudz-dwdx', 'dvdx-dudy']
+    true_val = torch.cat((x_*z_, y_*t_ - y_*z_, 2*x_ - z_*t_), dim=1)
+    assert torch.allclose(curl_tensor, true_val)
+
+    curl_tensor = curl(tensor_uvw, x_t, components=['u', 'v'], d=['x', 'y'])
+    assert curl_tensor.labels == ['dvdx-dudy']
+    assert torch.allclose(curl_tensor, 2*x_ - z_*t_)
+
+    with pytest.raises(ValueError):
+        curl(tensor_uvw, x_t)
+
+
+def test_stencil_grid():
+    grid = StencilGrid(['x', 'y'], [[0, 1], [0, 2]], [41, 41])
+    pts = LabelTensor(
+        torch.cartesian_prod(torch.linspace(0, 1, 41),
+                             torch.linspace(0, 2, 41)), ['x', 'y'])
+    # the grid points can be in any order
+    pts = pts[torch.randperm(pts.shape[0])]
+    pts.labels = ['x', 'y']
+    x_, y_ = pts.extract(['x']), pts.extract(['y'])
+    output_ = LabelTensor(torch.cat((torch.sin(x_) * y_**2, x_ * y_), dim=1),
+                          ['u', 'v'])
+
+    # the input does not need to be tracked by autograd
+    with grid:
+        grad_tensor = grad(output_, pts)
+        laplace_tensor = laplacian(output_, pts, components=['u'])
+        div_tensor = div(output_, pts)
+
+    pts.requires_grad_()
+    x_, y_ = pts.extract(['x']), pts.extract(['y'])
+    output_ = LabelTensor(torch.cat((torch.sin(x_) * y_**2, x_ * y_), dim=1),
+                          ['u', 'v'])
+    assert grad_tensor.labels == ['dudx', 'dudy', 'dvdx', 'dvdy']
+    assert torch.allclose(grad_tensor, grad(output_, pts), atol=1e-2)
+    assert torch.allclose(laplace_tensor,
+                          laplacian(output_, pts, components=['u']),
+                          atol=1e-2)
+    assert torch.allclose(div_tensor, div(output_, pts), atol=1e-2)
+
+    # points not on the grid, automatic differentiation is used
+    with grid:
+        with pytest.warns(RuntimeWarning):
+            grad_tensor = grad(tensor_s, inp, d=['x', 'y'])
+    assert torch.allclose(grad_tensor, 2*inp.extract(['x', 'y']))
+
+
+def test_spectral_operators():
+    n = 32
+    spacing = 2 * math.pi / n
+    x = torch.arange(n, dtype=torch.float64) * spacing
+    X, Y = torch.meshgrid(x, x, indexing='ij')
+    fields = torch.stack((torch.sin(X) * torch.cos(2*Y), torch.cos(X)), -1)
+    output_ = LabelTensor(fields[None], ['u', 'v'])
+
+    grad_tensor = spectral_grad(output_, spacing)
+    assert grad_tensor.shape == (1, n, n, 4)
+    assert grad_tensor.labels == ['dudx', 'dudy', 'dvdx', 'dvdy']
+    true_val = torch.stack((torch.cos(X) * torch.cos(2*Y),
+                            -2 * torch.sin(X) * torch.sin(2*Y),
+                            -torch.sin(X),
+                            torch.zeros_like(X)), -1)[None]
+    assert torch.allclose(grad_tensor, true_val)
+
+    laplace_tensor = spectral_laplacian(output_, spacing, components=['u'])
+    assert laplace_tensor.labels == ['ddu']
+    assert torch.allclose(laplace_tensor, -5 * output_.extract(['u']))
+
+    # non periodic fields, finite differences
+    x = torch.linspace(0, 1, n + 1, dtype=torch.float64)
+    X, Y = torch.meshgrid(x, x, indexing='ij')
+    output_ = LabelTensor((X**2 * Y)[None, ..., None], ['u'])
+    grad_tensor = spectral_grad(output_, 1 / n, d=['a', 'b'], method='fd')
+    assert grad_tensor.labels == ['duda', 'dudb']
+    assert torch.allclose(grad_tensor,
+                          torch.stack((2 * X * Y, X**2), -1)[None])
+    laplace_tensor = spectral_laplacian(output_, 1 / n, method='fd')
+    assert torch.allclose(laplace_tensor, 2 * Y[None, ..., None])
+
+    with pytest.raises(ValueError):
+        spectral_laplacian(output_, 1 / n, method='fancy')
@@ -142,3 +142,39 @@ def test_add_points():
     poisson_problem.add_points({'D': new_pts})
     assert torch.isclose(poisson_problem.input_pts['D'].extract('x'),new_pts.extract('x'))
     assert torch.isclose(poisson_problem.input_pts['D'].extract('y'),new_pts.extract('y'))
+
+
+def test_stencil_grids():
+    n = 10
+    poisson_problem = Poisson()
+    poisson_problem.discretise_domain(n, 'grid', locations=['D', 'gamma1'])
+    grid = poisson_problem.stencil_grids['D']
+    assert grid.variables == ['x', 'y']
+    assert grid.shape == (n, n)
+    assert grid.lattice_index(poisson_problem.input_pts['D']) is not None
+    assert poisson_problem.stencil_grids['gamma1'].variables == ['x']
+
+    poisson_problem.discretise_domain(n, 'random', locations=['D'])
+    assert 'D' not in poisson_problem.stencil_grids
+
+    new_pts = LabelTensor(torch.tensor([[0.5, 0.5]]), labels=['x', 'y'])
+    poisson_problem.add_points({'gamma1': new_pts})
+    assert 'gamma1' not in poisson_problem.stencil_grids
+
+
+def test_streaming_conditions():
+
+    class StreamingPoisson(Poisson):
+        conditions = dict(Poisson.conditions)
+        conditions['D'] = Condition(location=CartesianDomain({
+            'x': [0, 1],
+            'y': [0, 1]
+        }),
+                                    equation=my_laplace,
+                                    stream_points=10)
+
+    poisson_problem = StreamingPoisson()
+    assert poisson_problem.streaming_conditions == ['D']
+    poisson_problem.discretise_domain(5)
+    assert 'D' not in poisson_problem.input_pts
+    assert poisson_problem.have_sampled_points
@@ -0,0 +1,74 @@
+import math
+import torch
+
+from pina.problem import AbstractProblem
+from pina import Condition, LabelTensor
+from pina.solvers import PhysicsInformedSupervisedSolver
+from pina.trainer import Trainer
+from pina.equation.equation import Equation
+from pina.operators import spectral_laplacian
+
+n = 16
+spacing = 2 * math.pi / n
+x = torch.arange(n) * spacing
+X, Y = torch.meshgrid(x, x, indexing='ij')
+# periodic fields of shape [batch, X, Y, channels]
+amplitude = torch.rand(10, 1, 1, 1)
+u = amplitude * (torch.sin(X) * torch.cos(Y))[None, ..., None]
+f = -2 * u
+
+
+def poisson(input_, output_):
+    return spectral_laplacian(output_, spacing) - input_.extract(['f'])
+
+
+class PoissonOperatorProblem(AbstractProblem):
+    input_variables = ['f']
+    output_variables = ['u']
+    conditions = {
+        'data': Condition(input_points=LabelTensor(f, ['f']),
+                          output_points=LabelTensor(u, ['u']))
+    }
+
+
+class PointwiseModel(torch.nn.Module):
+
+    def __init__(self):
+        super().__init__()
+        self.layer = torch.nn.Linear(1, 1)
+
+    def forward(self, x):
+        return self.layer(x)
+
+
+problem = PoissonOperatorProblem()
+
+
+def test_constructor():
+    PhysicsInformedSupervisedSolver(problem=problem,
+                                    model=PointwiseModel(),
+                                    equation=Equation(poisson))
+
+
+def test_loss_data():
+    solver = PhysicsInformedSupervisedSolver(problem=problem,
+                                             model=PointwiseModel(),
+                                             equation=Equation(poisson),
+                                             physics_weight=0.)
+    input_pts = LabelTensor(f, ['f'])
+    output_pts = LabelTensor(u, ['u'])
+    assert torch.isclose(solver.loss_data(input_pts, output_pts),
+                         solver.loss(solver.forward(input_pts), output_pts))
+
+    # the exact solution has zero physics loss
+    residual = poisson(input_pts, output_pts)
+    assert torch.allclose(residual, torch.zeros_like(residual), atol=1e-5)
+
+
+def test_train_cpu():
+    solver = PhysicsInformedSupervisedSolver(problem=problem,
+                                             model=PointwiseModel(),
+                                             equation=Equation(poisson))
+    trainer = Trainer(solver=solver, max_epochs=3, accelerator='cpu',
+                      batch_size=5)
+    trainer.train()
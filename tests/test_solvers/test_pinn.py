@@ -1,7 +1,9 @@
 import torch
+import pytest
+from pytorch_lightning.callbacks import Callback
 
 from pina.problem import SpatialProblem, InverseProblem
-from pina.operators import laplacian
+from pina.operators import grad, laplacian
 from pina.geometry import CartesianDomain
 from pina import Condition, LabelTensor
 from pina.solvers import PINN
@@ -10,6 +12,8 @@ from pina.model import FeedForward
 from pina.equation.equation import Equation
 from pina.equation.equation_factory import FixedValue
 from pina.loss import LpLoss
+from pina.callbacks import R3Refinement
+from pina.dataset import _shard_rows
 
 
 def laplace_equation(input_, output_):
@@ -161,6 +165,292 @@ def test_train_cpu():
                       accelerator='cpu', batch_size=20)
     trainer.train()
 
+def test_train_stratified_cpu():
+    poisson_problem = Poisson()
+    boundaries = ['gamma1', 'gamma2', 'gamma3', 'gamma4']
+    n = 10
+    poisson_problem.discretise_domain(n, 'grid', locations=boundaries)
+    pinn = PINN(problem = poisson_problem, model=model,
+                extra_features=None, loss=LpLoss())
+    trainer = Trainer(solver=pinn, max_epochs=2, accelerator='cpu',
+                      batch_size=20, shuffle='stratified')
+
+    def epoch(loader):
+        return [batch for batch in loader if 'output' not in batch]
+
+    loader = trainer._loader
+    counts = torch.bincount(loader.sample_dataset.condition_indeces)
+    first, second = epoch(loader), epoch(loader)
+    # two epochs visit all the points in a different order
+    first_pts = torch.cat([batch['pts'].tensor for batch in first])
+    second_pts = torch.cat([batch['pts'].tensor for batch in second])
+    assert not torch.equal(first_pts, second_pts)
+    assert torch.equal(first_pts.sort(dim=0).values,
+                       second_pts.sort(dim=0).values)
+    # 140 points in 7 batches: a seventh of each condition per batch
+    for batch in first + second:
+        batch_counts = torch.bincount(batch['condition'], minlength=5)
+        assert ((batch_counts - counts / 7).abs() < 1).all()
+    trainer.train()
+
+def test_train_raw_tensor_cpu():
+    class InputTypes(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+            self.types = set()
+
+        def forward(self, x):
+            self.types.add(type(x))
+            return self.model(x)
+
+    poisson_problem = Poisson()
+    boundaries = ['gamma1', 'gamma2', 'gamma3', 'gamma4']
+    n = 10
+    poisson_problem.discretise_domain(n, 'grid', locations=boundaries)
+    raw_model = InputTypes(FeedForward(2, 1))
+    pinn = PINN(problem = poisson_problem, model=raw_model,
+                extra_features=None, loss=LpLoss(), raw_tensor=True)
+    trainer = Trainer(solver=pinn, max_epochs=1,
+                      accelerator='cpu', batch_size=20)
+    trainer.train()
+    # the model runs on plain tensors, labels are set only on the output
+    assert raw_model.types == {torch.Tensor}
+
+    lt_model = InputTypes(raw_model.model)
+    pinn_lt = PINN(problem = poisson_problem, model=lt_model,
+                   extra_features=None, loss=LpLoss())
+    pts = poisson_problem.input_pts['D']
+    out_raw = pinn(pts)
+    out_lt = pinn_lt(pts)
+    assert lt_model.types == {LabelTensor}
+    assert out_raw.labels == out_lt.labels == ['u']
+    assert torch.allclose(out_raw, out_lt)
+
+
+def test_train_cache_derivatives_cpu():
+    poisson_problem = Poisson()
+    boundaries = ['gamma1', 'gamma2', 'gamma3', 'gamma4']
+    n = 10
+    poisson_problem.discretise_domain(n, 'grid', locations=boundaries)
+    pinn = PINN(problem = poisson_problem, model=model,
+                extra_features=None, loss=LpLoss(), cache_derivatives=True)
+    trainer = Trainer(solver=pinn, max_epochs=1,
+                      accelerator='cpu', batch_size=20)
+    trainer.train()
+    assert pinn.derivative_cache.misses > 0
+    assert pinn.derivative_cache._jacobians == {}
+
+
+def test_train_stencil_derivatives_cpu(recwarn):
+    class GridPoisson(Poisson):
+        conditions = {
+            **Poisson.conditions,
+            'D': Condition(
+                location=CartesianDomain({'x': [0, 1], 'y': [0, 1]}),
+                equation=my_laplace),
+        }
+
+    poisson_problem = GridPoisson()
+    n = 10
+    poisson_problem.discretise_domain(n, 'grid')
+    assert 'D' in poisson_problem.stencil_grids
+    pinn = PINN(problem = poisson_problem, model=model,
+                extra_features=None, loss=LpLoss(), stencil_derivatives=True)
+    trainer = Trainer(solver=pinn, max_epochs=1,
+                      accelerator='cpu', batch_size=1000)
+    trainer.train()
+    assert not any('stencil grid' in str(w.message) for w in recwarn)
+
+
+def test_train_stencil_fused_forward_cpu(recwarn):
+    residuals = []
+
+    def gradient_equation(input_, output_):
+        residual = grad(output_, input_, components=['u'], d=['x', 'y']).sum(
+            dim=-1, keepdim=True)
+        residuals.append(residual)
+        return residual
+
+    class GridPoisson(Poisson):
+        conditions = {
+            **Poisson.conditions,
+            'D': Condition(
+                location=CartesianDomain({'x': [0, 1], 'y': [0, 1]}),
+                equation=Equation(gradient_equation)),
+        }
+
+    poisson_problem = GridPoisson()
+    poisson_problem.discretise_domain(10, 'grid')
+    batch = None
+    for fused_forward in [False, True]:
+        pinn = PINN(problem = poisson_problem, model=model,
+                    extra_features=None, loss=LpLoss(),
+                    stencil_derivatives=True, fused_forward=fused_forward)
+        trainer = Trainer(solver=pinn, max_epochs=1,
+                          accelerator='cpu', batch_size=1000)
+        if batch is None:
+            batch = next(b for b in trainer._loader if 'output' not in b)
+        pinn._dataloader = trainer._loader
+        pinn.training_step(batch, 0)
+    # the fused derivatives are mapped to the stencil-computed ones
+    assert len(residuals) == 2
+    assert torch.allclose(residuals[0], residuals[1])
+    assert not any('stencil grid' in str(w.message) for w in recwarn)
+    trainer.train()
+
+
+def test_train_forcing_cpu():
+    calls = []
+
+    def source(input_):
+        calls.append(input_.shape[0])
+        return (torch.sin(input_.extract(['x']) * torch.pi) *
+                torch.sin(input_.extract(['y']) * torch.pi))
+
+    def laplace(input_, output_):
+        return laplacian(output_.extract(['u']), input_)
+
+    class ForcedPoisson(Poisson):
+        conditions = {
+            **Poisson.conditions,
+            'D': Condition(
+                location=CartesianDomain({'x': [0, 1], 'y': [0, 1]}),
+                equation=Equation(laplace, forcing=source)),
+        }
+
+    poisson_problem = ForcedPoisson()
+    poisson_problem.discretise_domain(10, 'grid')
+    pinn = PINN(problem = poisson_problem, model=model,
+                extra_features=None, loss=LpLoss())
+    trainer = Trainer(solver=pinn, max_epochs=2,
+                      accelerator='cpu', batch_size=20)
+    trainer.train()
+    # the forcing is evaluated only once, when the dataset is created
+    assert calls == [100]
+
+
+def test_train_streaming_cpu():
+    class StreamingPoisson(Poisson):
+        conditions = {
+            **Poisson.conditions,
+            'D': Condition(
+                location=CartesianDomain({'x': [0, 1], 'y': [0, 1]}),
+                equation=my_laplace,
+                stream_points=50),
+        }
+
+    poisson_problem = StreamingPoisson()
+    boundaries = ['gamma1', 'gamma2', 'gamma3', 'gamma4']
+    poisson_problem.discretise_domain(10, 'grid', locations=boundaries)
+    pinn = PINN(problem = poisson_problem, model=model,
+                extra_features=None, loss=LpLoss())
+    trainer = Trainer(solver=pinn, max_epochs=2,
+                      accelerator='cpu', batch_size=20)
+    assert 'D' not in poisson_problem.input_pts
+    assert trainer._loader.stream_dataset.condition_names == ['D']
+    trainer.train()
+
+
+def test_train_fused_forward_cpu():
+    poisson_problem = Poisson()
+    boundaries = ['gamma1', 'gamma2', 'gamma3', 'gamma4']
+    poisson_problem.discretise_domain(10, 'grid', locations=boundaries)
+    losses = []
+    batch = None
+    for fused_forward in [False, True]:
+        pinn = PINN(problem = poisson_problem, model=model,
+                    extra_features=None, fused_forward=fused_forward)
+        trainer = Trainer(solver=pinn, max_epochs=1,
+                          accelerator='cpu', batch_size=20)
+        if batch is None:
+            batch = next(b for b in trainer._loader if 'output' not in b)
+        pinn._dataloader = trainer._loader
+        losses.append(pinn.training_step(batch, 0))
+    assert torch.allclose(losses[0], losses[1])
+    trainer.train()
+
+
+def test_train_compile_cpu():
+    poisson_problem = Poisson()
+    boundaries = ['gamma1', 'gamma2', 'gamma3', 'gamma4']
+    n = 10
+    poisson_problem.discretise_domain(n, 'grid', locations=boundaries)
+    pinn = PINN(problem = poisson_problem, model=model,
+                extra_features=None, loss=LpLoss(),
+                compile_model={'backend': 'eager'})
+    assert pinn.neural_net.raw_tensor
+    trainer = Trainer(solver=pinn, max_epochs=1,
+                      accelerator='cpu', batch_size=20)
+    trainer.train()
+    assert pinn.neural_net.is_compiled
+    assert pinn.neural_net.graph_breaks == 0
+
+
+def test_train_compile_fallback_cpu():
+    poisson_problem = Poisson()
+    boundaries = ['gamma1', 'gamma2', 'gamma3', 'gamma4']
+    n = 10
+    poisson_problem.discretise_domain(n, 'grid', locations=boundaries)
+    # aot_autograd backends do not support double backward
+    pinn = PINN(problem = poisson_problem, model=model,
+                extra_features=None, loss=LpLoss(),
+                compile_model={'backend': 'aot_eager'})
+    trainer = Trainer(solver=pinn, max_epochs=1,
+                      accelerator='cpu', batch_size=20)
+    with pytest.warns(UserWarning, match='Falling back to eager'):
+        trainer.train()
+    assert not pinn.neural_net.is_compiled
+
+
+def test_compile_model_error():
+    class WrongShape(torch.nn.Module):
+        def __init__(self):
+            super().__init__()
+            self.weight = torch.nn.Parameter(torch.ones(3, 1))
+
+        def forward(self, x):
+            return x @ self.weight
+
+    pinn = PINN(problem=Poisson(), model=WrongShape(),
+                compile_model={'backend': 'eager'})
+    # the errors of the model are not hidden by the eager fallback
+    with pytest.raises(RuntimeError):
+        pinn.neural_net(in2_)
+    assert pinn.neural_net.is_compiled
+
+
+def test_compile_check_linear_model():
+    poisson_problem = Poisson()
+    linear = torch.nn.Linear(2, 1)
+    linear.requires_grad_(False)
+    pinn = PINN(problem=poisson_problem, model=linear,
+                compile_model={'backend': 'aot_eager'})
+    # the first derivative of a frozen linear model is constant
+    pinn._check_compiled_double_backward()
+    assert pinn.neural_net.is_compiled
+
+
+def test_train_compile_streaming_only_cpu():
+    class StreamingOnlyPoisson(SpatialProblem):
+        output_variables = ['u']
+        spatial_domain = CartesianDomain({'x': [0, 1], 'y': [0, 1]})
+        conditions = {
+            'D': Condition(
+                location=CartesianDomain({'x': [0, 1], 'y': [0, 1]}),
+                equation=my_laplace,
+                stream_points=50),
+        }
+
+    problem = StreamingOnlyPoisson()
+    assert problem.input_pts == {}
+    pinn = PINN(problem=problem, model=model,
+                compile_model={'backend': 'eager'})
+    trainer = Trainer(solver=pinn, max_epochs=1, accelerator='cpu')
+    trainer.train()
+    assert pinn.neural_net.is_compiled
+
+
 def test_log():
     poisson_problem.discretise_domain(100)
     solver = PINN(problem = poisson_problem, model=model,
@@ -237,6 +527,79 @@ def test_train_inverse_problem_cpu():
     trainer.train()
 
 
+class RankSampling(Callback):
+    """
+    Sample different points in every rank of a parallel training, as the
+    ranks launched as separate processes do, also in the refinements.
+    """
+
+    def setup(self, trainer, pl_module, stage):
+        torch.manual_seed(trainer.global_rank)
+        problem = pl_module.problem
+        for name, condition in problem.conditions.items():
+            if hasattr(condition, 'location'):
+                n = len(problem.input_pts[name])
+                problem.discretise_domain(n, 'random', locations=[name])
+
+
+class CheckShards(Callback):
+    """
+    Check, in every rank of a parallel training, that the rank holds its
+    shard of the problem points, which are the same in all the ranks, and
+    that the unknown parameters are the same in all the ranks.
+    """
+
+    def on_train_end(self, trainer, pl_module):
+        problem = pl_module.problem
+        dataset = trainer._loader.sample_dataset
+        start = 0
+        for name, count in zip(dataset.condition_names, dataset._counts):
+            pts = problem.input_pts[name].tensor.detach()
+            local = dataset.pts.tensor[start:start + count].detach()
+            start += count
+            rows = _shard_rows(len(pts), trainer.global_rank,
+                               trainer.world_size)
+            assert torch.equal(local, pts[rows])
+            all_pts = pl_module.all_gather(pts)
+            assert torch.equal(all_pts[0], all_pts[1])
+            shards = pl_module.all_gather(local)
+            assert not torch.equal(shards[0], shards[1])
+            assert torch.equal(shards.flatten(0, 1).unique(dim=0),
+                               pts.unique(dim=0))
+        for param in getattr(problem, 'unknown_parameters', {}).values():
+            all_params = pl_module.all_gather(param.detach())
+            assert torch.equal(all_params[0], all_params[1])
+
+
+def test_train_inverse_problem_ddp_cpu():
+    poisson_problem = InversePoisson()
+    boundaries = ['gamma1', 'gamma2', 'gamma3', 'gamma4', 'D']
+    n = 100
+    poisson_problem.discretise_domain(n, 'random', locations=boundaries)
+    pinn = PINN(problem = poisson_problem, model=model,
+                extra_features=None, loss=LpLoss())
+    trainer = Trainer(solver=pinn, max_epochs=2, accelerator='cpu',
+                      devices=2, strategy='ddp_fork', batch_size=20,
+                      callbacks=[RankSampling(), CheckShards()])
+    # the shards are set up when the ranks are running
+    assert len(trainer._loader.sample_dataset) == 500
+    trainer.train()
+
+
+def test_train_r3_ddp_cpu():
+    poisson_problem = Poisson()
+    boundaries = ['gamma1', 'gamma2', 'gamma3', 'gamma4']
+    poisson_problem.discretise_domain(10, 'random', locations=boundaries)
+    pinn = PINN(problem = poisson_problem, model=model,
+                extra_features=None, loss=LpLoss())
+    # the points refined by every rank are replaced by the ones of rank 0
+    trainer = Trainer(solver=pinn, max_epochs=2, accelerator='cpu',
+                      devices=2, strategy='ddp_fork', batch_size=20,
+                      callbacks=[RankSampling(), R3Refinement(sample_every=1),
+                                 CheckShards()])
+    trainer.train()
+
+
 # # TODO does not currently work
 # def test_train_inverse_problem_restore():
 #     tmpdir = "tests/tmp_restore_inv"
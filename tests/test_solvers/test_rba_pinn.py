@@ -165,6 +165,24 @@ def test_train_cpu():
                       accelerator='cpu', batch_size=20)
     trainer.train()
 
+def test_train_streaming_not_supported():
+    class StreamingPoisson(Poisson):
+        conditions = {
+            **Poisson.conditions,
+            'D': Condition(
+                location=CartesianDomain({'x': [0, 1], 'y': [0, 1]}),
+                equation=my_laplace,
+                stream_points=50),
+        }
+
+    poisson_problem = StreamingPoisson()
+    boundaries = ['gamma1', 'gamma2', 'gamma3', 'gamma4']
+    poisson_problem.discretise_domain(10, 'grid', locations=boundaries)
+    pinn = PINN(problem = poisson_problem, model=model,
+                extra_features=None, loss=LpLoss())
+    with pytest.raises(RuntimeError):
+        Trainer(solver=pinn, max_epochs=1, accelerator='cpu', batch_size=20)
+
 def test_log():
     poisson_problem.discretise_domain(100)
     solver = PINN(problem = poisson_problem, model=model,
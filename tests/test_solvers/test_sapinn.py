@@ -165,6 +165,39 @@ def test_train_cpu():
                       accelerator='cpu', batch_size=20)
     trainer.train()
 
+
+def test_train_batches_cpu():
+    poisson_problem = Poisson()
+    boundaries = ['gamma1', 'gamma2', 'gamma3', 'gamma4']
+    poisson_problem.discretise_domain(10, 'grid', locations=boundaries)
+    pinn = PINN(problem=poisson_problem, model=model,
+                extra_features=None, loss=LpLoss())
+    trainer = Trainer(solver=pinn, max_epochs=2,
+                      accelerator='cpu', batch_size=20)
+    assert trainer.shuffle is False
+    trainer.train()
+    # each batch uses the weights of its points, all visited in an epoch
+    for name, pts in poisson_problem.input_pts.items():
+        assert pinn._visited_points[name] == pts.shape[0]
+    pinn._PINNInterface__logged_metric = 'D'
+    residual = torch.rand(5, 1)
+    weighted_loss, _ = pinn._compute_loss(residual, torch.arange(5))
+    weights = torch.sigmoid(pinn.weights_dict.torchmodel['D'].sa_weights[:5])
+    loss = pinn._vectorial_loss(torch.zeros_like(residual), residual)
+    assert loss.shape == (5,)
+    torch.testing.assert_close(weighted_loss,
+                               torch.mean(weights.flatten() * loss))
+
+    trainer = Trainer(solver=pinn, max_epochs=1,
+                      accelerator='cpu', batch_size=20, shuffle=True)
+    with pytest.raises(RuntimeError):
+        trainer.train()
+    # the weights are not sharded among the ranks
+    with pytest.raises(RuntimeError):
+        Trainer(solver=pinn, max_epochs=1, accelerator='cpu', devices=2,
+                strategy='ddp_fork', batch_size=20)
+
+
 def test_log():
     poisson_problem.discretise_domain(100)
     solver = PINN(problem = poisson_problem, model=model,